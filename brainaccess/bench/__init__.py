@@ -0,0 +1 @@
+"""Benchmarks for the BrainAccess acquisition path"""
@@ -0,0 +1,47 @@
+""" Runs the benchmark suite and writes a JSON report
+
+Usage: ``python -m brainaccess.bench [-o report.json] [--quick]``
+"""
+
+import argparse
+import datetime
+import json
+import platform
+
+import brainaccess
+from brainaccess.bench import acquisition, chunk_callback, multi_manager
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m brainaccess.bench",
+        description="BrainAccess acquisition benchmarks",
+    )
+    parser.add_argument(
+        "-o", "--output", default="brainaccess-bench.json", help="JSON report file"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="short buffers, latency and multi-manager runs"
+    )
+    args = parser.parse_args()
+
+    buffer_seconds = (10, 60) if args.quick else (60, 600, 1800)
+    latency_duration = 2.0 if args.quick else 5.0
+    report = {
+        "brainaccess": brainaccess.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "units": "seconds",
+        "chunk_conversion": [chunk_callback.run(size) for size in (25, 100)],
+        "acquisition": acquisition.run(buffer_seconds, latency_duration),
+        "multi_manager": multi_manager.run_all(duration=0.25 if args.quick else 1.0),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+""" Acquisition benchmarks
+
+Drives brainaccess.utils.acquisition.EEG with a SimulatedEEGManager and
+measures the real-time path: the acquisition chunk callback, the latency
+from a chunk leaving the device to a consumer seeing it, and get_mne
+latency against buffer length, for accumulate and roll modes. The native
+library is not needed, so the suite runs on headless build machines.
+
+Run with ``python -m brainaccess.bench.acquisition``
+"""
+
+import time
+
+import numpy as np
+
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.utils import acquisition
+from brainaccess.utils.simulation import SimulatedEEGManager
+
+CAP = {0: "F3", 1: "F4", 2: "C3", 3: "C4", 4: "P3", 5: "P4", 6: "O1", 7: "O2"}
+
+
+def _summary(seconds: list) -> dict:
+    x = np.asarray(seconds)
+    if x.size == 0:
+        # e.g. the callback never fired, keep the rest of the report
+        return {"n": 0}
+    return {
+        "n": int(x.size),
+        "mean": float(x.mean()),
+        "p50": float(np.percentile(x, 50)),
+        "p95": float(np.percentile(x, 95)),
+        "p99": float(np.percentile(x, 99)),
+        "max": float(x.max()),
+    }
+
+
+class _TimedCallback:
+    """Wraps a chunk callback, recording its duration and delivery time"""
+
+    def __init__(self, f, sample_row):
+        self.f = f
+        self.sample_row = sample_row
+        self.durations: list = []
+        self.delivered: dict = {}
+
+    def __call__(self, chunk, chunk_size):
+        start = time.perf_counter()
+        self.f(chunk, chunk_size)
+        self.durations.append(time.perf_counter() - start)
+        self.delivered[int(chunk[self.sample_row, -1])] = start
+
+
+def _start(mode: str, buffer_samples: int, speed):
+    # the roll buffer is sized by zeros_at_start, accumulate starts empty
+    buffer_samples = buffer_samples if mode == "roll" else 0
+    eeg = acquisition.EEG(mode=mode)
+    mgr = SimulatedEEGManager(speed=speed, seed=0)
+    eeg.setup(mgr, cap=CAP, port="simulated", zeros_at_start=buffer_samples)
+    eeg.start_acquisition()
+    timed = _TimedCallback(
+        mgr._callback_chunk, mgr.stream_layout.index(eeg_channel.SAMPLE_NUMBER)
+    )
+    mgr.set_callback_chunk(timed, as_numpy=True)
+    return eeg, mgr, timed
+
+
+def _stop(eeg, mgr):
+    eeg.stop_acquisition()
+    mgr.destroy()
+    eeg.close()
+
+
+def _fill(mgr, samples: int):
+    while mgr.sample_number < samples and mgr.is_streaming():
+        time.sleep(0.01)
+
+
+def callback_cost(mode: str, buffer_seconds: float, chunks: int = 2000) -> dict:
+    """Acquisition chunk callback duration
+
+    Parameters
+    ----------
+    mode: str
+        acquisition mode, accumulate or roll
+    buffer_seconds: float
+        data already buffered before timing (roll buffer length in roll mode)
+    chunks: int
+        number of chunks timed
+
+    Returns
+    -------
+    dict
+        duration statistics in seconds
+    """
+    eeg, mgr, timed = _start(mode, int(250 * buffer_seconds), None)
+    try:
+        if mode == "accumulate":
+            _fill(mgr, int(buffer_seconds * mgr.sample_frequency))
+        timed.durations = []
+        _fill(mgr, mgr.sample_number + chunks * mgr.chunk_size)
+        return _summary(timed.durations[:chunks])
+    finally:
+        _stop(eeg, mgr)
+
+
+def consumer_latency(
+    mode: str, duration: float = 5.0, poll_interval: float = 0.001, window: float = 1.0
+) -> dict:
+    """Latency from chunk delivery to a polling consumer reading it with get_mne
+
+    Parameters
+    ----------
+    mode: str
+        acquisition mode, accumulate or roll
+    duration: float
+        seconds streamed in real time
+    poll_interval: float
+        consumer sleep between reads
+    window: float
+        seconds read by the consumer on each poll
+
+    Returns
+    -------
+    dict
+        latency statistics in seconds
+    """
+    eeg, mgr, timed = _start(mode, int(250 * 10), 1.0)
+    latencies = []
+    last = -1
+    try:
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            raw = eeg.get_mne(tim=window, annotations=False)
+            seen = time.perf_counter()
+            samples = raw.get_data(picks=["Sample"])[0]
+            sample = int(samples[-1]) if samples.size else -1
+            if sample != last and sample in timed.delivered:
+                latencies.append(seen - timed.delivered[sample])
+                last = sample
+            time.sleep(poll_interval)
+        return _summary(latencies)
+    finally:
+        _stop(eeg, mgr)
+
+
+def get_mne_latency(
+    mode: str, buffer_seconds: float, tim: float = 4.0, repeats: int = 50
+) -> dict:
+    """get_mne(tim=...) duration against the amount of buffered data
+
+    Parameters
+    ----------
+    mode: str
+        acquisition mode, accumulate or roll
+    buffer_seconds: float
+        recorded seconds (accumulate) or roll buffer length (roll)
+    tim: float
+        window requested from get_mne
+    repeats: int
+        number of reads timed
+
+    Returns
+    -------
+    dict
+        duration statistics in seconds
+    """
+    buffer_samples = int(250 * buffer_seconds)
+    eeg, mgr, timed = _start(mode, buffer_samples, None)
+    try:
+        _fill(mgr, buffer_samples if mode == "accumulate" else int(250 * tim))
+        eeg.stop_acquisition()
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            eeg.get_mne(tim=tim)
+            durations.append(time.perf_counter() - start)
+        return _summary(durations)
+    finally:
+        mgr.destroy()
+        eeg.close()
+
+
+def run(buffer_seconds: tuple = (60, 600, 1800), latency_duration: float = 5.0) -> dict:
+    """Runs all acquisition benchmarks for both modes
+
+    Parameters
+    ----------
+    buffer_seconds: tuple
+        buffer lengths to measure callback and get_mne cost at
+    latency_duration: float
+        seconds streamed in real time for the latency measurement
+
+    Returns
+    -------
+    dict
+        results keyed by benchmark, mode and buffer length
+    """
+    results: dict = {"callback": {}, "consumer_latency": {}, "get_mne": {}}
+    for mode in ("accumulate", "roll"):
+        results["callback"][mode] = {
+            str(s): callback_cost(mode, s) for s in buffer_seconds
+        }
+        results["consumer_latency"][mode] = consumer_latency(mode, latency_duration)
+        results["get_mne"][mode] = {
+            str(s): get_mne_latency(mode, s) for s in buffer_seconds
+        }
+    return results
+
+
+def main():
+    res = run()
+    for bench in ("callback", "get_mne"):
+        for mode, by_length in res[bench].items():
+            for length, stats in by_length.items():
+                if not stats["n"]:
+                    print(f"{bench:10s} {mode:10s} buffer={length:>5s}s  no samples")
+                    continue
+                print(
+                    f"{bench:10s} {mode:10s} buffer={length:>5s}s  "
+                    f"p50: {stats['p50'] * 1e6:9.1f} us  "
+                    f"p99: {stats['p99'] * 1e6:9.1f} us"
+                )
+    for mode, stats in res["consumer_latency"].items():
+        if not stats["n"]:
+            print(f"latency    {mode:10s}  no samples")
+            continue
+        print(
+            f"latency    {mode:10s}  "
+            f"p50: {stats['p50'] * 1e3:6.2f} ms  p99: {stats['p99'] * 1e3:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
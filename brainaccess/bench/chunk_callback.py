@@ -0,0 +1,101 @@
+""" Chunk callback benchmark
+
+Measures the cost of converting one native chunk to the representation
+passed to the chunk callback, as a nested list and as a numpy array.
+A synthetic chunk with the default acquisition layout is used
+(8 electrodes, 3 accelerometer axes, digital input and sample number).
+
+Run with ``python -m brainaccess.bench.chunk_callback``
+"""
+
+import ctypes
+import time
+
+import numpy as np
+
+from brainaccess.core.eeg_manager import _types_map, _chunk_to_list, _chunk_to_numpy
+
+# type codes as reported by ba_eeg_manager_get_stream_channel_data_types
+_FLOAT, _BOOL, _SIZE_T, _DOUBLE = 0, 1, 2, 3
+_CTYPES = {
+    _FLOAT: ctypes.c_float,
+    _BOOL: ctypes.c_bool,
+    _SIZE_T: ctypes.c_size_t,
+    _DOUBLE: ctypes.c_double,
+}
+DEFAULT_LAYOUT = [_SIZE_T] + [_DOUBLE] * 8 + [_BOOL] + [_FLOAT] * 3
+
+
+def make_chunk(chunk_size: int = 25, layout: list = DEFAULT_LAYOUT):
+    """Builds a synthetic native chunk
+
+    Parameters
+    ----------
+    chunk_size: int
+        samples per channel
+    layout: list
+        type code of every channel in chunk order
+
+    Returns
+    -------
+    tuple
+        (chunk_data pointer array, types, owned buffers)
+        the buffers must be kept alive while chunk_data is used
+    """
+    buffers = [(_CTYPES[code] * chunk_size)() for code in layout]
+    for i, buf in enumerate(buffers):
+        for j in range(chunk_size):
+            buf[j] = (i + j) % 2 if layout[i] == _BOOL else i + j
+    chunk_data = (ctypes.c_void_p * len(buffers))(
+        *[ctypes.addressof(buf) for buf in buffers]
+    )
+    types = [_types_map[code] for code in layout]
+    return chunk_data, types, buffers
+
+
+def _time_per_call(f, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        f()
+    return (time.perf_counter() - start) / repeats
+
+
+def run(chunk_size: int = 25, repeats: int = 2000) -> dict:
+    """Times both chunk conversions
+
+    Parameters
+    ----------
+    chunk_size: int
+        samples per channel
+    repeats: int
+        number of conversions to average over
+
+    Returns
+    -------
+    dict
+        seconds per chunk for the list and numpy conversions
+    """
+    chunk_data, types, buffers = make_chunk(chunk_size)
+    out = np.empty((len(types), chunk_size))
+    as_list = _time_per_call(
+        lambda: _chunk_to_list(chunk_data, chunk_size, types), repeats
+    )
+    as_numpy = _time_per_call(
+        lambda: _chunk_to_numpy(chunk_data, chunk_size, types, out), repeats
+    )
+    return {"chunk_size": chunk_size, "list": as_list, "numpy": as_numpy}
+
+
+def main():
+    for chunk_size in (25, 100):
+        res = run(chunk_size)
+        print(
+            f"chunk_size={chunk_size:4d}  "
+            f"list: {res['list'] * 1e6:8.1f} us  "
+            f"numpy: {res['numpy'] * 1e6:8.1f} us  "
+            f"speedup: {res['list'] / res['numpy']:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
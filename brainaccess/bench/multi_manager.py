@@ -0,0 +1,188 @@
+""" Multi-manager dispatch benchmark
+
+Delivers chunks from 1 to 8 managers concurrently, one thread per manager as
+with several connected headsets, to a consumer that copies every chunk into
+its own ChunkRingBuffer, as the acquisition callback does, and reports the
+total chunk throughput. The same run with every dispatch wrapped in one
+shared lock reproduces the former global registry lock for comparison.
+
+Two backends are measured, the report names the one used:
+
+- ``native``, with the BrainAccess core library: the native chunk callback
+  of created (not connected) EEGManagers is driven with a synthetic chunk,
+  measuring the registry lookup, the chunk conversion and the consumer copy.
+- ``simulated``, without the library: SimulatedEEGManagers are stepped
+  instead. This runs headless, but measures the simulator delivery including
+  its data generation, not the native dispatch path.
+
+The consumer copy holds the GIL, so the total throughput is bounded by one
+core with either dispatch. What scales is the absence of contention: adding
+managers must not lower the total, while the global lock adds its own
+overhead on top of the GIL. Linear scaling needs consumers that release the
+GIL (e.g. I/O) and is not measured here.
+
+Run with ``python -m brainaccess.bench.multi_manager``
+"""
+
+import threading
+import time
+
+import brainaccess.core as bacore
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.core.eeg_manager import EEGManager, _callback_chunk
+from brainaccess.core.stream_layout import StreamLayout
+from brainaccess.bench.chunk_callback import make_chunk, DEFAULT_LAYOUT
+from brainaccess.utils.ring_buffer import ChunkRingBuffer
+from brainaccess.utils.simulation import SimulatedEEGManager
+
+# channels of DEFAULT_LAYOUT, enabled on simulated managers
+_CHANNELS = (
+    [eeg_channel.SAMPLE_NUMBER]
+    + [eeg_channel.ELECTRODE_MEASUREMENT + i for i in range(8)]
+    + [eeg_channel.DIGITAL_INPUT]
+    + [eeg_channel.ACCELEROMETER + i for i in range(3)]
+)
+
+
+def _drive(deliver, duration, counts, idx, lock):
+    n = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        if lock is None:
+            deliver()
+        else:
+            with lock:
+                deliver()
+        n += 1
+    counts[idx] = n
+
+
+def _native_managers(n_devices: int, chunk_size: int) -> tuple:
+    chunk_data, _, buffers = make_chunk(chunk_size)
+    managers = [EEGManager() for _ in range(n_devices)]
+    deliveries = []
+    for mgr in managers:
+        mgr._stream_layout = StreamLayout({}, DEFAULT_LAYOUT)
+        ring = ChunkRingBuffer(len(DEFAULT_LAYOUT), 250 * 10)
+        mgr.set_callback_chunk(ring.write, as_numpy=True)
+        key = mgr._manager
+        # buffers keep the chunk alive while it is delivered
+        deliveries.append(
+            lambda key=key, buffers=buffers: _callback_chunk(chunk_data, chunk_size, key)
+        )
+    return managers, deliveries
+
+
+def _simulated_managers(n_devices: int, chunk_size: int) -> tuple:
+    managers = [
+        SimulatedEEGManager(chunk_size=chunk_size, speed=None, seed=i)
+        for i in range(n_devices)
+    ]
+    for mgr in managers:
+        for channel in _CHANNELS:
+            mgr.set_channel_enabled(channel, True)
+        ring = ChunkRingBuffer(len(_CHANNELS), 250 * 10)
+        mgr.set_callback_chunk(ring.write, as_numpy=True)
+    return managers, [mgr.step for mgr in managers]
+
+
+def run(
+    n_devices: int,
+    duration: float = 1.0,
+    chunk_size: int = 25,
+    global_lock: bool = False,
+    backend: str = "simulated",
+) -> float:
+    """Measures chunk throughput of several managers
+
+    Parameters
+    ----------
+    n_devices: int
+        number of managers, each driven by its own thread
+    duration: float
+        seconds to run
+    chunk_size: int
+        samples per chunk
+    global_lock: bool
+        serialize all dispatches on one lock
+    backend: str
+        native (the core library must be initialized) or simulated
+
+    Returns
+    -------
+    float
+        chunks per second over all managers
+    """
+    if backend == "native":
+        managers, deliveries = _native_managers(n_devices, chunk_size)
+    elif backend == "simulated":
+        managers, deliveries = _simulated_managers(n_devices, chunk_size)
+    else:
+        raise ValueError(f"Unknown backend {backend}")
+    try:
+        counts = [0] * n_devices
+        lock = threading.Lock() if global_lock else None
+        threads = [
+            threading.Thread(target=_drive, args=(deliver, duration, counts, i, lock))
+            for i, deliver in enumerate(deliveries)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sum(counts) / duration
+    finally:
+        for mgr in managers:
+            mgr.set_callback_chunk(None)
+            mgr.destroy()
+
+
+def run_all(max_devices: int = 8, duration: float = 1.0) -> dict:
+    """Runs the benchmark for 1 to max_devices managers, with the native
+    backend if the core library is installed
+
+    Parameters
+    ----------
+    max_devices: int
+        largest number of managers
+    duration: float
+        seconds per run
+
+    Returns
+    -------
+    dict
+        backend and chunks per second with per-manager dispatch and with a
+        global lock, keyed by number of managers
+    """
+    backend = "native" if bacore.available() else "simulated"
+    results: dict = {"backend": backend, "devices": {}}
+    if backend == "native":
+        bacore.init(bacore.Version(2, 0, 0))
+    try:
+        for n in range(1, max_devices + 1):
+            results["devices"][str(n)] = {
+                "per_manager": run(n, duration, backend=backend),
+                "global_lock": run(n, duration, global_lock=True, backend=backend),
+            }
+    finally:
+        if backend == "native":
+            bacore.close()
+    return results
+
+
+def main():
+    res = run_all()
+    print(f"backend: {res['backend']}")
+    base = None
+    for n, stats in res["devices"].items():
+        free = stats["per_manager"]
+        base = base or free
+        print(
+            f"devices={n}  "
+            f"per-manager: {free:10.0f} chunks/s ({free / base:4.2f}x)  "
+            f"global lock: {stats['global_lock']:10.0f} chunks/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
-from brainaccess.libload import load_library
+from brainaccess.libload import LazyLibrary
 
-_dll = load_library("babciconnect")
+# loaded on the first call, see LazyLibrary
+_dll = LazyLibrary("babciconnect")
@@ -1,7 +1,8 @@
 import ctypes
-from brainaccess.libload import load_library
+from brainaccess.libload import LazyLibrary
 
-_dll = load_library("bacore")
+# loaded on the first call, see LazyLibrary
+_dll = LazyLibrary("bacore")
 
 from brainaccess.core.version import Version
 
@@ -17,6 +18,18 @@ _dll.ba_core_get_version.argtypes = []
 _dll.ba_core_get_version.restype = ctypes.POINTER(Version)
 
 
+def available():
+    """Checks whether the native library is installed
+
+    Returns
+    -------
+    bool
+        True if the library can be loaded. Without it only the simulated and
+        replayed managers in brainaccess.utils work.
+    """
+    return _dll.available
+
+
 def init(expected_version):
     """Initializes the library
     This function reads the config file, starts logging, etc. It first
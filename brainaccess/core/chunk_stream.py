@@ -0,0 +1,157 @@
+import asyncio
+import collections
+import threading
+from enum import Enum
+
+import numpy as np
+
+
+class OverflowPolicy(Enum):
+    """What a chunk stream does when its queue is full
+
+    Attributes
+    ------------
+    BLOCK
+        The producer waits until the consumer takes a chunk. This blocks the
+        reader thread and therefore communication with the device, opt in
+        only if the consumer is guaranteed to keep iterating.
+    DROP_OLDEST
+        The oldest queued chunk is discarded (default)
+    COALESCE
+        The new chunk is appended to the newest queued chunk, no data is lost
+        but the consumer receives fewer, larger chunks
+    """
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ChunkStream:
+    """Asynchronous iterator over the chunks of a manager.
+
+    Chunks are numpy arrays of shape (channels, chunk_size) delivered on the
+    event loop that created the stream. The stream owns the manager's chunk
+    callback until it is closed.
+
+    Examples
+    --------
+    >>> async with mgr.stream(maxsize=32, overflow="drop_oldest") as chunks:
+    ...     async for chunk in chunks:
+    ...         process(chunk)
+    """
+
+    def __init__(
+        self, mgr, maxsize: int = 64, overflow=OverflowPolicy.DROP_OLDEST
+    ) -> None:
+        """Creates stream and registers it as the manager's chunk callback
+
+        Warning
+        -------
+        Must be called from a coroutine, the running event loop receives the chunks
+
+        Parameters
+        ----------
+        mgr
+            EEG manager providing the chunks
+        maxsize: int
+            Maximum number of queued chunks
+        overflow: OverflowPolicy or str
+            What to do when the queue is full
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize: int = maxsize
+        self.overflow: OverflowPolicy = OverflowPolicy(overflow)
+        self.dropped: int = 0
+        self.coalesced: int = 0
+        self._mgr = mgr
+        self._loop = asyncio.get_running_loop()
+        self._queue: collections.deque = collections.deque()
+        self._mtx = threading.Lock()
+        self._not_full = threading.Condition(self._mtx)
+        self._waiter = None
+        self._closed = False
+        mgr.set_callback_chunk(self._put, as_numpy=True)
+
+    def _put(self, chunk, chunk_size):
+        # runs in the reader thread
+        chunk = chunk.copy()
+        with self._mtx:
+            if self._closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == OverflowPolicy.BLOCK:
+                    while len(self._queue) >= self.maxsize and not self._closed:
+                        self._not_full.wait()
+                    if self._closed:
+                        return
+                elif self.overflow == OverflowPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    chunk = np.concatenate((self._queue.pop(), chunk), axis=1)
+                    self.coalesced += 1
+            self._queue.append(chunk)
+            waiter = self._waiter
+            self._waiter = None
+        if waiter is not None:
+            self._notify(waiter)
+
+    def _notify(self, waiter):
+        try:
+            self._loop.call_soon_threadsafe(_wake, waiter)
+        except RuntimeError:
+            # the consumer's event loop is closed, nobody will read again
+            with self._mtx:
+                self._closed = True
+                self._not_full.notify_all()
+
+    def qsize(self) -> int:
+        """Number of chunks waiting to be consumed"""
+        return len(self._queue)
+
+    def close(self) -> None:
+        """Stops the stream and releases the manager's chunk callback.
+        Chunks already queued can still be consumed.
+        """
+        with self._mtx:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_full.notify_all()
+            waiter = self._waiter
+            self._waiter = None
+        if waiter is not None:
+            self._notify(waiter)
+        # after waking the producer, it may be holding the callback lock
+        self._mgr.set_callback_chunk(None)
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> np.ndarray:
+        while True:
+            with self._mtx:
+                if self._queue:
+                    chunk = self._queue.popleft()
+                    self._not_full.notify()
+                    return chunk
+                if self._closed:
+                    raise StopAsyncIteration
+                waiter = self._loop.create_future()
+                self._waiter = waiter
+            await waiter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
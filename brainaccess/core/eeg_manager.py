@@ -4,6 +4,7 @@ import asyncio
 import threading
 import copy
 
+import numpy as np
 from multimethod import multimethod
 
 from brainaccess.core import _dll
@@ -14,6 +15,9 @@ from brainaccess.core.gain_mode import GainMode
 from brainaccess.core.impedance_measurement_mode import ImpedanceMeasurementMode
 from brainaccess.core.annotation import Annotation
 from brainaccess.core.polarity import Polarity
+from brainaccess.core.stream_layout import StreamLayout
+from brainaccess.core.chunk_stream import ChunkStream, OverflowPolicy
+import brainaccess.core.eeg_channel as eeg_channel
 
 
 # ctypes
@@ -167,9 +171,28 @@ _dll.ba_eeg_manager_get_stream_channel_data_types.argtypes = [
 _dll.ba_eeg_manager_get_stream_channel_data_types.restype = None
 
 
+# The registry is replaced on every change and never mutated, so native
+# callbacks read it without locking. The mutex only serializes updates.
 _managers_mtx = threading.Lock()
 _managers: dict = dict()
 
+
+def _register_manager(key, mgr):
+    global _managers
+    with _managers_mtx:
+        managers = dict(_managers)
+        managers[key] = mgr
+        _managers = managers
+
+
+def _unregister_manager(key):
+    global _managers
+    with _managers_mtx:
+        managers = dict(_managers)
+        del managers[key]
+        _managers = managers
+
+
 _types_map = [
     ctypes.POINTER(ctypes.c_float),  # 0
     ctypes.POINTER(ctypes.c_bool),   # 1
@@ -177,68 +200,78 @@ _types_map = [
     ctypes.POINTER(ctypes.c_double), # 3
 ]
 
-# TODO: look into the possibility of moving callbacks to async loop with call_soon_threadsafe()
-
 
 @ctypes.CFUNCTYPE(
     None, ctypes.POINTER(ctypes.c_void_p), ctypes.c_size_t, ctypes.c_void_p
 )
 def _callback_chunk(chunk_data, chunk_size, data):
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr != None:
-            with mgr._callback_chunk_mtx:
-                cbk = mgr._callback_chunk
-                if cbk != None:
-                    # Get channel sizes and type information
-                    types_ptr = ctypes.POINTER(ctypes.c_uint8)()
-                    types_size = ctypes.c_size_t()
-                    _dll.ba_eeg_manager_get_stream_channel_data_types(
-                        data, ctypes.pointer(types_ptr), ctypes.pointer(types_size)
-                    )
-                    types = [_types_map[types_ptr[i]] for i in range(types_size.value)]
-                    # Convert chunk data to Python list and pass to manager
-                    chunk_list = [
-                        [
-                            ctypes.cast(chunk_data[i], types[i])[j]
-                            for j in range(chunk_size)
-                        ]
-                        for i in range(len(types))
-                    ]
-                    cbk(chunk_list, chunk_size)
+    mgr = _managers.get(data)
+    if mgr != None:
+        with mgr._callback_chunk_mtx:
+            cbk = mgr._callback_chunk
+            if cbk != None:
+                # Channel layout is resolved once per stream
+                layout = mgr._stream_layout
+                if layout is None:
+                    layout = mgr._resolve_stream_layout()
+                types = layout.types
+                if mgr._callback_chunk_as_numpy:
+                    # Reuse one array for as long as the chunk shape holds
+                    out = mgr._chunk_array
+                    if out is None or out.shape != (len(types), chunk_size):
+                        out = np.empty((len(types), chunk_size))
+                        mgr._chunk_array = out
+                    cbk(_chunk_to_numpy(chunk_data, chunk_size, types, out), chunk_size)
+                else:
+                    cbk(_chunk_to_list(chunk_data, chunk_size, types), chunk_size)
+
+
+def _chunk_to_list(chunk_data, chunk_size, types):
+    """Converts native chunk data to a nested list (channels x samples)"""
+    return [
+        [ctypes.cast(chunk_data[i], types[i])[j] for j in range(chunk_size)]
+        for i in range(len(types))
+    ]
+
+
+def _chunk_to_numpy(chunk_data, chunk_size, types, out):
+    """Copies native chunk data into a preallocated (channels x samples) array"""
+    for i in range(len(types)):
+        out[i] = np.ctypeslib.as_array(
+            ctypes.cast(chunk_data[i], types[i]), shape=(chunk_size,)
+        )
+    return out
 
 
 @ctypes.CFUNCTYPE(None, ctypes.POINTER(BatteryInfo), ctypes.c_void_p)
 def _callback_battery(b_info, data):
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr != None:
-            with mgr._callback_battery_mtx:
-                cbk = mgr._callback_battery
-                if cbk != None:
-                    cbk(copy.copy(b_info[0]))
+    mgr = _managers.get(data)
+    if mgr != None:
+        with mgr._callback_battery_mtx:
+            cbk = mgr._callback_battery
+            if cbk != None:
+                cbk(copy.copy(b_info[0]))
 
 
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p)
 def _callback_disconnect(data):
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr != None:
-            with mgr._future_map_mtx:
-                mgr._future_index = 0
-                del_list = []
-                for k, v in mgr._future_map.items():
-                    _, loop, future = v
-                    loop.call_soon_threadsafe(
-                        future.set_exception, RuntimeError("Disconnected")
-                    )
-                    del_list.append(k)
-                for item in del_list:
-                    del mgr._future_map[item]
-            with mgr._callback_disconnect_mtx:
-                cbk = mgr._callback_disconnect
-                if cbk != None:
-                    cbk()
+    mgr = _managers.get(data)
+    if mgr != None:
+        with mgr._future_map_mtx:
+            mgr._future_index = 0
+            del_list = []
+            for k, v in mgr._future_map.items():
+                _, loop, future = v
+                loop.call_soon_threadsafe(
+                    future.set_exception, RuntimeError("Disconnected")
+                )
+                del_list.append(k)
+            for item in del_list:
+                del mgr._future_map[item]
+        with mgr._callback_disconnect_mtx:
+            cbk = mgr._callback_disconnect
+            if cbk != None:
+                cbk()
 
 
 class _FutureStruct(ctypes.Structure):
@@ -247,15 +280,14 @@ class _FutureStruct(ctypes.Structure):
 
 def _handle_future(data, arg):
     my_data = ctypes.cast(data, ctypes.POINTER(_FutureStruct))[0]
-    with _managers_mtx:
-        mgr = _managers.get(my_data.manager_ptr)
-        if mgr != None:
-            with mgr._future_map_mtx:
-                future_obj = mgr._future_map.get(my_data.future_index)
-                if future_obj != None:
-                    _, loop, future = future_obj
-                    del mgr._future_map[my_data.future_index]
-                    loop.call_soon_threadsafe(future.set_result, arg)
+    mgr = _managers.get(my_data.manager_ptr)
+    if mgr != None:
+        with mgr._future_map_mtx:
+            future_obj = mgr._future_map.get(my_data.future_index)
+            if future_obj != None:
+                _, loop, future = future_obj
+                del mgr._future_map[my_data.future_index]
+                loop.call_soon_threadsafe(future.set_result, arg)
 
 
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p)
@@ -323,8 +355,13 @@ class EEGManager:
         self._future_map_mtx = threading.Lock()
         self._future_map = {}
         self._future_index = 0
-        with _managers_mtx:
-            _managers[self._manager] = self
+        self._callback_chunk = None
+        self._callback_battery = None
+        self._callback_chunk_as_numpy = False
+        self._chunk_array = None
+        self._enabled_channels = set()
+        self._stream_layout = None
+        _register_manager(self._manager, self)
 
         self._callback_disconnect = None
         _dll.ba_eeg_manager_set_callback_disconnect(
@@ -345,9 +382,15 @@ class EEGManager:
         Must be called exactly once, after the manager is no longer needed
         """
         self.disconnect()  # prevent callback deadlock by disconnecting first.
-        with _managers_mtx:
-            _dll.ba_eeg_manager_free(self._manager)
-            del _managers[self._manager]
+        _unregister_manager(self._manager)
+        # Callbacks that looked the manager up before it was unregistered may
+        # still be running, wait for them and disarm them before freeing.
+        with self._callback_chunk_mtx, self._callback_battery_mtx:
+            self._callback_chunk = None
+            self._callback_battery = None
+            with self._future_map_mtx:
+                self._future_map.clear()
+                _dll.ba_eeg_manager_free(self._manager)
 
     def _create_future(self):
         loop = asyncio.get_running_loop()
@@ -365,6 +408,31 @@ class EEGManager:
 
         return future, ctypes.pointer(struct)
 
+    def _resolve_stream_layout(self):
+        types_ptr = ctypes.POINTER(ctypes.c_uint8)()
+        types_size = ctypes.c_size_t()
+        _dll.ba_eeg_manager_get_stream_channel_data_types(
+            self._manager, ctypes.pointer(types_ptr), ctypes.pointer(types_size)
+        )
+        type_codes = [types_ptr[i] for i in range(types_size.value)]
+        indexes = {}
+        for channel in self._enabled_channels | {eeg_channel.SAMPLE_NUMBER}:
+            try:
+                indexes[channel] = self.get_channel_index(channel)
+            except IndexError:
+                pass
+        layout = StreamLayout(indexes, type_codes)
+        self._stream_layout = layout
+        return layout
+
+    def _on_stream_started(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self._resolve_stream_layout()
+
+    def _on_stream_stopped(self, future):
+        self._stream_layout = None
+        self._enabled_channels = set()
+
     def connect(self, port: str):
         """Connects to a device via COM port and attempts to initialize it.
 
@@ -432,9 +500,24 @@ class EEGManager:
                 struct_ptr,
             )
         )
+        future.add_done_callback(self._on_stream_started)
 
         return future
 
+    @property
+    def stream_layout(self):
+        """Channel layout of the running stream
+
+        Resolved once the future returned by start_stream completes and
+        cleared when the stream stops.
+
+        Returns
+        -------
+        StreamLayout
+            channel IDs, chunk indexes and data types, None if not streaming
+        """
+        return self._stream_layout
+
     def stop_stream(self):
         """Stops streaming data from the device
 
@@ -464,6 +547,7 @@ class EEGManager:
                 struct_ptr,
             )
         )
+        future.add_done_callback(self._on_stream_stopped)
 
         return future
 
@@ -600,6 +684,10 @@ class EEGManager:
             True to enable channel, False to disable.
 
         """
+        if state:
+            self._enabled_channels.add(channel)
+        else:
+            self._enabled_channels.discard(channel)
         _dll.ba_eeg_manager_set_channel_enabled(
             self._manager, ctypes.c_uint16(channel), ctypes.c_bool(state)
         )
@@ -757,7 +845,7 @@ class EEGManager:
         """
         return _dll.ba_eeg_manager_get_sample_frequency(self._manager)
 
-    def set_callback_chunk(self, f):
+    def set_callback_chunk(self, f, as_numpy: bool = False):
         """Sets a callback to be called every time a chunk is available
 
         Warning
@@ -767,18 +855,53 @@ class EEGManager:
         itself must be as short as possible to avoid blocking communication
         with the device.
 
+        In numpy mode the same array is reused for every chunk, copy it if
+        the data must outlive the callback. To keep the callback short,
+        ``brainaccess.utils.ring_buffer.ChunkRingBuffer.write`` can be used
+        as the callback and the data read from other threads.
+
         Parameters
         ------------
         f
             callback Function to be called every time a chunk is available
             Set to null to disable.
+        as_numpy: bool
+            If True the chunk is passed as a float64 numpy array of shape
+            (channels, chunk_size) instead of a nested list
         """
         with self._callback_chunk_mtx:
             self._callback_chunk = f
+            self._callback_chunk_as_numpy = as_numpy
             _dll.ba_eeg_manager_set_callback_chunk(
                 self._manager, _callback_chunk if f != None else None, self._manager
             )
 
+    def stream(self, maxsize: int = 64, overflow=OverflowPolicy.DROP_OLDEST):
+        """Streams chunks to the running event loop
+
+        The chunk callback is taken over by the stream, which hands chunks
+        from the reader thread to the event loop with call_soon_threadsafe.
+
+        Warning
+        -------
+        Must be called from a coroutine. Replaces the chunk callback until the
+        stream is closed.
+
+        Parameters
+        ----------
+        maxsize: int
+            Maximum number of chunks queued for the consumer
+        overflow: OverflowPolicy or str
+            What to do when the queue is full: "drop_oldest" (default),
+            "coalesce" or "block", which stalls the reader thread while full
+
+        Returns
+        -------
+        ChunkStream
+            async iterator of numpy arrays (channels, chunk_size)
+        """
+        return ChunkStream(self, maxsize=maxsize, overflow=overflow)
+
     def set_callback_battery(self, f):
         """Sets a callback to be called every time the battery status is updated
 
@@ -839,13 +962,19 @@ class EEGManager:
             self._manager, ctypes.c_char_p(annotation.encode("ascii"))
         )
 
-    def get_annotations(self):
-        """Retrieve all the accumulated annotations
+    def get_annotations(self, start: int = 0):
+        """Retrieve the accumulated annotations
 
         Warning
         ---------
         Annotations are cleared on disconnect
 
+        Parameters
+        -----------
+        start: int
+            index of the first annotation to retrieve, annotations before it
+            (e.g. already retrieved ones) are not copied
+
         Returns
         -------
         list
@@ -856,7 +985,7 @@ class EEGManager:
         _dll.ba_eeg_manager_get_annotations(
             self._manager, ctypes.pointer(ae), ctypes.pointer(size)
         )
-        return [ae[i] for i in range(size.value)]
+        return [ae[i] for i in range(start, size.value)]
 
     def clear_annotations(self):
         """Clears annotations"""
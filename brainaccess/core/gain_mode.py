@@ -52,8 +52,17 @@ def gain_mode_to_multiplier(gain_mode):
     """
     return _dll.ba_gain_mode_to_multiplier(ctypes.c_uint8(gain_mode.value))
 
-_dll.ba_multiplier_to_gain_mode.argtypes = [ctypes.c_int]
-_dll.ba_multiplier_to_gain_mode.restype = ctypes.c_uint8
+# same mapping as the library, in Python so that the simulated managers
+# work without it
+_GAIN_MODES = {
+    1: GainMode.X1,
+    2: GainMode.X2,
+    4: GainMode.X4,
+    6: GainMode.X6,
+    8: GainMode.X8,
+    12: GainMode.X12,
+    24: GainMode.X24,
+}
 def multiplier_to_gain_mode(multiplier):
     """Converts multiplier to the gain mode
 
@@ -64,5 +73,6 @@ def multiplier_to_gain_mode(multiplier):
     Returns
     -------
     GainMode
+        UNKNOWN for unsupported multipliers
     """
-    return GainMode(_dll.ba_multiplier_to_gain_mode(ctypes.c_int(multiplier)))
+    return _GAIN_MODES.get(multiplier, GainMode.UNKNOWN)
@@ -0,0 +1,83 @@
+import ctypes
+
+import numpy as np
+
+# Indexed by the type codes of ba_eeg_manager_get_stream_channel_data_types
+_ctypes_map = [
+    ctypes.c_float,  # 0
+    ctypes.c_bool,  # 1
+    ctypes.c_size_t,  # 2
+    ctypes.c_double,  # 3
+]
+
+
+class StreamLayout:
+    """Object describing the channel layout of a running stream
+
+    The layout cannot change while the stream is running, so it is resolved
+    once on stream start instead of on every chunk.
+
+    Attributes
+    ----------
+    channels
+        Channel ID (brainaccess.core.eeg_channel) of every chunk row, in chunk
+        order. None for rows whose channel ID is not known.
+    indexes
+        Dictionary mapping channel ID to its index into the chunk
+    type_codes
+        Native type code of every chunk row
+    types
+        ctypes pointer type of every chunk row
+    dtypes
+        numpy dtype of every chunk row
+    strides
+        Size of one sample in bytes of every chunk row
+    """
+
+    def __init__(self, indexes: dict, type_codes: list):
+        """Creates a stream layout
+
+        Parameters
+        ----------
+        indexes: dict
+            channel ID to chunk index
+        type_codes: list
+            native type code of every chunk row
+        """
+        self.indexes: dict = dict(indexes)
+        self.type_codes: list = list(type_codes)
+        self.channels: list = [None] * len(self.type_codes)
+        for channel, index in self.indexes.items():
+            self.channels[index] = channel
+        self.types: list = [ctypes.POINTER(_ctypes_map[t]) for t in self.type_codes]
+        self.dtypes: list = [np.dtype(_ctypes_map[t]) for t in self.type_codes]
+        self.strides: list = [ctypes.sizeof(_ctypes_map[t]) for t in self.type_codes]
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def __repr__(self):
+        return f"StreamLayout(channels={self.channels})"
+
+    @property
+    def n_channels(self) -> int:
+        """Number of rows in a chunk"""
+        return len(self.type_codes)
+
+    def index(self, channel: int) -> int:
+        """Gets the index of a channel's data into the chunk
+
+        Parameters
+        ----------
+        channel: int
+            Channel ID (brainaccess.core.eeg_channel)
+
+        Returns
+        -------
+        int
+            Index into chunk representing a channel
+        """
+        try:
+            return self.indexes[channel]
+        except KeyError:
+            raise IndexError("Channel does not exist or is not currently streaming")
@@ -1,5 +1,6 @@
 import platform
 import ctypes
+import typing
 
 from ctypes.util import find_library
 from os import listdir, getcwd
@@ -35,3 +36,82 @@ def load_library(name: str) -> ctypes.CDLL:
                     raise RuntimeError("Could not find " + dll_name)
     except OSError:
         raise RuntimeError("Could not load " + dll_name)
+
+
+class _LazyFunction:
+    """Stands in for a library function until the library is loaded,
+    remembering the argtypes and restype set on it"""
+
+    def __init__(self, library: "LazyLibrary", name: str) -> None:
+        self.__dict__["_library"] = library
+        self.__dict__["_name"] = name
+        self.__dict__["_attributes"] = {}
+
+    def __setattr__(self, attr: str, value) -> None:
+        self._attributes[attr] = value
+
+    def __getattr__(self, attr: str):
+        if attr in self._attributes:
+            return self._attributes[attr]
+        return getattr(self._library._resolve(self._name), attr)
+
+    def __call__(self, *args):
+        return self._library._resolve(self._name)(*args)
+
+
+class LazyLibrary:
+    """Shared library loaded on the first function call.
+
+    Modules declare argtypes and restype at import time as with a
+    ctypes.CDLL, so importing brainaccess (e.g. the enums, StreamLayout or
+    the simulated device) works on machines without the native library.
+    load_library errors are raised by the first call instead.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._lib: typing.Optional[ctypes.CDLL] = None
+        self._functions: dict = {}
+
+    @property
+    def loaded(self) -> bool:
+        """True once the library was loaded"""
+        return self._lib is not None
+
+    @property
+    def available(self) -> bool:
+        """True if the library can be loaded, loads it if not loaded yet"""
+        try:
+            self.load()
+        except RuntimeError:
+            return False
+        return True
+
+    def load(self) -> ctypes.CDLL:
+        """Loads the library and applies the declared function types"""
+        if self._lib is None:
+            lib = load_library(self._name)
+            for name, function in self._functions.items():
+                real = getattr(lib, name)
+                for attr, value in function._attributes.items():
+                    setattr(real, attr, value)
+                # later lookups skip __getattr__ and the stand-in
+                self.__dict__[name] = real
+            self._lib = lib
+        return self._lib
+
+    def _resolve(self, name: str):
+        self.load()
+        return self.__dict__[name] if name in self.__dict__ else getattr(self._lib, name)
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if self._lib is not None:
+            real = getattr(self._lib, name)
+            self.__dict__[name] = real
+            return real
+        function = self._functions.get(name)
+        if function is None:
+            function = self._functions[name] = _LazyFunction(self, name)
+        return function
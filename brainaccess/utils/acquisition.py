@@ -1,4 +1,5 @@
 import asyncio
+import concurrent.futures
 import typing
 import time
 import brainaccess.core as bacore
@@ -6,14 +7,31 @@ import brainaccess.core.eeg_channel as eeg_channel
 from brainaccess.core.gain_mode import GainMode, multiplier_to_gain_mode
 from brainaccess.core.eeg_manager import EEGManager
 from brainaccess.core.impedance_measurement_mode import ImpedanceMeasurementMode
+from brainaccess.utils.annotations import AnnotationStore
+from brainaccess.utils.impedance import (
+    BOARD_RESISTOR_OHMS,
+    IMPEDANCE_DRIVE_AMPS,
+    ImpedanceEstimator,
+    impedance_from_std,
+)
+from brainaccess.utils.gap_detection import SampleGapDetector, pad_gaps
+from brainaccess.utils.ring_buffer import BufferOverrun, ChunkRingBuffer, SeqLock
+from brainaccess.utils.network import StreamServer
+from brainaccess.utils.recorder import StreamRecorder
+from brainaccess.utils.shared_stream import SharedRingBuffer
+from brainaccess.utils.subscription import ChunkFanout, Subscription
+from brainaccess.utils.storage import (
+    ArrayStorage,
+    MemmapStorage,
+    run_directory,
+    compact_dtype,
+    row_groups,
+)
 import threading
 import numpy as np
 import mne  # type: ignore
 import pathlib
 
-IMPEDANCE_DRIVE_AMPS = 6.0e-9  # 6 nA
-BOARD_RESISTOR_OHMS = 2 * 4.7e3  # 4.7 kOhm
-
 
 class EEG:
     """EEG acquisition class. Gathers data from brainaccess core and converts to MNE structure."""
@@ -38,7 +56,66 @@ class EEG:
         self.bias_channels: typing.Optional[list] = None
         self.mode: str = mode
         self.gain: GainMode = GainMode.X8
-        bacore.init(bacore.Version(2, 0, 0))
+        self.gaps: SampleGapDetector = SampleGapDetector()
+        self.gap_padding: bool = False
+        self.recorder: typing.Optional[StreamRecorder] = None
+        self._ingest_rows: typing.Optional[list] = None
+        self.impedance_estimator: typing.Optional[ImpedanceEstimator] = None
+        self.processing: list = []
+        self._filtered: typing.Optional[ChunkRingBuffer] = None
+        # (stages, filtered buffer) swapped as one by set_processing
+        self._pipeline: typing.Optional[tuple] = None
+        self._filtered_lock = threading.Lock()
+        self.fanout: typing.Optional[ChunkFanout] = None
+        self.shared: typing.Optional[SharedRingBuffer] = None
+        self._shared_lock = threading.Lock()
+        self.server: typing.Optional[StreamServer] = None
+        self.flush_interval: float = 5.0
+        self._flush_task: typing.Optional[asyncio.Task] = None
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: typing.Optional[threading.Thread] = None
+        # the simulated and replayed managers run without the native library
+        self._core_initialized: bool = bacore.available()
+        if self._core_initialized:
+            bacore.init(bacore.Version(2, 0, 0))
+
+    def _submit(self, coro) -> concurrent.futures.Future:
+        """Schedules coroutine on the background event loop, starting it if needed
+
+        The loop lives in its own thread for the lifetime of the object, so
+        manager futures always complete on the loop that created them and
+        calls from different threads can overlap.
+
+        Parameters
+        ----------
+        coro
+            coroutine to run
+
+        Returns
+        -------
+        concurrent.futures.Future
+            future of the coroutine result
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(
+                target=self._loop.run_forever, name="brainaccess-eeg-loop", daemon=True
+            )
+            self._loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _run(self, coro):
+        """Runs coroutine on the background event loop and waits for the result"""
+        return self._submit(coro).result()
+
+    def _stop_loop(self) -> None:
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        self._loop = None
+        self._loop_thread = None
 
     async def _connect(self, port: str = "COM4"):
         self.conn_error = await self.mgr.connect(port)
@@ -60,6 +137,9 @@ class EEG:
         zeros_at_start: int = 0,
         bias: typing.Optional[list] = None,
         gain: int = 8,
+        pad_gaps: bool = False,
+        storage_dir: typing.Optional[str] = None,
+        compact: bool = False,
     ) -> None:
         """Connects to device and sets channels
 
@@ -67,22 +147,24 @@ class EEG:
         ------------
         mgr: EEGManager
         port: str (Default value = 'COM4')
+        pad_gaps: bool (Default value = False)
+            insert NaN samples where samples were dropped, keeping time indexing exact
+        storage_dir: str (Default value = None)
+            accumulate mode only, keep the recording in memory-mapped files in
+            a new run_<n> subdirectory of this directory instead of RAM. The
+            files are flushed every flush_interval seconds while acquiring
+        compact: bool (Default value = False)
+            store EEG as float32 and digital input and sample number as
+            integers, converting to float64 only on export
 
         """
-        self.mgr = mgr
-        self.zeros_at_start = zeros_at_start
-        if bias:
-            self.bias_channels = bias
-        else:
-            self.bias_channels = []
-        if gain in [1, 2, 4, 6, 8, 12, 24]:
-            self.gain = multiplier_to_gain_mode(gain)
-        else:
-            print("Provided gain not supported. Using default 8")
+        self._set_parameters(
+            mgr, zeros_at_start, bias, gain, pad_gaps, storage_dir, compact
+        )
         start_time = time.time()
         while time.time() < (start_time + self.wait_max):
             try:
-                asyncio.run(self._connect(port))
+                self._run(self._connect(port))
                 if self.conn_error:
                     break
                 else:
@@ -91,6 +173,28 @@ class EEG:
                 raise e
         else:
             self._error("Could not connect to Client.")
+        self._set_cap(cap)
+
+    def _set_parameters(
+        self, mgr, zeros_at_start, bias, gain, pad_gaps, storage_dir, compact
+    ):
+        """Stores setup parameters, shared by the sync and async setup"""
+        self.mgr = mgr
+        self.storage_dir = storage_dir
+        self.compact = compact
+        self.zeros_at_start = zeros_at_start
+        self.gap_padding = pad_gaps
+        if bias:
+            self.bias_channels = bias
+        else:
+            self.bias_channels = []
+        if gain in [1, 2, 4, 6, 8, 12, 24]:
+            self.gain = multiplier_to_gain_mode(gain)
+        else:
+            print("Provided gain not supported. Using default 8")
+
+    def _set_cap(self, cap: dict):
+        """Creates channel mapping, MNE info and data buffer for a connected device"""
         self.eeg_channels = {}
         self.channels_indexes = {}
         for electrode, name in cap.items():
@@ -109,13 +213,28 @@ class EEG:
         eeg_info = self._create_info()
         self.info = eeg_info
         self.chans = len(self.info.ch_names)
+        # buffers store rows in info order, see _resolve_layout
+        self._name_rows = {name: row for row, name in enumerate(self.info.ch_names)}
+        self._rows_cache: dict = {}
+        self.fanout = None
+        # EEG channels are the first rows in info order
+        self._n_eeg = len(mne.pick_types(self.info, eeg=True))
         if self.mode == "accumulate":
             self.lock = threading.Lock()
-            self.data = EEGData(eeg_info, lock=self.lock, zeros_at_start=zeros_at_start)
+            self.data = EEGData(
+                eeg_info,
+                lock=self.lock,
+                zeros_at_start=self.zeros_at_start,
+                storage_dir=self.storage_dir,
+                compact=self.compact,
+            )
         else:
             self.lock = threading.Lock()
             self.data = EEGData_roll(
-                eeg_info, lock=self.lock, zeros_at_start=zeros_at_start
+                eeg_info,
+                lock=self.lock,
+                zeros_at_start=self.zeros_at_start,
+                compact=self.compact,
             )
 
     def _set_channels(self):
@@ -127,7 +246,7 @@ class EEG:
 
     def get_battery(self):
         """Returns battery level"""
-        return asyncio.run(self._get_battery()).level
+        return self._run(self._get_battery()).level
 
     def _error(self, extra: str = ""):
         """Raises error with extra text
@@ -139,8 +258,28 @@ class EEG:
         raise RuntimeError(f"{extra}")
 
     def close(self):
-        """Close device"""
-        bacore.close()
+        """Close device and stop the background event loop
+
+        Raises
+        ------
+        RuntimeError
+            if the recording failed (see stop_recording), raised after all
+            other resources are released
+        """
+        # a failed recording must not keep the shared block or server alive
+        error = None
+        for stop in (self.stop_recording, self.stop_sharing, self.stop_server):
+            try:
+                stop()
+            except Exception as e:
+                if error is None:
+                    error = e
+        self._stop_loop()
+        if self._core_initialized:
+            bacore.close()
+            self._core_initialized = False
+        if error is not None:
+            raise error
 
     async def _start_acquisition(self):
         """Starts streaming and collecting data"""
@@ -149,33 +288,74 @@ class EEG:
             self.mgr.set_channel_bias(eeg_channel.ELECTRODE_MEASUREMENT + chan, True)
         for idx in list(self.eeg_channels.keys())[:-5]:
             self.mgr.set_channel_gain(idx, self.gain)
+        self.gaps.reset()
+        self._sample_row = None
+        self._ingest_rows = None
+        with self._filtered_lock:
+            for stage in self.processing:
+                stage.reset()
         if self.mode == "accumulate":
-            self.mgr.set_callback_chunk(self._acq)
+            self.mgr.set_callback_chunk(self._acq, as_numpy=True)
         else:
-            self.mgr.set_callback_chunk(self._acq_roll)
+            self.mgr.set_callback_chunk(self._acq_roll, as_numpy=True)
         try:
             await self.mgr.start_stream()
         except Exception:
             raise Exception
+        layout = self.mgr.stream_layout
         for key in self.channels_indexes.keys():
-            self.channels_indexes[key] = self.mgr.get_channel_index(key)
+            self.channels_indexes[key] = layout.index(key)
+        if self.mode == "accumulate" and self.storage_dir is not None:
+            self._flush_task = asyncio.ensure_future(self._flush_storage())
+
+    async def _flush_storage(self):
+        """Periodically writes memory-mapped samples to disk, off the reader thread"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.data.flush()
 
     def start_acquisition(self):
         """Starts streaming and collecting data"""
-        asyncio.run(self._start_acquisition())
+        self._run(self._start_acquisition())
 
     async def _stop_acquisition(self):
         """"""
         await self.mgr.stop_stream()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+            self.data.flush()
 
     def stop_acquisition(self):
-        asyncio.run(self._stop_acquisition())
+        self._run(self._stop_acquisition())
 
     def get_annotations(self):
-        """Returns annotations"""
-        self.data.annotations = self.mgr.get_annotations()
+        """Returns annotations
+
+        Returns
+        -------
+        list
+            all annotations of the manager, see get_annotation_store for
+            incremental access as arrays
+        """
+        return self.mgr.get_annotations()
+
+    def get_annotation_store(self):
+        """Fetches annotations added since the last call and returns all of them
+
+        Returns
+        -------
+        AnnotationStore
+            sample timestamps and labels of the annotations
+        """
+        self.data.annotations.sync(self.mgr)
         return self.data.annotations
 
+    def clear_annotations(self) -> None:
+        """Clears the annotations of the manager and the annotation store"""
+        self.mgr.clear_annotations()
+        self.data.annotations.reset()
+
     def annotate(self, msg: str) -> None:
         """
         Parameters
@@ -185,9 +365,16 @@ class EEG:
 
         """
         self.mgr.annotate(msg)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.annotate(msg)
 
     def get_mne(
-        self, tim: float = None, samples: int = None, annotations: bool = True
+        self,
+        tim: float = None,
+        samples: int = None,
+        annotations: bool = True,
+        filtered: bool = False,
     ) -> mne.io.BaseRaw:
         """Return MNE structure.
         If tim None returns all data otherwise last tim seconds
@@ -196,6 +383,9 @@ class EEG:
         -----------
         tim: float (Default value = None)
             time in seconds
+        filtered: bool (Default value = False)
+            return the EEG channels of the processed buffer (see set_processing)
+            instead of raw data, without annotations
 
         Returns
         -------
@@ -203,25 +393,398 @@ class EEG:
             Raw MNE EEG data structure
 
         """
+        if filtered:
+            return mne.io.RawArray(
+                self.get_filtered(tim=tim, samples=samples),
+                mne.pick_info(self.info, list(range(self._n_eeg))),
+                verbose=False,
+            )
         if annotations:
-            self.get_annotations()
+            self.get_annotation_store()
         self.data.convert_to_mne(
             tim=tim,
             samples=samples,
-            channels_indexes=list(self.channels_indexes.values()),
         )
         return self.data.mne_raw
 
+    def get_window(
+        self,
+        tim: float = None,
+        samples: int = None,
+        channels: typing.Optional[list] = None,
+        events: bool = True,
+    ) -> tuple:
+        """Returns the last samples as numpy arrays without building MNE structures.
+        If tim and samples are None returns all buffered data.
+
+        Parameters
+        -----------
+        tim: float (Default value = None)
+            time in seconds
+        samples: int (Default value = None)
+            number of samples
+        channels: list (Default value = None)
+            channel names in output order, all channels in info order if None
+        events: bool (Default value = True)
+            fetch annotations and return those inside the window
+
+        Returns
+        -------
+        tuple
+            (data of shape (channels, n) with the same values as get_mne,
+            times of shape (n,) in seconds since the first acquired sample,
+            negative for zeros_at_start, events as a list of
+            (time, description)). In accumulate mode data is a view of the
+            acquisition buffer when the channels are consecutive in info
+            order, it must not be modified.
+        """
+        sfreq = self.info["sfreq"]
+        if tim is not None:
+            samples = int(tim * sfreq)
+        elif samples is None:
+            samples = self.data.n_samples
+        rows = self._channel_rows(channels)
+        data, start = self.data.window(samples, rows)
+        times = (np.arange(start, start + data.shape[1]) - self.zeros_at_start) / sfreq
+        found = []
+        if events:
+            store = self.get_annotation_store()
+            timestamps, codes = store.window(
+                start - self.zeros_at_start, start - self.zeros_at_start + data.shape[1]
+            )
+            found = [
+                (timestamp / sfreq, store.labels[code])
+                for timestamp, code in zip(timestamps.tolist(), codes.tolist())
+            ]
+        return data, times, found
+
+    def get_buffer_stats(self) -> dict:
+        """Contention counters of the acquisition buffer
+
+        Readers never block the chunk callback, a read that overlapped an
+        append is repeated instead (see SeqLock).
+
+        Returns
+        -------
+        dict
+            writes (chunks appended), reads, retries and waits
+        """
+        return self.data.seqlock.stats()
+
+    def _channel_rows(self, channels: typing.Optional[list] = None):
+        """Buffer rows of channel names, a slice if they are consecutive (so
+        reads can return views) and None for all channels"""
+        if channels is None:
+            return None
+        key = tuple(channels)
+        rows = self._rows_cache.get(key)
+        if rows is None:
+            rows = [self._name_rows[name] for name in channels]
+            if rows == list(range(self.chans)):
+                rows = slice(None)
+            elif rows == list(range(rows[0], rows[-1] + 1)):
+                rows = slice(rows[0], rows[-1] + 1)
+            self._rows_cache[key] = rows
+        return rows
+
+    def set_callback_gap(self, f):
+        """Sets a callback to be called for every gap in the sample numbers
+
+        Dropped sample and gap counters are available in ``self.gaps``.
+
+        Warning
+        -------
+        The callback runs in the chunk callback, keep it short.
+
+        Parameters
+        ----------
+        f
+            called with (first missing sample number, number of missing samples).
+            Set to None to disable.
+        """
+        self.gaps.callback = f
+
+    def start_recording(
+        self,
+        fname: str,
+        flush_interval: float = 1.0,
+        fsync_interval: float = 5.0,
+    ) -> None:
+        """Starts writing acquired chunks and annotations to disk
+
+        Chunks are written by a background thread while acquiring, see
+        StreamRecorder for the file format. Read the recording with
+        brainaccess.utils.recorder.read_recording.
+
+        Parameters
+        ----------
+        fname: str
+            base name of the recording files
+        flush_interval: float
+            seconds between batched writes
+        fsync_interval: float
+            seconds between forcing written data to disk
+        """
+        if self.recorder is not None:
+            self._error("Already recording")
+        self.recorder = StreamRecorder(
+            fname,
+            self.info.ch_names,
+            self.info["sfreq"],
+            ch_types=self.info.get_channel_types(),
+            flush_interval=flush_interval,
+            fsync_interval=fsync_interval,
+        )
+
+    @property
+    def recording_error(self) -> typing.Optional[Exception]:
+        """Error that stopped the running recording (e.g. disk full), None if
+        it is fine or not recording. Acquisition continues, chunks are no
+        longer recorded and stop_recording raises RuntimeError."""
+        recorder = self.recorder
+        return None if recorder is None else recorder.error
+
+    def stop_recording(self) -> None:
+        """Writes the remaining chunks and closes the recording"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def set_processing(self, stages: list, tim: float = 20.0) -> None:
+        """Sets processing stages applied to the EEG channels of every chunk
+
+        Stages run in the chunk callback, in order, on the new samples only
+        and keep their state between chunks (see brainaccess.utils.processing).
+        The output goes to a separate buffer holding the last tim seconds,
+        read with get_filtered or get_mne(filtered=True).
+
+        Parameters
+        ----------
+        stages: list
+            objects with process(chunk) and reset() methods, e.g.
+            [HighPass(1, 250), Notch(50, 250)]. Empty list to disable.
+        tim: float
+            length of the processed data buffer in seconds
+        """
+        stages = list(stages)
+        filtered = None
+        if stages:
+            filtered = ChunkRingBuffer(self._n_eeg, int(tim * self.info["sfreq"]))
+        with self._filtered_lock:
+            self.processing = stages
+            self._filtered = filtered
+            self._pipeline = (stages, filtered) if stages else None
+
+    def get_filtered(self, tim: float = None, samples: int = None) -> np.ndarray:
+        """Returns the latest processed EEG samples, see set_processing.
+        If tim and samples are None returns the whole processed buffer.
+
+        Parameters
+        ----------
+        tim: float (Default value = None)
+            time in seconds
+        samples: int (Default value = None)
+            number of samples
+
+        Returns
+        -------
+        np.ndarray
+            copy of shape (EEG channels, n), channels in info order
+        """
+        if tim is not None:
+            samples = int(tim * self.info["sfreq"])
+        filtered = self._filtered
+        if filtered is None:
+            self._error("No processing stages set")
+        if samples is None:
+            samples = filtered.capacity
+        while True:
+            try:
+                return filtered.read_latest(samples)[0]
+            except BufferOverrun:
+                # a chunk overwrote the oldest samples while copying, the
+                # reader thread is never blocked by this read
+                pass
+
+    def subscribe(
+        self, name: str = None, on_overrun: str = "skip", tim: float = 10.0
+    ) -> Subscription:
+        """Adds a consumer of the acquired chunks with its own read cursor
+
+        Every subscriber reads the samples acquired since its last read with
+        Subscription.read_new, independently of the others and of the storage
+        mode. Chunks are written once to a shared buffer of the last tim
+        seconds; a subscriber lagging further behind skips or is dropped
+        (on_overrun), the acquisition never waits for subscribers.
+
+        Parameters
+        ----------
+        name: str
+            name of the subscriber in the lag metrics (eeg.fanout.metrics())
+        on_overrun: str
+            skip to the oldest available sample or drop the subscriber
+        tim: float
+            length of the shared buffer in seconds, set by the first subscriber
+
+        Returns
+        -------
+        Subscription
+            rows in info order, starting with the next acquired chunk
+        """
+        if self.fanout is None:
+            self.fanout = ChunkFanout(self.chans, int(tim * self.info["sfreq"]))
+        return self.fanout.subscribe(name, on_overrun)
+
+    def start_sharing(self, name: str = None, tim: float = 10.0) -> str:
+        """Publishes acquired chunks to shared memory for other processes
+
+        Other local processes attach with SharedRingBuffer.attach(name) and
+        read the last tim seconds (all channels, info order) without loading
+        this process, e.g. to run classifiers on other cores.
+
+        Parameters
+        ----------
+        name: str
+            name of the shared memory block, generated if None
+        tim: float
+            length of the shared buffer in seconds
+
+        Returns
+        -------
+        str
+            name of the shared memory block
+        """
+        if self.shared is not None:
+            self._error("Already sharing")
+        self.shared = SharedRingBuffer.create(
+            self.info.ch_names,
+            self.info["sfreq"],
+            int(tim * self.info["sfreq"]),
+            ch_types=self.info.get_channel_types(),
+            name=name,
+        )
+        return self.shared.name
+
+    def stop_sharing(self) -> None:
+        """Stops publishing and removes the shared memory block"""
+        # the block is unmapped, wait for a chunk being written to it
+        with self._shared_lock:
+            shared, self.shared = self.shared, None
+        if shared is not None:
+            shared.close()
+
+    def start_server(
+        self, host: str = "127.0.0.1", port: int = 0, tim: float = 10.0
+    ) -> tuple:
+        """Streams acquired chunks and annotations to other machines over TCP
+
+        Clients (brainaccess.utils.network.StreamClient) choose channels and
+        decimation when connecting, each is served from its own subscription
+        (see subscribe) so a slow client skips samples instead of delaying
+        acquisition. Frame positions are device sample numbers and all
+        annotations of the manager are forwarded with their timestamps.
+
+        Parameters
+        ----------
+        host: str
+            interface to listen on, "0.0.0.0" for the LAN
+        port: int
+            port to listen on, any free port if 0
+        tim: float
+            seconds a client may fall behind before skipping, used if no
+            subscriber exists yet
+
+        Returns
+        -------
+        tuple
+            (host, port) the server listens on
+        """
+        if self.server is not None:
+            self._error("Server already running")
+        if self.fanout is None:
+            self.fanout = ChunkFanout(self.chans, int(tim * self.info["sfreq"]))
+        self.server = StreamServer(
+            self.fanout,
+            self.info.ch_names,
+            self.info["sfreq"],
+            ch_types=self.info.get_channel_types(),
+            host=host,
+            port=port,
+            sample_row=self._name_rows["Sample"],
+            annotation_source=self.mgr,
+        )
+        self.server.start()
+        return self.server.address
+
+    def stop_server(self) -> None:
+        """Disconnects all clients and stops the server"""
+        server, self.server = self.server, None
+        if server is not None:
+            server.close()
+
+    def _process(self, eeg: np.ndarray):
+        """Runs the processing stages on the EEG rows of a chunk"""
+        pipeline = self._pipeline
+        if pipeline is None:
+            return
+        stages, filtered = pipeline
+        for stage in stages:
+            eeg = stage.process(eeg)
+        filtered.write(eeg)
+
+    def _resolve_layout(self):
+        """Resolves the rows of incoming chunks once the stream layout is known"""
+        layout = self.mgr.stream_layout
+        rows = [layout.index(key) for key in self.eeg_channels]
+        self.data.set_row_dtypes([layout.dtypes[row] for row in rows])
+        # permutation from device chunk order to info order, applied on ingest
+        self._ingest_rows = None if rows == list(range(len(layout))) else rows
+        self._sample_row = layout.index(eeg_channel.SAMPLE_NUMBER)
+
+    def _check_gaps(self, chunk):
+        """Checks sample continuity, pads missing samples with NaN if enabled"""
+        if self._sample_row is None:
+            # chunks can arrive before start_stream's future completes
+            self._resolve_layout()
+        gaps = self.gaps.check(chunk[self._sample_row])
+        if gaps and self.gap_padding:
+            return pad_gaps(chunk, gaps, self._sample_row)
+        return chunk
+
+    def _ingest(self, chunk):
+        """Stores chunk in info channel order, publishes it to subscribers and
+        shared memory and queues it to the recorder"""
+        data = self._check_gaps(chunk)
+        if self._ingest_rows is not None:
+            data = data[self._ingest_rows]
+        self.data.append(data)
+        if self._pipeline is not None:
+            self._process(data[: self._n_eeg])
+        estimator = self.impedance_estimator
+        if estimator is not None:
+            estimator.update(data[: self._n_eeg])
+        fanout = self.fanout
+        if fanout is not None:
+            fanout.publish(data)
+        if self.shared is not None:
+            with self._shared_lock:
+                if self.shared is not None:
+                    self.shared.write(data)
+        recorder = self.recorder
+        if recorder is not None:
+            # the manager reuses the chunk array
+            recorder.write(data.copy() if data is chunk else data)
+
     def _acq(self, chunk, chunk_size):
         """function to acquire data with callback
         Parameters
         ----------
         chunk
-            data chunk from device
+            data chunk from device, copied into the buffer
         chunk_size: int
             size of the chunk
         """
-        self.data.data.append(np.array(chunk))
+        self._ingest(chunk)
 
     def _acq_roll(self, chunk, chunk_size):
         """function to acquire fixed size data with callback
@@ -232,8 +795,7 @@ class EEG:
         chunk_size: int
             size of the chunk
         """
-        self.data.data = np.roll(self.data.data, -chunk_size, axis=1)
-        self.data.data[:, -chunk_size:] = np.array(chunk)
+        self._ingest(chunk)
 
     def _create_info(self):
         """mne info structure creation"""
@@ -261,36 +823,255 @@ class EEG:
             Impedances
         """
         data = self.get_mne(tim=tim).filter(20, 40).get_data(picks="eeg")
-        data = np.std(data, axis=1)
-        self.impedance = (
-            (np.sqrt(2.0) * data * 1.0e-6) / IMPEDANCE_DRIVE_AMPS - BOARD_RESISTOR_OHMS
-        ) / 1000
-        self.impedance[self.impedance < 0] = 0
+        self.impedance = impedance_from_std(np.std(data, axis=1))
+        return self.impedance
+
+    def get_impedances(self) -> np.ndarray:
+        """Current impedances from the online estimator, updated every chunk
+        while impedance measurement is running. Cheap enough to poll on every
+        display refresh, unlike calc_impedances.
+
+        Returns
+        -------
+        np.ndarray
+            Impedances (kOhm) of the EEG channels
+        """
+        if self.impedance_estimator is None:
+            self._error("Impedance measurement not started")
+        self.impedance = self.impedance_estimator.impedances
         return self.impedance
 
+    def _start_impedance_estimator(self):
+        self.impedance_estimator = ImpedanceEstimator(self._n_eeg, self.info["sfreq"])
+
     def start_impedance_measurement(self):
         self.mgr.set_impedance_mode(ImpedanceMeasurementMode.HZ_31_2)
+        self._start_impedance_estimator()
         self.start_acquisition()
 
     def stop_impedance_measurement(self):
         self.stop_acquisition()
         self.mgr.set_impedance_mode(ImpedanceMeasurementMode.OFF)
+        self.impedance_estimator = None
+
+
+class AsyncEEG(EEG):
+    """Asynchronous variant of EEG for applications that run their own event loop.
+
+    Connecting, stream control and battery queries are coroutines awaited on
+    the caller's loop, no background loop thread is started. Data access
+    (get_mne, annotations, impedance calculation) is the same as in EEG.
+
+    Examples
+    --------
+    >>> eeg = AsyncEEG()
+    >>> await eeg.setup(mgr, port="/dev/rfcomm0")
+    >>> await eeg.start_acquisition()
+    >>> raw = eeg.get_mne(tim=4)
+    """
+
+    async def setup(
+        self,
+        mgr: EEGManager,
+        cap: dict = {
+            0: "F3",
+            1: "F4",
+            2: "C3",
+            3: "C4",
+            4: "P3",
+            5: "P4",
+            6: "O1",
+            7: "O2",
+        },
+        port: str = "COM4",
+        zeros_at_start: int = 0,
+        bias: typing.Optional[list] = None,
+        gain: int = 8,
+        pad_gaps: bool = False,
+        storage_dir: typing.Optional[str] = None,
+        compact: bool = False,
+    ) -> None:
+        """Connects to device and sets channels, see EEG.setup"""
+        self._set_parameters(
+            mgr, zeros_at_start, bias, gain, pad_gaps, storage_dir, compact
+        )
+        start_time = time.time()
+        while time.time() < (start_time + self.wait_max):
+            await self._connect(port)
+            if self.conn_error:
+                break
+            else:
+                print("could not connect")
+        else:
+            self._error("Could not connect to Client.")
+        self._set_cap(cap)
+
+    async def get_battery(self):
+        """Returns battery level"""
+        return (await self._get_battery()).level
+
+    async def start_acquisition(self):
+        """Starts streaming and collecting data"""
+        await self._start_acquisition()
+
+    async def stop_acquisition(self):
+        await self._stop_acquisition()
+
+    async def start_impedance_measurement(self):
+        self.mgr.set_impedance_mode(ImpedanceMeasurementMode.HZ_31_2)
+        self._start_impedance_estimator()
+        await self.start_acquisition()
+
+    async def stop_impedance_measurement(self):
+        await self.stop_acquisition()
+        self.mgr.set_impedance_mode(ImpedanceMeasurementMode.OFF)
+        self.impedance_estimator = None
+
+
+def _window_annotations(store, start: int, n: int, sfreq: float) -> mne.Annotations:
+    """MNE annotations of a window of n samples starting at sample timestamp start"""
+    timestamps, codes = store.window(start, start + n)
+    return mne.Annotations(
+        (timestamps - start) / sfreq,
+        np.zeros(len(timestamps)),
+        [store.labels[code] for code in codes],
+    )
+
+
+def _group_values(chunk: np.ndarray, rows, dtype: np.dtype) -> np.ndarray:
+    """Rows of chunk to store in a storage group of dtype"""
+    values = chunk if rows is None else chunk[rows]
+    if dtype.kind != "f":
+        # samples padded with NaN are stored as 0 in integer rows
+        values = np.nan_to_num(values, nan=0)
+    return values
 
 
 class EEGData_roll:
-    """Data structure to store rolling EEG data buffer"""
+    """Data structure to store rolling EEG data buffer
 
-    def __init__(self, info, lock, zeros_at_start: int = 1):
+    The last zeros_at_start samples are kept in a circular buffer, so
+    appending a chunk only copies the chunk and reading a window copies it
+    out in chronological order in at most two pieces.
+
+    The producer never takes a lock: appends are published through a
+    sequence counter (seqlock) and readers copy only the requested window,
+    retrying if the producer overwrote it meanwhile. Contention counters
+    are available from seqlock.stats().
+    """
+
+    def __init__(self, info, lock, zeros_at_start: int = 1, compact: bool = False):
         if not lock:
             raise (Exception("No lock passed"))
         self.eeg_info: mne.Info = info
         self.mne_raw: mne.io.BaseRaw
         self.chans = len(info.ch_names)
         self.zeros_at_start = zeros_at_start
-        self.data = np.zeros((self.chans, self.zeros_at_start))
+        self.compact = compact
         self.connectivity: list = []
-        self.annotations: list = []
+        self.annotations: AnnotationStore = AnnotationStore()
         self.lock = lock
+        self.seqlock: SeqLock = SeqLock()
+        # (rows or None for all rows, ring) per stored dtype
+        self._groups: list = []
+        if not compact:
+            self._set_groups([np.float64] * self.chans)
+
+    def set_row_dtypes(self, dtypes: list):
+        """Sets up compact storage from the native dtype of every chunk row.
+        Does nothing if not compact or already set up.
+
+        Parameters
+        ------------
+        dtypes: list
+            numpy dtype of every chunk row, see StreamLayout.dtypes
+        """
+        if self.compact and not self._groups:
+            self._set_groups([compact_dtype(dtype) for dtype in dtypes])
+
+    def _set_groups(self, dtypes: list):
+        groups = []
+        for rows, dtype in row_groups(dtypes):
+            n = self.chans if rows is None else len(rows)
+            ring = ChunkRingBuffer(n, self.zeros_at_start, dtype=dtype)
+            # the buffer starts full of zeros, as the rolled array did
+            ring.write(np.zeros((n, self.zeros_at_start)))
+            groups.append((rows, ring))
+        self.seqlock.write_begin()
+        self._groups = groups
+        self.seqlock.write_end()
+
+    @property
+    def n_samples(self) -> int:
+        """Number of samples held, the buffer is always full"""
+        return self.zeros_at_start
+
+    @property
+    def data(self) -> np.ndarray:
+        """Copy of the buffer in chronological order, shape (channels, zeros_at_start)"""
+        return self._last_samples(self.zeros_at_start)[0]
+
+    def append(self, chunk: np.ndarray):
+        """Overwrites the oldest samples with chunk
+
+        Parameters
+        ------------
+        chunk: np.ndarray
+            data of shape (channels, samples)
+        """
+        self.seqlock.write_begin()
+        try:
+            for rows, ring in self._groups:
+                ring.write(_group_values(chunk, rows, ring.data.dtype))
+        finally:
+            self.seqlock.write_end()
+
+    def window(self, samples: int, rows: typing.Optional[list] = None) -> tuple:
+        """Last samples as float64
+
+        Parameters
+        ------------
+        samples: int
+            number of samples, at most zeros_at_start
+        rows: list, default value = None
+            rows to select, in output order
+
+        Returns
+        -------
+        tuple
+            (copy of shape (rows, n), position of the first sample counted
+            from the first zero of the buffer)
+        """
+        data, start = self._last_samples(samples)
+        if rows:
+            data = data[rows]
+        return data, start
+
+    def _last_samples(self, samples: int) -> tuple:
+        """Copy of the last samples as float64 and position of the first one"""
+        samples = min(samples, self.zeros_at_start)
+        while True:
+            seq = self.seqlock.read_begin()
+            groups = self._groups
+            if not groups:
+                data = np.zeros((self.chans, samples))
+                start = self.zeros_at_start - samples
+            else:
+                # every group has the cursor of the last append
+                stop = groups[0][1].cursor
+                start = stop - samples
+                try:
+                    if groups[0][0] is None:
+                        data = groups[0][1].read(start, stop)
+                    else:
+                        data = np.empty((self.chans, samples))
+                        for rows, ring in groups:
+                            data[rows] = ring.read(start, stop)
+                except (BufferOverrun, ValueError):
+                    # an append overlapped, read_validate fails below
+                    pass
+            if self.seqlock.read_validate(seq):
+                return data, start
 
     def save(self, fname: str):
         """
@@ -325,67 +1106,167 @@ class EEGData_roll:
             should annotations be included
 
         """
-        with self.lock:
-            length = len(self.data)
-        if length > 0:
-            if annotations:
-                onset = []
-                description = []
-                for annotation in self.annotations:
-                    description.append(annotation.annotation)
-                    onset.append(
-                        (annotation.timestamp + self.zeros_at_start)
-                        / self.eeg_info["sfreq"]
-                    )
-                duration = np.repeat(0, len(onset))
+        if self.zeros_at_start > 0:
             if tim:
                 # convert tim to samples
-                tim = int(tim * self.eeg_info["sfreq"])
-                with self.lock:
-                    data = np.array(self.data)  # .reshape(self.chans, -1)
-                    data = data[:, -tim:]
-                # fix annotations
-                if annotations:
-                    onset = [x - tim for x in onset]
-                    duration = np.repeat(0, len(onset))
-            elif samples:
-                with self.lock:
-                    data = np.array(self.data)  # .reshape(self.chans, -1)
-                    data = data[:, -samples:]
-                # fix annotations
-                if annotations:
-                    onset = [x - samples for x in onset]
-                    duration = np.repeat(0, len(onset))
-            else:
-                with self.lock:
-                    data = np.array(self.data)  # .reshape(self.chans, -1)
-            # select right order channels
-            if channels_indexes:
-                data = data[channels_indexes]
+                samples = int(tim * self.eeg_info["sfreq"])
+            elif not samples:
+                samples = self.zeros_at_start
+            data, start = self.window(samples, channels_indexes)
             self.mne_raw = mne.io.RawArray(
                 data,
                 self.eeg_info,
                 verbose=False,
             )
             if annotations:
-                annot = mne.Annotations(onset, duration, description)
-                self.mne_raw.set_annotations(annot, verbose=False)
+                self.mne_raw.set_annotations(
+                    _window_annotations(
+                        self.annotations,
+                        start - self.zeros_at_start,
+                        data.shape[1],
+                        self.eeg_info["sfreq"],
+                    ),
+                    verbose=False,
+                )
         else:
             print("No data to convert to MNE structure")
 
 
 class EEGData:
-    """Object to store EEG data in accumulation mode"""
+    """Object to store EEG data in accumulation mode
+
+    Samples are appended to a storage backend: by default an in memory array
+    whose capacity doubles when full (ArrayStorage), or memory-mapped segment
+    files for recordings that should not be held in RAM (MemmapStorage).
+    Appending a chunk costs O(chunk) and reading the last samples does not
+    depend on the length of the recording.
+
+    In compact mode every row is stored with the compact_dtype of its native
+    type (float32 EEG, integer sample counter and digital input), one storage
+    per dtype, and converted to float64 only when read.
 
-    def __init__(self, info, lock, zeros_at_start: int = 2):
+    Stored samples never change, so readers take views of them without a
+    lock: the producer publishes appends through a sequence counter
+    (seqlock) that readers check to see the same sample count in every
+    storage group. Contention counters are available from seqlock.stats().
+    """
+
+    def __init__(
+        self,
+        info,
+        lock,
+        zeros_at_start: int = 2,
+        capacity: int = None,
+        storage_dir: typing.Optional[str] = None,
+        compact: bool = False,
+    ):
+        """
+        Parameters
+        ------------
+        info: mne.Info
+        lock: threading.Lock
+            lock guarding the storage
+        zeros_at_start: int
+            number of zero samples the recording starts with
+        capacity: int, default value = None
+            initial capacity of the in memory storage, one minute of data if None
+        storage_dir: str, default value = None
+            keep the samples in memory-mapped files in a new run_<n>
+            subdirectory of this directory (see storage.read_segments)
+        compact: bool, default value = False
+            store rows in compact dtypes, set up by set_row_dtypes
+        """
         self.eeg_info: mne.Info = info
         self.mne_raw: mne.io.BaseRaw
         self.lock = lock
-        chans = len(info.ch_names)
+        self.seqlock: SeqLock = SeqLock()
+        self.chans = len(info.ch_names)
         self.zeros_at_start = zeros_at_start
-        self.data: list = [np.zeros((chans, self.zeros_at_start))]
+        if capacity is None:
+            capacity = int(60 * info["sfreq"])
+        self.capacity = max(capacity, zeros_at_start)
+        self.storage_dir = storage_dir
+        self._run_dir: typing.Optional[pathlib.Path] = None
+        self.compact = compact
         self.connectivity: list = []
-        self.annotations: list = []
+        self.annotations: AnnotationStore = AnnotationStore()
+        # (rows or None for all rows, storage) per stored dtype
+        self._groups: list = []
+        if not compact:
+            self._set_groups([np.float64] * self.chans)
+
+    def set_row_dtypes(self, dtypes: list):
+        """Sets up compact storage from the native dtype of every chunk row.
+        Does nothing if not compact or already set up.
+
+        Parameters
+        ------------
+        dtypes: list
+            numpy dtype of every chunk row, see StreamLayout.dtypes
+        """
+        if self.compact and not self._groups:
+            self._set_groups([compact_dtype(dtype) for dtype in dtypes])
+
+    def _set_groups(self, dtypes: list):
+        groups = []
+        for rows, dtype in row_groups(dtypes):
+            n = self.chans if rows is None else len(rows)
+            if self.storage_dir is not None:
+                if self._run_dir is None:
+                    self._run_dir = run_directory(self.storage_dir)
+                name = "segment" if rows is None else f"segment_{dtype.name}"
+                names = self.eeg_info.ch_names
+                storage = MemmapStorage(
+                    n,
+                    self._run_dir,
+                    dtype=dtype,
+                    name=name,
+                    ch_names=names if rows is None else [names[r] for r in rows],
+                    sfreq=self.eeg_info["sfreq"],
+                )
+            else:
+                storage = ArrayStorage(n, self.capacity, dtype=dtype)
+            if self.zeros_at_start:
+                storage.append(np.zeros((n, self.zeros_at_start)))
+            groups.append((rows, storage))
+        self.seqlock.write_begin()
+        self._groups = groups
+        self.seqlock.write_end()
+
+    @property
+    def n_samples(self) -> int:
+        """Number of stored samples"""
+        groups = self._groups
+        return groups[0][1].n_samples if groups else self.zeros_at_start
+
+    @property
+    def data(self) -> np.ndarray:
+        """All recorded samples, shape (channels, n_samples).
+        A view for in memory float64 storage, otherwise a float64 copy.
+        """
+        return self._join(self._last_samples(self.n_samples)[0])
+
+    def append(self, chunk: np.ndarray):
+        """Copies chunk to the end of the storage
+
+        Parameters
+        ------------
+        chunk: np.ndarray
+            data of shape (channels, samples)
+        """
+        self.seqlock.write_begin()
+        try:
+            for rows, storage in self._groups:
+                storage.append(_group_values(chunk, rows, storage.dtype))
+        finally:
+            self.seqlock.write_end()
+
+    def flush(self):
+        """Writes memory-mapped samples to disk and records their number,
+        so they can be recovered with storage.read_segments after a crash"""
+        for _, storage in self._groups:
+            if isinstance(storage, MemmapStorage):
+                storage.flush()
 
     def save(self, fname: str):
         """
@@ -420,52 +1301,109 @@ class EEGData:
             should annotations be included
 
         """
-        with self.lock:
-            _length = len(self.data)
-        if _length > 0:
-            if annotations:
-                onset = []
-                description = []
-                for annotation in self.annotations:
-                    description.append(annotation.annotation)
-                    onset.append(
-                        (annotation.timestamp + self.zeros_at_start)
-                        / self.eeg_info["sfreq"]
-                    )
-                duration = np.repeat(0, len(onset))
+        if self.n_samples > 0:
             if tim:
                 # convert tim to samples
-                tim = int(tim * self.eeg_info["sfreq"])
-                data = self._concat_data()
-                data = data[:, -tim:]
-                # fix annotations
-                if annotations:
-                    onset = [x - tim for x in onset]
-                    duration = np.repeat(0, len(onset))
-            elif samples:
-                data = self._concat_data()
-                data = data[:, -samples:]
-                # fix annotations
-                if annotations:
-                    onset = [x - samples for x in onset]
-                    duration = np.repeat(0, len(onset))
-            else:
-                data = self._concat_data()
-            # select right order channels
-            if channels_indexes:
-                data = data[channels_indexes]
+                samples = int(tim * self.eeg_info["sfreq"])
+            elif not samples:
+                samples = self.n_samples
+            data, start = self.window(samples, channels_indexes, copy=True)
             self.mne_raw = mne.io.RawArray(
                 data,
                 self.eeg_info,
                 verbose=False,
             )
             if annotations:
-                annot = mne.Annotations(onset, duration, description)
-                self.mne_raw.set_annotations(annot, verbose=False)
+                self.mne_raw.set_annotations(
+                    _window_annotations(
+                        self.annotations,
+                        start - self.zeros_at_start,
+                        data.shape[1],
+                        self.eeg_info["sfreq"],
+                    ),
+                    verbose=False,
+                )
         else:
             print("No data to convert to MNE structure")
 
-    def _concat_data(self):
-        with self.lock:
-            data = np.block(self.data)
+    def window(
+        self, samples: int, rows: typing.Optional[list] = None, copy: bool = False
+    ) -> tuple:
+        """Last samples as float64
+
+        Parameters
+        ------------
+        samples: int
+            number of samples
+        rows: list, default value = None
+            rows to select, in output order
+        copy: bool, default value = False
+            never return a view of the storage
+
+        Returns
+        -------
+        tuple
+            (array of shape (rows, n), position of the first sample counted
+            from the first zero at start). The array is a view of the storage
+            when possible and must not be modified.
+        """
+        groups, start = self._last_samples(samples)
+        return self._join(groups, rows, copy=copy), start
+
+    def _last_samples(self, samples: int) -> tuple:
+        """Views of the last samples of every storage group and position of the
+        first one, written samples never change so no copy is needed"""
+        while True:
+            seq = self.seqlock.read_begin()
+            groups = self._groups
+            if not groups:
+                n = min(samples, self.n_samples)
+                views = [(None, [np.zeros((self.chans, n))])]
+                start = self.n_samples - n
+            else:
+                views = []
+                for rows, storage in groups:
+                    stop = storage.n_samples
+                    start = max(0, stop - samples)
+                    views.append((rows, storage.views(start, stop)))
+            if self.seqlock.read_validate(seq):
+                return views, start
+
+    def _join(
+        self,
+        groups: list,
+        channels_indexes: typing.Optional[list] = None,
+        copy: bool = False,
+    ) -> np.ndarray:
+        """Joins the views of _last_samples into one float64 array
+
+        Parameters
+        ------------
+        groups: list
+            (rows, views) of every storage group
+        channels_indexes: list, default value = None
+            rows to select, in output order
+        copy: bool, default value = False
+            never return a view of the storage
+        """
+        rows, pieces = groups[0]
+        if rows is None and pieces and pieces[0].dtype == np.float64:
+            if channels_indexes:
+                pieces = [piece[channels_indexes] for piece in pieces]
+            if len(pieces) > 1:
+                return np.concatenate(pieces, axis=1)
+            # selecting a list of rows copies, a slice is still a view
+            if copy and (not channels_indexes or isinstance(channels_indexes, slice)):
+                return pieces[0].copy()
+            return pieces[0]
+        n = sum(piece.shape[1] for piece in groups[0][1])
+        data = np.empty((self.chans, n))
+        for rows, pieces in groups:
+            rows = slice(None) if rows is None else rows
+            col = 0
+            for piece in pieces:
+                data[rows, col : col + piece.shape[1]] = piece
+                col += piece.shape[1]
+        if channels_indexes:
+            data = data[channels_indexes]
         return data
@@ -0,0 +1,198 @@
+import threading
+import typing
+
+import numpy as np
+
+
+class AnnotationCursor:
+    """Reads the manager annotations incrementally.
+
+    Counts the manager annotations already read, so fetch copies only newer
+    ones out of native memory. The manager clears its annotations on
+    disconnect or clear_annotations, fetch detects this by re-reading the
+    last annotation it returned and then starts over.
+
+    Examples
+    --------
+    >>> cursor = AnnotationCursor()
+    >>> new, restarted = cursor.fetch(mgr)
+    """
+
+    def __init__(self) -> None:
+        self.position: int = 0
+        # (timestamp, label) of the manager annotation before position
+        self._last: typing.Optional[tuple] = None
+
+    def reset(self) -> None:
+        """Reads all annotations again on the next fetch"""
+        self.position = 0
+        self._last = None
+
+    def fetch(self, mgr) -> tuple:
+        """Returns the manager annotations added since the last fetch
+
+        Parameters
+        ----------
+        mgr
+            EEG manager
+
+        Returns
+        -------
+        tuple
+            (list of new annotations, True if the manager was cleared since
+            the last fetch and the list starts over from its first annotation)
+        """
+        restarted = False
+        if self.position:
+            # one annotation overlap tells whether the manager was cleared
+            new = mgr.get_annotations(self.position - 1)
+            if new and (new[0].timestamp, new[0].annotation) == self._last:
+                new = new[1:]
+            else:
+                self.reset()
+                restarted = True
+                new = mgr.get_annotations(0)
+        else:
+            new = mgr.get_annotations(0)
+        self.position += len(new)
+        if new:
+            self._last = (new[-1].timestamp, new[-1].annotation)
+        return new, restarted
+
+
+class AnnotationStore:
+    """Annotations kept as numpy arrays for window queries.
+
+    Annotations are fetched from the manager incrementally with an
+    AnnotationCursor, which also notices when the manager was cleared; the
+    store then starts over, reset does the same explicitly. Timestamps
+    (sample numbers) are kept sorted in a capacity-doubling int64 array and
+    labels are interned, so selecting the annotations of a window is a
+    binary search.
+
+    Examples
+    --------
+    >>> store = AnnotationStore()
+    >>> store.sync(mgr)
+    >>> timestamps, labels = store.window(start, stop)
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        """
+        Parameters
+        ----------
+        capacity: int
+            initial number of annotations the arrays hold
+        """
+        self._reader: AnnotationCursor = AnnotationCursor()
+        self.labels: list = []
+        self._label_codes: dict = {}
+        self._timestamps: np.ndarray = np.empty(max(capacity, 1), dtype=np.int64)
+        self._codes: np.ndarray = np.empty(max(capacity, 1), dtype=np.int32)
+        self._n: int = 0
+        self._mtx = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def cursor(self) -> int:
+        """Number of manager annotations stored"""
+        return self._reader.position
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Sorted sample timestamps of all stored annotations"""
+        return self._timestamps[: self._n]
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Label code of every stored annotation, index into labels"""
+        return self._codes[: self._n]
+
+    @property
+    def descriptions(self) -> list:
+        """Label of every stored annotation"""
+        return [self.labels[code] for code in self.codes]
+
+    def reset(self) -> None:
+        """Removes all annotations and restarts the manager cursor"""
+        with self._mtx:
+            self._reader.reset()
+            self._n = 0
+
+    def sync(self, mgr) -> int:
+        """Stores the manager annotations added since the last sync
+
+        Parameters
+        ----------
+        mgr
+            EEG manager
+
+        Returns
+        -------
+        int
+            number of new annotations
+        """
+        with self._mtx:
+            new, restarted = self._reader.fetch(mgr)
+            if restarted:
+                self._n = 0
+            for annotation in new:
+                self.add(annotation.timestamp, annotation.annotation)
+        return len(new)
+
+    def add(self, timestamp: int, label: typing.Union[str, bytes]) -> None:
+        """Stores one annotation
+
+        Parameters
+        ----------
+        timestamp: int
+            sample number of the annotation
+        label: str or bytes
+            annotation text
+        """
+        if isinstance(label, bytes):
+            label = label.decode("ascii")
+        with self._mtx:
+            code = self._label_codes.get(label)
+            if code is None:
+                code = len(self.labels)
+                self.labels.append(label)
+                self._label_codes[label] = code
+            if self._n == self._timestamps.shape[0]:
+                self._timestamps = np.resize(self._timestamps, 2 * self._n)
+                self._codes = np.resize(self._codes, 2 * self._n)
+            n = self._n
+            if n and timestamp < self._timestamps[n - 1]:
+                # out of order, keep the timestamps sorted
+                pos = int(
+                    np.searchsorted(self._timestamps[:n], timestamp, side="right")
+                )
+                self._timestamps[pos + 1 : n + 1] = self._timestamps[pos:n].copy()
+                self._codes[pos + 1 : n + 1] = self._codes[pos:n].copy()
+            else:
+                pos = n
+            self._timestamps[pos] = timestamp
+            self._codes[pos] = code
+            self._n = n + 1
+
+    def window(self, start: int, stop: int) -> tuple:
+        """Annotations with start <= timestamp < stop
+
+        Parameters
+        ----------
+        start: int
+            first sample number
+        stop: int
+            sample number after the last one
+
+        Returns
+        -------
+        tuple
+            (timestamps, label codes)
+        """
+        with self._mtx:
+            timestamps = self.timestamps
+            first, last = np.searchsorted(timestamps, [start, stop])
+            return timestamps[first:last].copy(), self._codes[first:last].copy()
@@ -0,0 +1,118 @@
+import typing
+
+import numpy as np
+
+
+class SampleGapDetector:
+    """Checks sample number continuity of consecutive chunks.
+
+    Samples lost on the Bluetooth link show up as jumps in the SAMPLE_NUMBER
+    channel. A contiguous chunk is recognised in constant time, the chunk is
+    only inspected element-wise (vectorized) when it does not line up.
+
+    Attributes
+    ----------
+    dropped_samples
+        Total number of missing samples
+    gap_events
+        Number of gaps detected
+    discontinuities
+        Number of times the sample number did not increase (e.g. stream restart)
+        or jumped by more than max_gap samples
+    max_gap
+        Largest number of missing samples treated as a gap
+    """
+
+    def __init__(
+        self, callback: typing.Optional[typing.Callable] = None, max_gap: int = 2500
+    ) -> None:
+        """Creates gap detector
+
+        Parameters
+        ----------
+        callback
+            function called with (first missing sample number, number of missing
+            samples) for every gap, from the thread calling check
+        max_gap: int
+            larger jumps (e.g. a corrupted sample number or a device reset) are
+            counted as discontinuities instead of gaps, so they are not padded
+        """
+        self.callback = callback
+        self.max_gap: int = max_gap
+        self.dropped_samples: int = 0
+        self.gap_events: int = 0
+        self.discontinuities: int = 0
+        self._expected: typing.Optional[int] = None
+
+    def reset(self) -> None:
+        """Forgets the last sample number, e.g. on stream restart"""
+        self._expected = None
+
+    def check(self, samples: np.ndarray) -> list:
+        """Checks a chunk's sample numbers against the previous chunk
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            sample numbers of the chunk
+
+        Returns
+        -------
+        list
+            (index into chunk, missing samples) of every gap, empty if the
+            chunk is contiguous with the previous one
+        """
+        n = samples.shape[0]
+        if n == 0:
+            return []
+        first = int(samples[0])
+        last = int(samples[-1])
+        expected = first if self._expected is None else self._expected
+        self._expected = last + 1
+        if first == expected and last - first == n - 1:
+            return []
+        steps = np.diff(samples, prepend=expected - 1)
+        gaps = []
+        for idx in np.flatnonzero(steps != 1):
+            step = int(steps[idx])
+            if 1 < step <= self.max_gap + 1:
+                missing = step - 1
+                gaps.append((int(idx), missing))
+                self.dropped_samples += missing
+                self.gap_events += 1
+                if self.callback is not None:
+                    self.callback(int(samples[idx]) - missing, missing)
+            else:
+                self.discontinuities += 1
+        return gaps
+
+
+def pad_gaps(chunk: np.ndarray, gaps: list, sample_row: int) -> np.ndarray:
+    """Inserts NaN columns for missing samples so that time indexing stays exact
+
+    Parameters
+    ----------
+    chunk: np.ndarray
+        data of shape (channels, samples)
+    gaps: list
+        gaps as returned by SampleGapDetector.check, which leaves out jumps
+        larger than its max_gap
+    sample_row: int
+        row of the sample number channel, filled with the missing sample numbers
+
+    Returns
+    -------
+    np.ndarray
+        padded copy of chunk
+    """
+    indexes = np.repeat([idx for idx, _ in gaps], [missing for _, missing in gaps])
+    padded = np.insert(chunk, indexes, np.nan, axis=1)
+    inserted = 0
+    for idx, missing in gaps:
+        pos = idx + inserted
+        following = chunk[sample_row, idx]
+        padded[sample_row, pos:pos + missing] = np.arange(
+            following - missing, following
+        )
+        inserted += missing
+    return padded
@@ -0,0 +1,123 @@
+import numpy as np
+
+from brainaccess.utils.processing import BandPass
+
+IMPEDANCE_DRIVE_AMPS = 6.0e-9  # 6 nA
+BOARD_RESISTOR_OHMS = 2 * 4.7e3  # 4.7 kOhm
+
+
+def impedance_from_std(std: np.ndarray) -> np.ndarray:
+    """Electrode impedance from the standard deviation of the drive signal
+    Impedance calculated as in https://openbci.com/community/openbci-measuring-electrode-impedance/
+
+    Parameters
+    ----------
+    std: np.ndarray
+        standard deviation of the band-passed signal per channel (uV)
+
+    Returns
+    -------
+    np.ndarray
+        impedance per channel (kOhm), negative values are clipped to 0
+    """
+    impedance = (
+        (np.sqrt(2.0) * std * 1.0e-6) / IMPEDANCE_DRIVE_AMPS - BOARD_RESISTOR_OHMS
+    ) / 1000
+    impedance[impedance < 0] = 0
+    return impedance
+
+
+class ImpedanceEstimator:
+    """Online electrode impedance estimator fed chunk by chunk.
+
+    Every chunk is band-passed around the impedance drive frequency with a
+    stateful BandPass stage, and the power of the
+    filtered signal is tracked with an exponentially weighted mean. Both cost
+    O(channels x chunk) per chunk, the current impedances are available at
+    any time in O(channels) and follow the signal with one chunk of latency.
+
+    Examples
+    --------
+    >>> estimator = ImpedanceEstimator(n_channels=8, sample_frequency=250)
+    >>> estimator.update(chunk)
+    >>> estimator.impedances
+    """
+
+    def __init__(
+        self,
+        n_channels: int,
+        sample_frequency: float,
+        band: tuple = (26.2, 36.2),
+        order: int = 4,
+        time_constant: float = 1.0,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        n_channels: int
+            number of electrode channels
+        sample_frequency: float
+            sampling frequency (Hz)
+        band: tuple
+            pass band (Hz), by default 5 Hz either side of the 31.2 Hz drive
+            frequency
+        order: int
+            Butterworth filter order
+        time_constant: float
+            time constant of the power average (s)
+        """
+        self.n_channels: int = n_channels
+        self.sample_frequency: float = sample_frequency
+        self.time_constant: float = time_constant
+        self.filter: BandPass = BandPass(band[0], band[1], sample_frequency, order)
+        self._decay: float = float(np.exp(-1.0 / (time_constant * sample_frequency)))
+        self._weights: dict = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the filter state and the power estimate"""
+        self.n_samples: int = 0
+        self.filter.reset()
+        self._power: np.ndarray = np.zeros(self.n_channels)
+        self._weight_sum: float = 0.0
+
+    def _chunk_weights(self, n: int) -> np.ndarray:
+        weights = self._weights.get(n)
+        if weights is None:
+            # weight of sample k in an exponential average updated per sample
+            weights = (1 - self._decay) * self._decay ** np.arange(n - 1, -1, -1)
+            self._weights[n] = weights
+        return weights
+
+    def update(self, chunk: np.ndarray) -> None:
+        """Adds a chunk of electrode samples
+
+        Parameters
+        ----------
+        chunk: np.ndarray
+            data of shape (n_channels, samples) in uV. Samples containing NaN
+            (e.g. padded gaps) are skipped.
+        """
+        filtered = self.filter.process(chunk)
+        missing = np.isnan(filtered).any(axis=0)
+        if missing.any():
+            filtered = filtered[:, ~missing]
+        n = filtered.shape[1]
+        if n == 0:
+            return
+        decay = self._decay**n
+        self._power = decay * self._power + np.square(filtered) @ self._chunk_weights(n)
+        self._weight_sum = decay * self._weight_sum + (1 - decay)
+        self.n_samples += n
+
+    @property
+    def std(self) -> np.ndarray:
+        """Standard deviation of the band-passed signal per channel (uV)"""
+        if self._weight_sum == 0:
+            return np.zeros(self.n_channels)
+        return np.sqrt(self._power / self._weight_sum)
+
+    @property
+    def impedances(self) -> np.ndarray:
+        """Current impedance per channel (kOhm)"""
+        return impedance_from_std(self.std)
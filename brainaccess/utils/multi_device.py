@@ -0,0 +1,221 @@
+import asyncio
+import time
+import typing
+
+import numpy as np
+
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.utils.ring_buffer import BufferOverrun
+
+
+class MultiDeviceManager:
+    """Acquires data from several devices on one event loop.
+
+    Devices are connected and started concurrently, so connecting takes about
+    as long as the slowest device. Chunks of all devices are merged into one
+    time aligned buffer: each device's sample numbers (SAMPLE_NUMBER channel,
+    which is enabled automatically) are shifted by an offset estimated from the
+    host receive time of its first chunk, so column k of the merged buffer
+    holds the samples every device took at about the same moment.
+
+    The merged buffer is a mirrored ring (every column is stored twice), so
+    any window up to the buffer capacity is a contiguous view and reads never
+    copy.
+
+    Examples
+    --------
+    >>> multi = MultiDeviceManager([mgr_a, mgr_b])
+    >>> await multi.connect(["/dev/rfcomm0", "/dev/rfcomm1"])
+    >>> await multi.start_stream(channels)
+    >>> window = multi.read_latest(250)
+    """
+
+    def __init__(self, managers: list, capacity: int = 250 * 60) -> None:
+        """Creates multi device manager
+
+        Parameters
+        ----------
+        managers: list
+            EEG managers, one per device
+        capacity: int
+            number of merged samples kept
+        """
+        self.managers: list = list(managers)
+        self.capacity: int = capacity
+        self.sample_frequency: typing.Optional[int] = None
+        self.channels: list = []
+        self.device_offsets: list = [None] * len(self.managers)
+        self.first_receive_times: list = [None] * len(self.managers)
+        self._rows: list = []
+        self._sample_rows: list = []
+        self._ends: list = [0] * len(self.managers)
+        self._data: typing.Optional[np.ndarray] = None
+        self._t0: typing.Optional[float] = None
+
+    async def connect(self, ports: list) -> list:
+        """Connects all devices concurrently
+
+        Parameters
+        ----------
+        ports: list
+            port of every device, in manager order
+
+        Returns
+        -------
+        list
+            connection result of every device
+        """
+        return await asyncio.gather(
+            *[mgr.connect(port) for mgr, port in zip(self.managers, ports)]
+        )
+
+    def disconnect(self) -> None:
+        """Disconnects all devices"""
+        for mgr in self.managers:
+            mgr.disconnect()
+
+    async def start_stream(self, channels: typing.Optional[list] = None) -> None:
+        """Enables channels and starts all streams together
+
+        Parameters
+        ----------
+        channels: list
+            channel IDs (brainaccess.core.eeg_channel) to enable on every device.
+            If None channels must be enabled on the managers beforehand.
+        """
+        self._data = None
+        self._t0 = None
+        self._ends = [0] * len(self.managers)
+        self.device_offsets = [None] * len(self.managers)
+        self.first_receive_times = [None] * len(self.managers)
+        for idx, mgr in enumerate(self.managers):
+            for channel in channels or []:
+                mgr.set_channel_enabled(channel, True)
+            mgr.set_channel_enabled(eeg_channel.SAMPLE_NUMBER, True)
+            mgr.set_callback_chunk(
+                lambda chunk, size, idx=idx: self._on_chunk(idx, chunk, size),
+                as_numpy=True,
+            )
+        await asyncio.gather(*[mgr.start_stream() for mgr in self.managers])
+        frequencies = {mgr.get_sample_frequency() for mgr in self.managers}
+        if len(frequencies) != 1:
+            raise RuntimeError("Devices stream at different sample frequencies")
+        self.sample_frequency = frequencies.pop()
+        self.channels = []
+        self._rows = []
+        self._sample_rows = []
+        row = 0
+        for idx, mgr in enumerate(self.managers):
+            layout = mgr.stream_layout
+            self.channels.extend([(idx, channel) for channel in layout.channels])
+            self._rows.append(slice(row, row + layout.n_channels))
+            self._sample_rows.append(layout.index(eeg_channel.SAMPLE_NUMBER))
+            row += layout.n_channels
+        self._data = np.full((row, 2 * self.capacity), np.nan)
+
+    async def stop_stream(self) -> None:
+        """Stops all streams together"""
+        await asyncio.gather(*[mgr.stop_stream() for mgr in self.managers])
+        for mgr in self.managers:
+            mgr.set_callback_chunk(None)
+
+    def _on_chunk(self, idx, chunk, chunk_size):
+        # runs in the reader thread of device idx, which is the only writer of its rows
+        data = self._data
+        if data is None:
+            return  # streams still starting
+        receive_time = time.perf_counter()
+        first_sample = int(chunk[self._sample_rows[idx], 0])
+        if self.device_offsets[idx] is None:
+            fs = self.sample_frequency
+            device_t0 = receive_time - (first_sample + chunk_size) / fs
+            if self._t0 is None:
+                self._t0 = device_t0
+            self.first_receive_times[idx] = receive_time
+            self.device_offsets[idx] = int(round((device_t0 - self._t0) * fs))
+        start = first_sample + self.device_offsets[idx]
+        skip = max(0, -start)  # device started slightly before the reference
+        if skip >= chunk_size:
+            return
+        start += skip
+        rows = self._rows[idx]
+        end = self._ends[idx]
+        if start > end:
+            # dropped samples, mark them missing; only the last capacity of
+            # them are still in the buffer
+            n_missing = min(start - end, self.capacity)
+            missing = np.full((rows.stop - rows.start, n_missing), np.nan)
+            self._write(data, rows, start - n_missing, missing)
+        self._write(data, rows, start, chunk[:, skip:])
+        self._ends[idx] = max(end, start + chunk_size - skip)
+
+    def _write(self, data, rows, start, values):
+        n = values.shape[1]
+        if n > self.capacity:
+            start += n - self.capacity
+            values = values[:, n - self.capacity:]
+            n = self.capacity
+        pos = start % self.capacity
+        first = min(n, self.capacity - pos)
+        # every column is stored at pos and pos + capacity
+        data[rows, pos:pos + first] = values[:, :first]
+        data[rows, pos + self.capacity:pos + self.capacity + first] = values[:, :first]
+        if first < n:
+            data[rows, : n - first] = values[:, first:]
+            data[rows, self.capacity: self.capacity + n - first] = values[:, first:]
+
+    @property
+    def cursor(self) -> int:
+        """Merged sample index up to which every device has delivered data"""
+        return min(self._ends)
+
+    def read(self, start: int, stop: typing.Optional[int] = None) -> np.ndarray:
+        """Merged samples [start, stop) without copying
+
+        Warning
+        -------
+        The returned array is a view into the buffer and is overwritten once
+        the devices write ``capacity`` more samples, copy it to keep it.
+
+        Parameters
+        ----------
+        start: int
+            merged index of the first sample
+        stop: int
+            merged index after the last sample, current cursor if None
+
+        Returns
+        -------
+        np.ndarray
+            data of shape (channels of all devices, stop - start), rows
+            ordered as ``channels``
+        """
+        if self._data is None:
+            raise RuntimeError("Stream not started")
+        if stop is None:
+            stop = self.cursor
+        if start > stop or stop > self.cursor:
+            raise ValueError("Requested samples have not been written yet")
+        if start < max(self._ends) - self.capacity:
+            raise BufferOverrun(
+                f"Samples before {max(self._ends) - self.capacity} were overwritten"
+            )
+        pos = start % self.capacity
+        return self._data[:, pos:pos + stop - start]
+
+    def read_latest(self, samples: int) -> np.ndarray:
+        """Latest merged samples available from all devices, without copying
+
+        Parameters
+        ----------
+        samples: int
+            number of samples, limited by the amount available
+
+        Returns
+        -------
+        np.ndarray
+            data of shape (channels of all devices, n)
+        """
+        stop = self.cursor
+        start = max(stop - samples, max(self._ends) - self.capacity, 0)
+        return self.read(start, max(start, stop))
@@ -0,0 +1,446 @@
+import json
+import socket
+import struct
+import threading
+import typing
+
+import numpy as np
+
+from brainaccess.utils.annotations import AnnotationCursor, AnnotationStore
+from brainaccess.utils.processing import LowPass
+from brainaccess.utils.ring_buffer import BufferOverrun, ChunkRingBuffer
+
+# frame header: type, reserved, channels, samples (payload bytes for
+# non-data frames), stream position of the first sample
+_FRAME = struct.Struct("<BBHIq")
+SUBSCRIBE = 1
+HEADER = 2
+DATA = 3
+ANNOTATION = 4
+# largest subscribe, header or annotation payload accepted
+MAX_MESSAGE_BYTES = 64 * 1024
+# largest data payload accepted, about a minute of 32 channels at 8 kHz
+MAX_DATA_BYTES = 64 * 1024 * 1024
+# anti-aliasing cutoff as a fraction of the decimated Nyquist frequency
+_ANTI_ALIAS_CUTOFF = 0.8
+
+
+def _send_frame(
+    sock: socket.socket, kind: int, payload: bytes, position: int = 0, shape=None
+) -> None:
+    if shape is None:
+        shape = (0, len(payload))
+    sock.sendall(_FRAME.pack(kind, 0, shape[0], shape[1], position) + payload)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    pos = 0
+    while pos < n:
+        received = sock.recv_into(view[pos:])
+        if not received:
+            raise ConnectionError("Connection closed")
+        pos += received
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket, data: bool = True) -> tuple:
+    """Reads one frame
+
+    Parameters
+    ----------
+    data: bool
+        accept data frames
+
+    Returns
+    -------
+    tuple
+        (type, position, payload), payload is an array of shape
+        (channels, samples) for data frames, bytes otherwise
+
+    Raises
+    ------
+    ValueError
+        if the frame is not accepted or larger than allowed, before its
+        payload is allocated
+    """
+    kind, _, n_channels, n, position = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    if kind == DATA:
+        if not data:
+            raise ValueError("Unexpected data frame")
+        if 4 * n_channels * n > MAX_DATA_BYTES:
+            raise ValueError(f"Data frame of {4 * n_channels * n} bytes is too large")
+        payload = np.frombuffer(_recv_exact(sock, 4 * n_channels * n), dtype="<f4")
+        return kind, position, payload.reshape(n_channels, n)
+    if kind not in (SUBSCRIBE, HEADER, ANNOTATION):
+        raise ValueError(f"Unknown frame type {kind}")
+    if n > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Frame of {n} bytes is too large")
+    return kind, position, _recv_exact(sock, n)
+
+
+class StreamServer:
+    """Streams chunks and annotations of a ChunkFanout over TCP.
+
+    Each client picks a subset of channels and a decimation factor when it
+    connects and then receives frames of float32 samples, each starting
+    with the position of its first sample, followed by annotation frames.
+    Every client is served by its own thread reading its own subscription,
+    a slow client skips samples (a jump in position) and never delays
+    acquisition or the other clients.
+
+    Positions are device sample numbers, read from the ``sample_row`` of
+    every chunk, so they match the Sample channel and the timestamps of the
+    manager annotations, which are forwarded when ``annotation_source`` is
+    given. A frame ends where sample numbers jump (dropped samples, stream
+    restart), the jump shows up between frames. Without ``sample_row``
+    positions count the samples published to the fanout since its creation.
+
+    Frames are a 16 byte little endian header (type, reserved, channels,
+    samples or payload bytes, position) and a payload: float32
+    channel-major samples for data frames, UTF-8 for annotations, JSON for
+    subscribe and header frames.
+
+    With decimation, EEG channels are low-pass filtered (LowPass at 0.8 of
+    the decimated Nyquist frequency) per client before the samples whose
+    position is divisible by the decimation are kept, other channels (sample
+    number, digital input, accelerometer) are only picked. Requests are
+    limited to MAX_MESSAGE_BYTES.
+
+    Examples
+    --------
+    >>> server = StreamServer(fanout, info.ch_names, 250, port=0)
+    >>> server.start()
+    >>> client = StreamClient(*server.address, channels=["O1", "O2"])
+    """
+
+    def __init__(
+        self,
+        fanout,
+        ch_names: list,
+        sfreq: float,
+        ch_types: typing.Optional[list] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        interval: float = 0.02,
+        sample_row: typing.Optional[int] = None,
+        annotation_source=None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        fanout: ChunkFanout
+            stream to serve
+        ch_names: list
+            channel name of every row
+        sfreq: float
+            sample frequency
+        ch_types: list
+            MNE channel type of every row, misc if None
+        host: str
+            interface to listen on, "0.0.0.0" for the LAN
+        port: int
+            port to listen on, any free port if 0
+        interval: float
+            seconds between sends to a client
+        sample_row: int
+            row holding the device sample number, used as position
+        annotation_source
+            EEG manager whose annotations are sent to the clients
+        """
+        self.fanout = fanout
+        self.ch_names: list = list(ch_names)
+        self.ch_types: list = (
+            list(ch_types) if ch_types is not None else ["misc"] * len(ch_names)
+        )
+        self.sfreq: float = sfreq
+        self.interval: float = interval
+        self.sample_row: typing.Optional[int] = sample_row
+        self.annotation_source = annotation_source
+        self._annotation_cursor: AnnotationCursor = AnnotationCursor()
+        self._rows = {name: row for row, name in enumerate(self.ch_names)}
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._clients: list = []
+        self._mtx = threading.Lock()
+        self._closing = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> tuple:
+        """(host, port) the server listens on"""
+        return self._sock.getsockname()[:2]
+
+    def start(self) -> None:
+        """Starts accepting clients"""
+        self._sock.listen()
+        # accept wakes up regularly to notice close and forward annotations
+        self._sock.settimeout(0.1)
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def annotate(self, description: str, position: typing.Optional[int] = None) -> None:
+        """Sends annotation to all connected clients
+
+        Parameters
+        ----------
+        description: str
+            annotation text
+        position: int
+            position the annotation refers to, the next sample if None
+        """
+        if position is None:
+            position = self._next_position()
+        with self._mtx:
+            for client in self._clients:
+                client["annotations"].append((position, description))
+
+    def _next_position(self) -> int:
+        ring = self.fanout.ring
+        if self.sample_row is None:
+            return ring.cursor
+        while True:
+            try:
+                last, _ = ring.read_latest(1)
+                break
+            except BufferOverrun:
+                continue
+        return int(last[self.sample_row, 0]) + 1 if last.shape[1] else 0
+
+    def _forward_annotations(self) -> None:
+        new, _ = self._annotation_cursor.fetch(self.annotation_source)
+        for annotation in new:
+            self.annotate(annotation.annotation, annotation.timestamp)
+
+    def close(self) -> None:
+        """Stops the server and disconnects all clients"""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sock.close()
+        with self._mtx:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client["sock"].shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for client in clients:
+            client["thread"].join()
+
+    def _accept(self):
+        while not self._closing.is_set():
+            if self.annotation_source is not None:
+                self._forward_annotations()
+            try:
+                sock, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            sock.settimeout(None)
+            client = {"sock": sock, "annotations": []}
+            client["thread"] = threading.Thread(
+                target=self._serve, args=(client,), daemon=True
+            )
+            with self._mtx:
+                self._clients.append(client)
+            client["thread"].start()
+
+    def _serve(self, client: dict):
+        sock = client["sock"]
+        subscription = None
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            kind, _, payload = _recv_frame(sock, data=False)
+            if kind != SUBSCRIBE:
+                raise ValueError("Expected subscribe frame")
+            request = json.loads(payload)
+            channels = request.get("channels") or self.ch_names
+            decimation = int(request.get("decimation", 1))
+            rows = [self._rows[name] for name in channels]
+            if decimation < 1:
+                raise ValueError("Decimation must be positive")
+            header = {
+                "ch_names": [self.ch_names[row] for row in rows],
+                "ch_types": [self.ch_types[row] for row in rows],
+                "sfreq": self.sfreq / decimation,
+                "decimation": decimation,
+            }
+            anti_alias = None
+            eeg_rows = [i for i, row in enumerate(rows) if self.ch_types[row] == "eeg"]
+            if decimation > 1 and eeg_rows:
+                anti_alias = LowPass(
+                    _ANTI_ALIAS_CUTOFF * self.sfreq / 2 / decimation, self.sfreq
+                )
+            subscription = self.fanout.subscribe(f"tcp {sock.getpeername()}")
+            _send_frame(sock, HEADER, json.dumps(header).encode())
+            expected = subscription.cursor
+            while not self._closing.wait(self.interval):
+                chunk, start = subscription.read_new()
+                data = chunk[rows]
+                if anti_alias is not None and data.shape[1]:
+                    if start != expected:
+                        # samples were skipped, the filter state is stale
+                        anti_alias.reset()
+                    data[eeg_rows] = anti_alias.process(data[eeg_rows])
+                expected = start + data.shape[1]
+                if self.sample_row is None:
+                    positions = np.arange(start, expected)
+                else:
+                    positions = chunk[self.sample_row].astype(np.int64)
+                # keep positions divisible by decimation across frames
+                keep = positions % decimation == 0
+                data = data[:, keep]
+                positions = positions[keep]
+                # a frame is contiguous, it ends where positions jump
+                breaks = np.flatnonzero(np.diff(positions) != decimation) + 1
+                firsts = positions[np.r_[0, breaks]] if positions.size else []
+                for part, position in zip(np.split(data, breaks, axis=1), firsts):
+                    payload = np.ascontiguousarray(part, dtype="<f4").tobytes()
+                    _send_frame(sock, DATA, payload, int(position), part.shape)
+                with self._mtx:
+                    annotations, client["annotations"] = client["annotations"], []
+                for position, description in annotations:
+                    _send_frame(sock, ANNOTATION, description.encode(), position)
+        except (OSError, ValueError, KeyError):
+            # client disconnected or sent an invalid request
+            pass
+        finally:
+            if subscription is not None:
+                subscription.close()
+            with self._mtx:
+                self._clients = [c for c in self._clients if c is not client]
+            sock.close()
+
+
+class StreamClient:
+    """Receives a StreamServer stream into a local ring buffer.
+
+    Samples are kept in a ChunkRingBuffer of the last tim seconds (at the
+    decimated rate), samples the server skipped or the device dropped are
+    filled with NaN so time indexing stays exact. Positions are those of
+    the server, device sample numbers when served by EEG.start_server, and
+    position maps a ring cursor back to them. Annotations go to an
+    AnnotationStore with positions as timestamps. When positions go back
+    (the device stream restarted) the new samples follow the old ones in the
+    ring and position maps the new ones.
+
+    Attributes
+    ----------
+    ring
+        received samples, rows in ch_names order
+    annotations
+        received annotations
+    skipped_samples
+        number of (decimated) samples the server skipped
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        channels: typing.Optional[list] = None,
+        decimation: int = 1,
+        tim: float = 10.0,
+    ) -> None:
+        """Connects and subscribes
+
+        Parameters
+        ----------
+        host: str
+            server address
+        port: int
+            server port
+        channels: list
+            names of channels to receive, all if None
+        decimation: int
+            receive every n-th sample
+        tim: float
+            length of the local buffer in seconds
+        """
+        self._sock = socket.create_connection((host, port))
+        request = {"channels": channels, "decimation": decimation}
+        _send_frame(self._sock, SUBSCRIBE, json.dumps(request).encode())
+        try:
+            kind, _, payload = _recv_frame(self._sock)
+        except ConnectionError:
+            self._sock.close()
+            raise ValueError("Server rejected the subscription") from None
+        header = json.loads(payload)
+        self.ch_names: list = header["ch_names"]
+        self.ch_types: list = header["ch_types"]
+        self.sfreq: float = header["sfreq"]
+        self.decimation: int = header["decimation"]
+        self.ring: ChunkRingBuffer = ChunkRingBuffer(
+            len(self.ch_names), max(int(tim * self.sfreq), 1)
+        )
+        self.annotations: AnnotationStore = AnnotationStore()
+        self.skipped_samples: int = 0
+        self.error: typing.Optional[Exception] = None
+        # stream position of ring cursor 0
+        self._first: typing.Optional[int] = None
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def position(self, cursor: int) -> int:
+        """Position of a ring cursor, see the class description"""
+        return self._first + cursor * self.decimation
+
+    def read_latest(self, samples: int) -> tuple:
+        """Copies the latest received samples
+
+        Parameters
+        ----------
+        samples: int
+            number of samples, limited by the amount available
+
+        Returns
+        -------
+        tuple
+            (data of shape (channels, n), position of the first sample)
+        """
+        data, start = self.ring.read_latest(samples)
+        if self._first is None:
+            return data, 0
+        return data, self.position(start)
+
+    def close(self) -> None:
+        """Disconnects"""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._thread.join()
+        self._sock.close()
+
+    def _receive(self):
+        try:
+            while True:
+                kind, position, payload = _recv_frame(self._sock)
+                if kind == DATA:
+                    self._write(position, payload)
+                elif kind == ANNOTATION:
+                    self.annotations.add(position, payload.decode())
+        except (OSError, ValueError) as e:
+            # ConnectionError when the server or close ends the stream,
+            # ValueError for a malformed frame
+            if not isinstance(e, ConnectionError):
+                self.error = e
+
+    def _write(self, position: int, data: np.ndarray):
+        if self._first is None:
+            self._first = position
+        missing = (position - self.position(self.ring.cursor)) // self.decimation
+        if missing < 0:
+            # restarted, cursor 0 moves so that the new samples map right
+            self._first = position - self.ring.cursor * self.decimation
+        elif missing > 0:
+            self.skipped_samples += missing
+            gap = np.full((data.shape[0], min(missing, self.ring.capacity)), np.nan)
+            self.ring.write(gap)
+            # cursor 0 moves so that the ring cursor keeps mapping to positions
+            self._first += (missing - gap.shape[1]) * self.decimation
+        self.ring.write(data)
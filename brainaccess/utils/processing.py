@@ -0,0 +1,151 @@
+"""Per chunk processing stages.
+
+A stage is any object with ``process(chunk) -> chunk`` taking and returning
+arrays of shape (channels, samples) and ``reset()`` forgetting its state.
+The filters here are causal IIR filters in second-order sections that keep
+their state between chunks, so a stream filtered chunk by chunk equals the
+whole recording filtered at once and every sample is filtered exactly once.
+"""
+
+import typing
+
+import numpy as np
+import scipy.signal  # type: ignore
+
+
+class SosFilter:
+    """Causal IIR filter in second-order sections, stateful across chunks.
+
+    The state is initialised on the first chunk to the steady state of its
+    first sample, so a DC offset does not cause a start-up transient.
+    Samples containing NaN (e.g. padded gaps) are output as NaN and do not
+    touch the state.
+    """
+
+    def __init__(self, sos: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        sos: np.ndarray
+            second-order sections of shape (n_sections, 6)
+        """
+        self.sos: np.ndarray = np.asarray(sos, dtype=np.float64)
+        self._zi: typing.Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forgets the filter state, e.g. on stream restart"""
+        self._zi = None
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Filters the next chunk
+
+        Parameters
+        ----------
+        chunk: np.ndarray
+            data of shape (channels, samples)
+
+        Returns
+        -------
+        np.ndarray
+            filtered data of the same shape
+        """
+        missing = np.isnan(chunk).any(axis=0)
+        if missing.any():
+            out = np.full(chunk.shape, np.nan)
+            if not missing.all():
+                out[:, ~missing] = self.process(chunk[:, ~missing])
+            return out
+        if chunk.shape[1] == 0:
+            return np.array(chunk, dtype=np.float64)
+        if self._zi is None:
+            zi = scipy.signal.sosfilt_zi(self.sos)
+            self._zi = zi[:, np.newaxis, :] * chunk[np.newaxis, :, 0, np.newaxis]
+        out, self._zi = scipy.signal.sosfilt(self.sos, chunk, axis=1, zi=self._zi)
+        return out
+
+
+class BandPass(SosFilter):
+    """Butterworth band-pass filter"""
+
+    def __init__(
+        self, low: float, high: float, sample_frequency: float, order: int = 4
+    ) -> None:
+        """
+        Parameters
+        ----------
+        low: float
+            lower edge of the pass band (Hz)
+        high: float
+            upper edge of the pass band (Hz)
+        sample_frequency: float
+            sampling frequency (Hz)
+        order: int
+            filter order
+        """
+        super().__init__(
+            scipy.signal.butter(
+                order, (low, high), btype="bandpass", fs=sample_frequency, output="sos"
+            )
+        )
+
+
+class HighPass(SosFilter):
+    """Butterworth high-pass filter, e.g. to remove electrode drift"""
+
+    def __init__(self, cutoff: float, sample_frequency: float, order: int = 4) -> None:
+        """
+        Parameters
+        ----------
+        cutoff: float
+            cutoff frequency (Hz)
+        sample_frequency: float
+            sampling frequency (Hz)
+        order: int
+            filter order
+        """
+        super().__init__(
+            scipy.signal.butter(
+                order, cutoff, btype="highpass", fs=sample_frequency, output="sos"
+            )
+        )
+
+
+class LowPass(SosFilter):
+    """Butterworth low-pass filter, e.g. anti-aliasing before decimation"""
+
+    def __init__(self, cutoff: float, sample_frequency: float, order: int = 8) -> None:
+        """
+        Parameters
+        ----------
+        cutoff: float
+            cutoff frequency (Hz)
+        sample_frequency: float
+            sampling frequency (Hz)
+        order: int
+            filter order
+        """
+        super().__init__(
+            scipy.signal.butter(
+                order, cutoff, btype="lowpass", fs=sample_frequency, output="sos"
+            )
+        )
+
+
+class Notch(SosFilter):
+    """Notch filter, e.g. for power line interference"""
+
+    def __init__(
+        self, frequency: float, sample_frequency: float, quality: float = 30.0
+    ) -> None:
+        """
+        Parameters
+        ----------
+        frequency: float
+            frequency to remove (Hz)
+        sample_frequency: float
+            sampling frequency (Hz)
+        quality: float
+            quality factor, frequency divided by the -3 dB bandwidth
+        """
+        b, a = scipy.signal.iirnotch(frequency, quality, fs=sample_frequency)
+        super().__init__(scipy.signal.tf2sos(b, a))
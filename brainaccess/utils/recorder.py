@@ -0,0 +1,237 @@
+import json
+import os
+import pathlib
+import threading
+import time
+import typing
+
+import numpy as np
+import mne  # type: ignore
+
+
+def _path(fname: pathlib.Path, suffix: str) -> pathlib.Path:
+    # appended, so dots in the base name (sub-01.run1) are kept
+    return fname.with_name(fname.name + suffix)
+
+
+class StreamRecorder:
+    """Writes chunks and annotations to disk while acquiring.
+
+    The chunk callback only queues the chunk, a writer thread writes the
+    queued chunks in one batch every ``flush_interval`` seconds and fsyncs
+    every ``fsync_interval`` seconds. A recording consists of three files
+    sharing a base name:
+
+    - ``<fname>.json``: header with channel names and types, sampling rate
+      and start time
+    - ``<fname>.dat``: samples as little endian float64, sample-major
+      (every sample stores all channels)
+    - ``<fname>.events``: one JSON object per line with the annotation
+      ``sample`` and ``description``
+
+    After a crash the recording is readable with read_recording up to the
+    last flushed chunk. If writing fails (e.g. the disk is full) the writer
+    stops, error is set and further chunks are dropped instead of queued.
+
+    Attributes
+    ----------
+    error
+        exception that stopped the writer, None while recording works
+    dropped_samples
+        number of samples not recorded because of error
+
+    Examples
+    --------
+    >>> recorder = StreamRecorder("session", eeg.info.ch_names, 250)
+    >>> recorder.write(chunk)
+    >>> recorder.close()
+    >>> raw = read_recording("session")
+    """
+
+    def __init__(
+        self,
+        fname: typing.Union[str, pathlib.Path],
+        ch_names: list,
+        sfreq: float,
+        ch_types: typing.Optional[list] = None,
+        flush_interval: float = 1.0,
+        fsync_interval: float = 5.0,
+    ) -> None:
+        """Creates the recording files and starts the writer thread
+
+        Parameters
+        ----------
+        fname: str or pathlib.Path
+            base name of the recording files
+        ch_names: list
+            channel names, in chunk row order
+        sfreq: float
+            sampling frequency
+        ch_types: list
+            MNE channel types, eeg if None
+        flush_interval: float
+            seconds between batched writes
+        fsync_interval: float
+            seconds between forcing written data to disk
+        """
+        self.fname = pathlib.Path(fname)
+        self.n_channels: int = len(ch_names)
+        self.flush_interval: float = flush_interval
+        self.fsync_interval: float = fsync_interval
+        self.n_samples: int = 0
+        self.dropped_samples: int = 0
+        self.error: typing.Optional[Exception] = None
+        header = {
+            "ch_names": list(ch_names),
+            "ch_types": list(ch_types) if ch_types else ["eeg"] * self.n_channels,
+            "sfreq": sfreq,
+            "dtype": "<f8",
+            "start_time": time.time(),
+        }
+        with open(_path(self.fname, ".json"), "w") as f:
+            json.dump(header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        self._data_file = open(_path(self.fname, ".dat"), "wb")
+        self._events_file = open(_path(self.fname, ".events"), "w")
+        self._chunks: list = []
+        self._events: list = []
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="brainaccess-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, chunk: np.ndarray) -> None:
+        """Queues chunk for writing. Safe to call from the chunk callback.
+
+        Parameters
+        ----------
+        chunk: np.ndarray
+            data of shape (channels, samples), must not be modified afterwards
+        """
+        with self._cond:
+            if self.error is not None:
+                # the writer stopped, queueing would only grow memory
+                self.dropped_samples += chunk.shape[1]
+            else:
+                self._chunks.append(chunk)
+            self.n_samples += chunk.shape[1]
+
+    def annotate(self, description: str, sample: typing.Optional[int] = None) -> None:
+        """Queues annotation for writing
+
+        Parameters
+        ----------
+        description: str
+            annotation text
+        sample: int
+            recording sample the annotation refers to, the number of samples
+            recorded so far if None
+        """
+        with self._cond:
+            if self.error is not None:
+                return
+            if sample is None:
+                sample = self.n_samples
+            self._events.append({"sample": int(sample), "description": description})
+
+    def _run(self):
+        next_sync = time.monotonic() + self.fsync_interval
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing, timeout=self.flush_interval)
+                chunks, self._chunks = self._chunks, []
+                events, self._events = self._events, []
+                closing = self._closing
+            try:
+                if chunks:
+                    data = np.concatenate(chunks, axis=1).T
+                    self._data_file.write(
+                        np.ascontiguousarray(data, dtype="<f8").tobytes()
+                    )
+                    self._data_file.flush()
+                if events:
+                    self._events_file.write(
+                        "".join(json.dumps(event) + "\n" for event in events)
+                    )
+                    self._events_file.flush()
+                if closing or time.monotonic() >= next_sync:
+                    os.fsync(self._data_file.fileno())
+                    os.fsync(self._events_file.fileno())
+                    next_sync = time.monotonic() + self.fsync_interval
+            except OSError as e:
+                with self._cond:
+                    self.error = e
+                    # the failed batch and everything queued meanwhile
+                    self.dropped_samples += sum(
+                        c.shape[1] for c in chunks + self._chunks
+                    )
+                    self._chunks = []
+                    self._events = []
+                return
+            if closing:
+                return
+
+    def close(self) -> None:
+        """Writes the remaining chunks, syncs and closes the files
+
+        Raises
+        ------
+        RuntimeError
+            if writing failed
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        self._data_file.close()
+        self._events_file.close()
+        if self.error is not None:
+            raise RuntimeError(f"Recording {self.fname} failed: {self.error}")
+
+
+def read_recording(fname: typing.Union[str, pathlib.Path]) -> mne.io.BaseRaw:
+    """Reads a recording written by StreamRecorder
+
+    Incomplete trailing samples or annotation lines, e.g. after a crash,
+    are ignored.
+
+    Parameters
+    ----------
+    fname: str or pathlib.Path
+        base name of the recording files
+
+    Returns
+    -------
+    mne.io.BaseRaw
+        Raw MNE EEG data structure with annotations
+    """
+    fname = pathlib.Path(fname)
+    with open(_path(fname, ".json")) as f:
+        header = json.load(f)
+    n_channels = len(header["ch_names"])
+    dat = _path(fname, ".dat")
+    n_samples = os.path.getsize(dat) // (8 * n_channels)
+    data = np.fromfile(dat, dtype=header["dtype"], count=n_samples * n_channels)
+    info = mne.create_info(
+        header["ch_names"], ch_types=header["ch_types"], sfreq=header["sfreq"]
+    )
+    raw = mne.io.RawArray(data.reshape(n_samples, n_channels).T, info, verbose=False)
+    onset = []
+    description = []
+    events = _path(fname, ".events")
+    if events.exists():
+        with open(events) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # partially written last line
+                onset.append(event["sample"] / header["sfreq"])
+                description.append(event["description"])
+    raw.set_annotations(
+        mne.Annotations(onset, np.zeros(len(onset)), description), verbose=False
+    )
+    return raw
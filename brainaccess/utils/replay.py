@@ -0,0 +1,162 @@
+import bisect
+import typing
+
+import mne  # type: ignore
+import numpy as np
+
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.core.annotation import Annotation
+from brainaccess.core.stream_layout import StreamLayout
+from brainaccess.utils.simulation import _VirtualEEGManager, _type_code
+
+_NAMED_CHANNELS = {
+    "Sample": eeg_channel.SAMPLE_NUMBER,
+    "Digital": eeg_channel.DIGITAL_INPUT,
+    "Accel_x": eeg_channel.ACCELEROMETER + 0,
+    "Accel_y": eeg_channel.ACCELEROMETER + 1,
+    "Accel_z": eeg_channel.ACCELEROMETER + 2,
+}
+
+
+class ReplayEEGManager(_VirtualEEGManager):
+    """EEG manager replaying a recording saved by EEGData.save (.fif).
+
+    The file is read lazily, a block of ``block_seconds`` at a time, and
+    streamed through the chunk callback exactly like a live device, at real
+    time, N times faster or as fast as possible. Opening a long recording
+    neither loads nor copies it.
+    Recorded annotations become available through get_annotations once the
+    playback reaches them; new ones can be added with annotate.
+
+    The sample number channel counts from stream start, as on a device.
+    Enabled channels missing from the recording are not streamed.
+
+    Examples
+    --------
+    >>> with ReplayEEGManager("20240101_1200-raw.fif", speed=None) as mgr:
+    ...     eeg.setup(mgr, cap=cap)
+    ...     eeg.start_acquisition()
+    """
+
+    def __init__(
+        self,
+        fname: str,
+        speed: typing.Optional[float] = 1.0,
+        chunk_size: int = 25,
+        cap: typing.Optional[dict] = None,
+        block_seconds: float = 10.0,
+    ) -> None:
+        """Opens recording for replay
+
+        Parameters
+        ----------
+        fname: str
+            recording to replay
+        speed: float
+            1 for real time, N for N times faster, None for as fast as possible
+        chunk_size: int
+            samples per chunk
+        cap: dict
+            electrode number to channel name, as passed to EEG.setup. If None
+            the EEG channels of the file are numbered in file order.
+        block_seconds: float
+            length of the blocks read from the file
+        """
+        self.raw: mne.io.BaseRaw = mne.io.read_raw_fif(
+            fname, preload=False, verbose=False
+        )
+        super().__init__(int(self.raw.info["sfreq"]), chunk_size, speed)
+        if cap is None:
+            eeg_names = [
+                self.raw.ch_names[i] for i in mne.pick_types(self.raw.info, eeg=True)
+            ]
+            cap = dict(enumerate(eeg_names))
+        channels = dict(_NAMED_CHANNELS)
+        for electrode, name in cap.items():
+            channels[name] = eeg_channel.ELECTRODE_MEASUREMENT + electrode
+        # channel ID to row of the file
+        self._rows: dict = {
+            channels[name]: row
+            for row, name in enumerate(self.raw.ch_names)
+            if name in channels
+        }
+        self._block_samples: int = max(int(block_seconds * self.raw.info["sfreq"]), 1)
+        # samples [_block_start, _block_start + _block.shape[1]) read last
+        self._block: np.ndarray = np.empty((len(self.raw.ch_names), 0))
+        self._block_start: int = 0
+        annotations = self.raw.annotations
+        timestamps = self.raw.time_as_index(
+            annotations.onset, use_rounding=True, origin=annotations.orig_time
+        )
+        order = np.argsort(timestamps, kind="stable")
+        self._replay_timestamps: list = [int(timestamps[i]) for i in order]
+        self._replay_annotations: list = [
+            Annotation(int(timestamps[i]), annotations.description[i].encode("ascii"))
+            for i in order
+        ]
+        self._replay_start = 0
+
+    @property
+    def n_samples(self) -> int:
+        """Number of samples in the recording"""
+        return self.raw.n_times
+
+    def destroy(self):
+        """Stops replay and closes the recording"""
+        super().destroy()
+        self._block = None
+        self.raw = None
+
+    def _read(self, start: int, n: int) -> np.ndarray:
+        """Samples [start, start + n) of all file channels, read block-wise"""
+        offset = start - self._block_start
+        if offset < 0 or offset + n > self._block.shape[1]:
+            stop = min(start + max(n, self._block_samples), self.n_samples)
+            self._block = self.raw.get_data(start=start, stop=stop)
+            self._block_start = start
+            offset = 0
+        return self._block[:, offset:offset + n]
+
+    def _resolve_stream_layout(self):
+        channels = sorted(
+            channel
+            for channel in self._enabled_channels
+            if channel in self._rows or channel == eeg_channel.SAMPLE_NUMBER
+        )
+        return StreamLayout(
+            {channel: index for index, channel in enumerate(channels)},
+            [_type_code(channel) for channel in channels],
+        )
+
+    def _generate(self, layout: StreamLayout, start: int, n: int):
+        n = min(n, self.n_samples - start)
+        if n <= 0:
+            return None
+        data = self._read(start, n)
+        chunk = np.empty((layout.n_channels, n))
+        for row, channel in enumerate(layout.channels):
+            if channel == eeg_channel.SAMPLE_NUMBER:
+                chunk[row] = np.arange(start, start + n)
+            else:
+                chunk[row] = data[self._rows[channel]]
+        return chunk
+
+    def _replay_annotations_until_now(self):
+        """Moves recorded annotations replayed so far to the annotation list"""
+        with self._annotations_mtx:
+            end = bisect.bisect_right(self._replay_timestamps, self.sample_number - 1)
+            if end > self._replay_start:
+                self._annotations.extend(
+                    self._replay_annotations[self._replay_start:end]
+                )
+                self._replay_start = end
+
+    def get_annotations(self, start: int = 0):
+        """Retrieve recorded annotations replayed so far and added ones, in the
+        order they became available, from index start"""
+        self._replay_annotations_until_now()
+        return super().get_annotations(start)
+
+    def clear_annotations(self):
+        self._replay_annotations_until_now()
+        super().clear_annotations()
@@ -0,0 +1,278 @@
+import bisect
+import time
+import typing
+
+import numpy as np
+
+# Upper edges of the callback duration histogram bins in seconds, the last
+# bin collects everything slower than 100 ms
+_HISTOGRAM_EDGES = [
+    1e-6, 2e-6, 5e-6,
+    1e-5, 2e-5, 5e-5,
+    1e-4, 2e-4, 5e-4,
+    1e-3, 2e-3, 5e-3,
+    1e-2, 2e-2, 5e-2,
+    1e-1,
+]
+
+
+class BufferOverrun(RuntimeError):
+    """Raised when requested samples were already overwritten by the producer"""
+
+
+class SeqLock:
+    """Sequence counter publishing single writer updates to lock-free readers.
+
+    The writer makes the counter odd while it changes the protected state and
+    even again when done, it never waits. A reader remembers the (even)
+    counter, reads and keeps the result only if the counter did not change
+    meanwhile, otherwise it retries. The counters below measure contention.
+
+    Attributes
+    ----------
+    sequence
+        twice the number of completed writes, odd while writing
+    reads
+        number of consistent reads
+    retries
+        number of reads repeated because a write overlapped
+    waits
+        number of times a reader found a write in progress
+
+    Examples
+    --------
+    >>> while True:
+    ...     seq = seqlock.read_begin()
+    ...     stop = ring.cursor
+    ...     if seqlock.read_validate(seq):
+    ...         break
+    """
+
+    def __init__(self) -> None:
+        self.sequence: int = 0
+        self.reads: int = 0
+        self.retries: int = 0
+        self.waits: int = 0
+
+    def write_begin(self) -> None:
+        """Marks the start of a write, only one thread may write"""
+        self.sequence += 1
+
+    def write_end(self) -> None:
+        """Marks the end of a write"""
+        self.sequence += 1
+
+    def read_begin(self) -> int:
+        """Waits for a write in progress to finish
+
+        Returns
+        -------
+        int
+            sequence to pass to read_validate
+        """
+        seq = self.sequence
+        while seq & 1:
+            self.waits += 1
+            # let the writer finish
+            time.sleep(0)
+            seq = self.sequence
+        return seq
+
+    def read_validate(self, seq: int) -> bool:
+        """Checks that no write overlapped the read started with read_begin
+
+        Parameters
+        ----------
+        seq: int
+            sequence returned by read_begin
+
+        Returns
+        -------
+        bool
+            True if the read is consistent, False if it must be repeated
+        """
+        if self.sequence == seq:
+            self.reads += 1
+            return True
+        self.retries += 1
+        return False
+
+    def stats(self) -> dict:
+        """Contention counters
+
+        Returns
+        -------
+        dict
+            writes, reads, retries and waits
+        """
+        return {
+            "writes": self.sequence // 2,
+            "reads": self.reads,
+            "retries": self.retries,
+            "waits": self.waits,
+        }
+
+
+class ChunkRingBuffer:
+    """Single producer ring buffer for EEG chunks.
+
+    The producer (the chunk callback running in the reader thread) only copies
+    the chunk into a preallocated array and advances a monotonically
+    increasing write cursor. Consumers read by cursor from any thread and
+    never take a lock the producer needs: a read that raced with the producer
+    overwriting its samples is detected and reported as an overrun.
+
+    Samples are addressed by their absolute position in the stream, i.e. the
+    cursor value at the time they were written. Only the last ``capacity``
+    samples are available.
+
+    Examples
+    --------
+    >>> ring = ChunkRingBuffer(n_channels=13, capacity=250 * 10)
+    >>> mgr.set_callback_chunk(ring.write, as_numpy=True)
+    >>> data, start = ring.read_latest(250)
+    """
+
+    def __init__(
+        self, n_channels: int, capacity: int, dtype: typing.Any = np.float64
+    ) -> None:
+        """Creates ring buffer
+
+        Parameters
+        ----------
+        n_channels: int
+            number of channels (rows) in a chunk
+        capacity: int
+            number of samples kept
+        dtype
+            data type of the buffer
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self.n_channels: int = n_channels
+        self.capacity: int = capacity
+        self.data: np.ndarray = np.zeros((n_channels, capacity), dtype=dtype)
+        # samples [_cursor, _write_end) are being written right now
+        self._cursor: int = 0
+        self._write_end: int = 0
+        self._histogram = [0] * (len(_HISTOGRAM_EDGES) + 1)
+
+    @property
+    def cursor(self) -> int:
+        """Number of samples written since creation (end of the readable range)"""
+        return self._cursor
+
+    @property
+    def oldest(self) -> int:
+        """Cursor of the oldest sample still available"""
+        return max(0, self._write_end - self.capacity)
+
+    def write(self, chunk: np.ndarray, chunk_size: typing.Optional[int] = None) -> None:
+        """Copies chunk into the buffer.
+        Has the chunk callback signature, so it can be passed directly to
+        EEGManager.set_callback_chunk (numpy mode).
+
+        Parameters
+        ----------
+        chunk: np.ndarray
+            data of shape (channels, samples)
+        chunk_size: int
+            number of samples in chunk, taken from chunk if None
+        """
+        start_time = time.perf_counter()
+        if chunk_size is None:
+            chunk_size = chunk.shape[1]
+        cursor = self._cursor
+        if chunk_size > self.capacity:
+            # only the tail fits, skip the rest
+            cursor += chunk_size - self.capacity
+            chunk = chunk[:, chunk_size - self.capacity:]
+            chunk_size = self.capacity
+        self._write_end = cursor + chunk_size
+        pos = cursor % self.capacity
+        first = min(chunk_size, self.capacity - pos)
+        self.data[:, pos:pos + first] = chunk[:, :first]
+        if first < chunk_size:
+            self.data[:, : chunk_size - first] = chunk[:, first:chunk_size]
+        self._cursor = cursor + chunk_size
+        self._histogram[
+            bisect.bisect_left(_HISTOGRAM_EDGES, time.perf_counter() - start_time)
+        ] += 1
+
+    def read(
+        self,
+        start: int,
+        stop: typing.Optional[int] = None,
+        out: typing.Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Copies samples [start, stop) out of the buffer in chronological order
+
+        Parameters
+        ----------
+        start: int
+            cursor of the first sample
+        stop: int
+            cursor after the last sample, current cursor if None
+        out: np.ndarray
+            optional destination of shape (channels, stop - start)
+
+        Returns
+        -------
+        np.ndarray
+            data of shape (channels, stop - start)
+
+        Raises
+        ------
+        BufferOverrun
+            if some of the samples were overwritten before or during the read
+        """
+        if stop is None:
+            stop = self._cursor
+        if start > stop or stop > self._cursor:
+            raise ValueError("Requested samples have not been written yet")
+        if start < self._write_end - self.capacity:
+            raise BufferOverrun(
+                f"Samples before {self._write_end - self.capacity} were overwritten"
+            )
+        n = stop - start
+        if out is None:
+            out = np.empty((self.n_channels, n), dtype=self.data.dtype)
+        pos = start % self.capacity
+        first = min(n, self.capacity - pos)
+        out[:, :first] = self.data[:, pos:pos + first]
+        if first < n:
+            out[:, first:n] = self.data[:, : n - first]
+        # the producer may have started overwriting while we were copying
+        if start < self._write_end - self.capacity:
+            raise BufferOverrun(
+                f"Samples before {self._write_end - self.capacity} were overwritten"
+            )
+        return out
+
+    def read_latest(self, samples: int) -> tuple:
+        """Copies the latest samples out of the buffer
+
+        Parameters
+        ----------
+        samples: int
+            number of samples, limited by the amount available
+
+        Returns
+        -------
+        tuple
+            (data of shape (channels, n), cursor of the first sample)
+        """
+        stop = self._cursor
+        start = max(stop - samples, self.oldest)
+        return self.read(start, stop), start
+
+    def callback_histogram(self) -> tuple:
+        """Histogram of write (callback) durations
+
+        Returns
+        -------
+        tuple
+            (upper bin edges in seconds, counts), counts has one extra bin
+            for durations above the last edge
+        """
+        return np.array(_HISTOGRAM_EDGES), np.array(self._histogram)
@@ -0,0 +1,199 @@
+import json
+import struct
+import typing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from brainaccess.utils.ring_buffer import _HISTOGRAM_EDGES, ChunkRingBuffer
+
+_MAGIC = b"BASTRM01"
+# magic, header size, n_channels, capacity, sample frequency, metadata length
+_FIXED = struct.Struct("<8sQQQdQ")
+# write cursor and write end follow the fixed part as two int64
+_COUNTERS_OFFSET = _FIXED.size
+_METADATA_OFFSET = _COUNTERS_OFFSET + 16
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Opens an existing block without handing it to the resource tracker,
+    which would unlink it when the reading process exits"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedRingBuffer(ChunkRingBuffer):
+    """ChunkRingBuffer placed in shared memory, readable from other processes.
+
+    The block starts with a header holding the write cursor, the channel
+    layout and the sample frequency, followed by the float64 samples. The
+    acquiring process creates the block and writes chunks as usual, any
+    number of local processes attach by name and read with the
+    ChunkRingBuffer methods, so analysis can run on other cores without
+    competing with the acquisition thread for the GIL.
+
+    As in ChunkRingBuffer, readers take no lock: a read the writer overwrote
+    while copying raises BufferOverrun.
+
+    Examples
+    --------
+    >>> ring = SharedRingBuffer.create(info.ch_names, 250, 250 * 10)  # acquiring process
+    >>> reader = SharedRingBuffer.attach(ring.name)  # any other process
+    >>> data, start = reader.read_latest(250)
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        """Maps an initialized block, use create or attach
+
+        Parameters
+        ----------
+        shm: shared_memory.SharedMemory
+            block with header
+        owner: bool
+            True if this object created the block and unlinks it on close
+        """
+        magic, header_size, n_channels, capacity, sfreq, length = _FIXED.unpack_from(
+            shm.buf
+        )
+        if magic != _MAGIC:
+            shm.close()
+            raise ValueError(f"{shm.name} is not a brainaccess stream")
+        metadata = json.loads(bytes(shm.buf[_METADATA_OFFSET:_METADATA_OFFSET + length]))
+        self.shm = shm
+        self.owner: bool = owner
+        self.name: str = shm.name
+        self.sfreq: float = sfreq
+        self.ch_names: list = metadata["ch_names"]
+        self.ch_types: list = metadata["ch_types"]
+        self.n_channels: int = n_channels
+        self.capacity: int = capacity
+        self._counters = np.ndarray(
+            (2,), dtype=np.int64, buffer=shm.buf, offset=_COUNTERS_OFFSET
+        )
+        self.data = np.ndarray(
+            (n_channels, capacity), dtype=np.float64, buffer=shm.buf, offset=header_size
+        )
+        self._histogram = [0] * (len(_HISTOGRAM_EDGES) + 1)
+
+    @classmethod
+    def create(
+        cls,
+        ch_names: list,
+        sfreq: float,
+        capacity: int,
+        ch_types: typing.Optional[list] = None,
+        name: typing.Optional[str] = None,
+    ) -> "SharedRingBuffer":
+        """Creates the shared block of the acquiring process
+
+        Parameters
+        ----------
+        ch_names: list
+            channel name of every row
+        sfreq: float
+            sample frequency
+        capacity: int
+            number of samples kept
+        ch_types: list
+            MNE channel type of every row, misc if None
+        name: str
+            name of the block, generated if None
+
+        Returns
+        -------
+        SharedRingBuffer
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        if ch_types is None:
+            ch_types = ["misc"] * len(ch_names)
+        metadata = json.dumps({"ch_names": ch_names, "ch_types": ch_types}).encode()
+        # samples start cache line aligned after the metadata
+        header_size = -(-(_METADATA_OFFSET + len(metadata)) // 64) * 64
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=header_size + 8 * len(ch_names) * capacity
+        )
+        _FIXED.pack_into(
+            shm.buf, 0, _MAGIC, header_size, len(ch_names), capacity, sfreq, len(metadata)
+        )
+        struct.pack_into("<qq", shm.buf, _COUNTERS_OFFSET, 0, 0)
+        shm.buf[_METADATA_OFFSET:_METADATA_OFFSET + len(metadata)] = metadata
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedRingBuffer":
+        """Attaches to a block created by another process
+
+        Parameters
+        ----------
+        name: str
+            name of the block, SharedRingBuffer.name in the creating process
+
+        Returns
+        -------
+        SharedRingBuffer
+            reader, writing to it corrupts the stream
+        """
+        return cls(_attach(name), owner=False)
+
+    @property
+    def _cursor(self) -> int:
+        return int(self._counters[0])
+
+    @_cursor.setter
+    def _cursor(self, value: int) -> None:
+        self._counters[0] = value
+
+    @property
+    def _write_end(self) -> int:
+        return int(self._counters[1])
+
+    @_write_end.setter
+    def _write_end(self, value: int) -> None:
+        self._counters[1] = value
+
+    def views(self, start: int, stop: typing.Optional[int] = None) -> list:
+        """Returns samples [start, stop) as views into shared memory, no copy
+
+        The views are overwritten by the writer once it is capacity samples
+        ahead, check ``start >= oldest`` after using them.
+
+        Parameters
+        ----------
+        start: int
+            cursor of the first sample
+        stop: int
+            cursor after the last sample, current cursor if None
+
+        Returns
+        -------
+        list
+            one or two arrays of shape (channels, n) in chronological order
+        """
+        if stop is None:
+            stop = self._cursor
+        if start > stop or stop > self._cursor or start < self.oldest:
+            raise ValueError("Requested samples are not available")
+        pos = start % self.capacity
+        first = min(stop - start, self.capacity - pos)
+        parts = [self.data[:, pos:pos + first]]
+        if first < stop - start:
+            parts.append(self.data[:, : stop - start - first])
+        return parts
+
+    def close(self) -> None:
+        """Unmaps the block, the creating process also removes it"""
+        if self.shm is None:
+            return
+        # the block cannot be closed while arrays still point into it
+        self.data = None
+        self._counters = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,395 @@
+import asyncio
+import threading
+import time
+import typing
+
+import numpy as np
+
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.core.annotation import Annotation
+from brainaccess.core.battery_info import BatteryInfo
+from brainaccess.core.chunk_stream import ChunkStream, OverflowPolicy
+from brainaccess.core.device_info import DeviceInfo
+from brainaccess.core.device_model import DeviceModel
+from brainaccess.core.full_battery_info import FullBatteryInfo
+from brainaccess.core.gain_mode import GainMode
+from brainaccess.core.impedance_measurement_mode import ImpedanceMeasurementMode
+from brainaccess.core.stream_layout import StreamLayout
+from brainaccess.core.version import Version
+from brainaccess.utils.impedance import IMPEDANCE_DRIVE_AMPS, BOARD_RESISTOR_OHMS
+
+# stream type codes (see brainaccess.core.stream_layout)
+_FLOAT, _BOOL, _SIZE_T, _DOUBLE = 0, 1, 2, 3
+
+_IMPEDANCE_FREQUENCIES = {
+    ImpedanceMeasurementMode.HZ_7_8: 7.8,
+    ImpedanceMeasurementMode.HZ_31_2: 31.2,
+}
+
+
+def _type_code(channel: int) -> int:
+    if channel == eeg_channel.SAMPLE_NUMBER:
+        return _SIZE_T
+    if channel < eeg_channel.ELECTRODE_CONTACT_P:
+        return _DOUBLE
+    if channel < eeg_channel.GYROSCOPE:
+        return _BOOL  # electrode contact and digital input
+    return _FLOAT  # gyroscope and accelerometer
+
+
+def _resolved_future(result=None):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return future
+
+
+class _VirtualEEGManager:
+    """Pure Python EEG manager without a device.
+
+    Mirrors the public interface of EEGManager. Chunks are produced by a
+    background thread paced by ``speed`` and delivered through the chunk
+    callback, subclasses provide the data by implementing ``_generate``.
+    """
+
+    def __init__(
+        self,
+        sample_frequency: int = 250,
+        chunk_size: int = 25,
+        speed: typing.Optional[float] = 1.0,
+    ) -> None:
+        self.sample_frequency: int = sample_frequency
+        self.chunk_size: int = chunk_size
+        self.speed: typing.Optional[float] = speed
+        self.sample_number: int = 0
+        self._connected = False
+        self._streaming = False
+        self._enabled_channels: set = set()
+        self._gains: dict = {}
+        self._impedance_mode = ImpedanceMeasurementMode.OFF
+        self._io_state = True
+        self._stream_layout: typing.Optional[StreamLayout] = None
+        self._annotations: list = []
+        self._annotations_mtx = threading.Lock()
+        self._callback_chunk_mtx = threading.Lock()
+        self._callback_chunk = None
+        self._callback_chunk_as_numpy = False
+        self._callback_battery = None
+        self._callback_disconnect = None
+        self._thread: typing.Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.destroy()
+
+    def destroy(self):
+        """Stops streaming and disconnects"""
+        self.disconnect()
+
+    def connect(self, port: str):
+        """Connects to the virtual device, the port is ignored
+
+        Returns
+        -------
+        future: asyncio.Future
+            await future to complete connecting
+        """
+        self._connected = True
+        return _resolved_future(True)
+
+    def is_connected(self):
+        return self._connected
+
+    def disconnect(self):
+        """Disconnects, stopping the stream and clearing annotations"""
+        was_connected = self._connected
+        self._stop_thread()
+        self._connected = False
+        self._streaming = False
+        self._stream_layout = None
+        with self._annotations_mtx:
+            self._annotations = []
+        if was_connected and self._callback_disconnect is not None:
+            self._callback_disconnect()
+
+    def _resolve_stream_layout(self):
+        channels = sorted(self._enabled_channels)
+        return StreamLayout(
+            {channel: index for index, channel in enumerate(channels)},
+            [_type_code(channel) for channel in channels],
+        )
+
+    def start_stream(self):
+        """Starts streaming data from the virtual device
+
+        Returns
+        -------
+        future: asyncio.Future
+            awaiting future starts stream
+        """
+        if not self._connected:
+            raise RuntimeError("Connection error")
+        self._stream_layout = self._resolve_stream_layout()
+        self.sample_number = 0
+        self._streaming = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return _resolved_future()
+
+    def stop_stream(self):
+        """Stops streaming, resets enabled channels, gains and impedance mode
+
+        Returns
+        -------
+        future: asyncio.Future
+            awaiting future stops stream
+        """
+        self._stop_thread()
+        self._streaming = False
+        self._stream_layout = None
+        self._enabled_channels = set()
+        self._gains = {}
+        self._impedance_mode = ImpedanceMeasurementMode.OFF
+        return _resolved_future()
+
+    def _stop_thread(self):
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+    def is_streaming(self):
+        return self._streaming
+
+    @property
+    def stream_layout(self):
+        """Channel layout of the running stream, None if not streaming"""
+        return self._stream_layout
+
+    def _run(self):
+        start_time = time.perf_counter()
+        start_sample = self.sample_number
+        while not self._stop_event.is_set():
+            if not self.step():
+                self._streaming = False
+                break
+            if self.speed:
+                due = start_time + (self.sample_number - start_sample) / (
+                    self.sample_frequency * self.speed
+                )
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+
+    def step(self) -> bool:
+        """Produces one chunk and passes it to the chunk callback in the calling
+        thread. Used by the streaming thread, and can be called directly to
+        drive consumers synchronously without a stream thread.
+
+        Returns
+        -------
+        bool
+            False if no more data is available
+        """
+        layout = self._stream_layout
+        if layout is None:
+            layout = self._stream_layout = self._resolve_stream_layout()
+        chunk = self._generate(layout, self.sample_number, self.chunk_size)
+        if chunk is None:
+            return False
+        chunk_size = chunk.shape[1]
+        self.sample_number += chunk_size
+        with self._callback_chunk_mtx:
+            cbk = self._callback_chunk
+            if cbk is not None:
+                if self._callback_chunk_as_numpy:
+                    cbk(chunk, chunk_size)
+                else:
+                    cbk(chunk.tolist(), chunk_size)
+        return True
+
+    def _generate(self, layout: StreamLayout, start: int, n: int):
+        raise NotImplementedError
+
+    def set_io(self, pin: int, state: bool):
+        self._io_state = state
+        return _resolved_future()
+
+    def get_battery_info(self):
+        return BatteryInfo(100, False, False)
+
+    def get_full_battery_info(self):
+        return _resolved_future(FullBatteryInfo(False, False, 100, 100.0, 4.2, 0.0))
+
+    def get_latency(self):
+        return _resolved_future(0.0)
+
+    def set_channel_enabled(self, channel: int, state: bool):
+        if state:
+            self._enabled_channels.add(channel)
+        else:
+            self._enabled_channels.discard(channel)
+
+    def set_channel_gain(self, channel: int, gain: GainMode):
+        self._gains[channel] = gain
+
+    def set_channel_bias(self, channel: int, bias):
+        pass
+
+    def set_impedance_mode(self, mode: ImpedanceMeasurementMode):
+        self._impedance_mode = mode
+
+    def get_device_info(self):
+        info = DeviceInfo()
+        info.device_model = DeviceModel.MINI
+        info.hardware_version = Version(0, 0, 0)
+        info.firmware_version = Version(0, 0, 0)
+        return info
+
+    def get_channel_index(self, channel: int):
+        layout = self._stream_layout
+        if layout is None:
+            raise IndexError("Channel does not exist or is not currently streaming")
+        return layout.index(channel)
+
+    def get_sample_frequency(self):
+        return self.sample_frequency
+
+    def set_callback_chunk(self, f, as_numpy: bool = False):
+        """Sets a callback to be called every time a chunk is available,
+        see EEGManager.set_callback_chunk
+        """
+        with self._callback_chunk_mtx:
+            self._callback_chunk = f
+            self._callback_chunk_as_numpy = as_numpy
+
+    def stream(self, maxsize: int = 64, overflow=OverflowPolicy.DROP_OLDEST):
+        """Streams chunks to the running event loop, see EEGManager.stream"""
+        return ChunkStream(self, maxsize=maxsize, overflow=overflow)
+
+    def set_callback_battery(self, f):
+        self._callback_battery = f
+
+    def set_callback_disconnect(self, f):
+        self._callback_disconnect = f
+
+    def annotate(self, annotation: str):
+        """Adds an annotation at the current sample number"""
+        with self._annotations_mtx:
+            self._annotations.append(
+                Annotation(self.sample_number, annotation.encode("ascii"))
+            )
+
+    def get_annotations(self, start: int = 0):
+        """Retrieve the accumulated annotations from index start"""
+        with self._annotations_mtx:
+            return self._annotations[start:]
+
+    def clear_annotations(self):
+        with self._annotations_mtx:
+            self._annotations = []
+
+
+class SimulatedEEGManager(_VirtualEEGManager):
+    """EEG manager generating synthetic data, for testing and benchmarking
+    without a device.
+
+    Electrodes carry an alpha rhythm plus white noise (uV), optionally an
+    SSVEP sinusoid and, in impedance mode, the measurement wave with an
+    amplitude matching ``impedance`` (kOhm). The accelerometer measures
+    gravity plus noise, the digital input follows set_io and the sample
+    number counts from stream start.
+
+    Examples
+    --------
+    >>> with SimulatedEEGManager(speed=10) as mgr:
+    ...     eeg.setup(mgr, cap=cap)
+    ...     eeg.start_acquisition()
+    """
+
+    def __init__(
+        self,
+        sample_frequency: int = 250,
+        chunk_size: int = 25,
+        speed: typing.Optional[float] = 1.0,
+        noise: float = 10.0,
+        alpha_amplitude: float = 10.0,
+        ssvep_frequency: typing.Optional[float] = None,
+        ssvep_amplitude: float = 5.0,
+        impedance: float = 20.0,
+        seed: typing.Optional[int] = None,
+    ) -> None:
+        """Creates simulated EEG manager
+
+        Parameters
+        ----------
+        sample_frequency: int
+            samples per second
+        chunk_size: int
+            samples per chunk
+        speed: float
+            1 for real time, N for N times faster, None for as fast as possible
+        noise: float
+            standard deviation of electrode noise (uV)
+        alpha_amplitude: float
+            amplitude of the 10 Hz rhythm (uV)
+        ssvep_frequency: float
+            frequency of the SSVEP response, None for no response. Can be
+            changed while streaming.
+        ssvep_amplitude: float
+            amplitude of the SSVEP response (uV)
+        impedance: float
+            electrode impedance reproduced in impedance mode (kOhm)
+        seed: int
+            random generator seed
+        """
+        super().__init__(sample_frequency, chunk_size, speed)
+        self.noise: float = noise
+        self.alpha_amplitude: float = alpha_amplitude
+        self.ssvep_frequency: typing.Optional[float] = ssvep_frequency
+        self.ssvep_amplitude: float = ssvep_amplitude
+        self.impedance: float = impedance
+        self._rng = np.random.default_rng(seed)
+        self._phases = self._rng.uniform(0, 2 * np.pi, 1024)
+
+    def _generate(self, layout: StreamLayout, start: int, n: int):
+        t = np.arange(start, start + n) / self.sample_frequency
+        chunk = np.empty((layout.n_channels, n))
+        electrodes = []
+        for row, channel in enumerate(layout.channels):
+            if channel == eeg_channel.SAMPLE_NUMBER:
+                chunk[row] = np.arange(start, start + n)
+            elif channel < eeg_channel.ELECTRODE_CONTACT_P:
+                electrodes.append((row, channel - eeg_channel.ELECTRODE_MEASUREMENT))
+            elif eeg_channel.DIGITAL_INPUT <= channel < eeg_channel.GYROSCOPE:
+                chunk[row] = float(self._io_state)
+            elif channel >= eeg_channel.GYROSCOPE:
+                gravity = 1.0 if channel == eeg_channel.ACCELEROMETER + 2 else 0.0
+                chunk[row] = gravity + self._rng.normal(0, 0.01, n)
+            else:
+                chunk[row] = 1.0  # electrodes always make contact
+        if electrodes:
+            rows = [row for row, _ in electrodes]
+            phases = self._phases[[idx % len(self._phases) for _, idx in electrodes]]
+            signal = self._rng.normal(0, self.noise, (len(rows), n))
+            signal += self.alpha_amplitude * np.sin(
+                2 * np.pi * 10 * t + phases[:, None]
+            )
+            if self.ssvep_frequency:
+                signal += self.ssvep_amplitude * np.sin(
+                    2 * np.pi * self.ssvep_frequency * t
+                )
+            frequency = _IMPEDANCE_FREQUENCIES.get(self._impedance_mode)
+            if self._impedance_mode == ImpedanceMeasurementMode.DR_DIV4:
+                frequency = self.sample_frequency / 4
+            if frequency:
+                # peak amplitude giving the configured impedance (uV)
+                ohms = self.impedance * 1e3 + BOARD_RESISTOR_OHMS
+                amplitude = ohms * IMPEDANCE_DRIVE_AMPS / 1e-6
+                signal += amplitude * np.sin(2 * np.pi * frequency * t)
+            chunk[rows] = signal
+        return chunk
@@ -0,0 +1,322 @@
+import json
+import os
+import pathlib
+import threading
+import typing
+
+import numpy as np
+
+
+def compact_dtype(dtype) -> np.dtype:
+    """Storage dtype of a native chunk row type in compact mode
+
+    Floating point rows (EEG, accelerometer) are kept as float32, booleans
+    (digital input, electrode contact) as uint8 and counters (sample number)
+    as int64.
+
+    Parameters
+    ----------
+    dtype
+        native numpy dtype of the row, see StreamLayout.dtypes
+
+    Returns
+    -------
+    np.dtype
+        dtype to store the row as
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return np.dtype(np.float32)
+    if dtype.kind == "b":
+        return np.dtype(np.uint8)
+    return np.dtype(np.int64)
+
+
+def row_groups(dtypes: list) -> list:
+    """Groups rows of equal dtype
+
+    Parameters
+    ----------
+    dtypes: list
+        dtype of every row
+
+    Returns
+    -------
+    list
+        (row indexes, dtype) of every group, row indexes are None if all rows
+        share one dtype
+    """
+    dtypes = [np.dtype(dtype) for dtype in dtypes]
+    unique = list(dict.fromkeys(dtypes))
+    if len(unique) == 1:
+        return [(None, unique[0])]
+    return [
+        (np.flatnonzero([d == dtype for d in dtypes]), dtype) for dtype in unique
+    ]
+
+
+def run_directory(directory: typing.Union[str, pathlib.Path]) -> pathlib.Path:
+    """Creates the next free run_<n> subdirectory, so that reusing a
+    storage directory never overwrites an earlier recording
+
+    Parameters
+    ----------
+    directory: str or pathlib.Path
+        parent directory, created if missing
+
+    Returns
+    -------
+    pathlib.Path
+        new empty directory
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    index = 0
+    while True:
+        path = directory / f"run_{index:03d}"
+        try:
+            path.mkdir()
+            return path
+        except FileExistsError:
+            index += 1
+
+
+class ArrayStorage:
+    """In memory sample storage.
+
+    Samples are kept in one (channels, capacity) array whose capacity doubles
+    when full, so appending is amortized O(chunk) and every range of samples
+    is a single view.
+    """
+
+    def __init__(self, n_channels: int, capacity: int, dtype=np.float64) -> None:
+        """
+        Parameters
+        ----------
+        n_channels: int
+            number of channels (rows)
+        capacity: int
+            initial capacity in samples
+        dtype
+            data type of the stored samples
+        """
+        self.n_channels: int = n_channels
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.n_samples: int = 0
+        self._buffer: np.ndarray = np.zeros(
+            (n_channels, max(capacity, 1)), dtype=self.dtype
+        )
+
+    def append(self, chunk: np.ndarray) -> None:
+        """Copies chunk of shape (channels, samples) after the stored samples"""
+        size = chunk.shape[1]
+        start = self.n_samples
+        if start + size > self._buffer.shape[1]:
+            capacity = max(2 * self._buffer.shape[1], start + size)
+            buffer = np.empty((self.n_channels, capacity), dtype=self.dtype)
+            buffer[:, :start] = self._buffer[:, :start]
+            # readers may still hold views of the old buffer, it is left intact
+            self._buffer = buffer
+        self._buffer[:, start : start + size] = chunk
+        self.n_samples = start + size
+
+    def views(self, start: int, stop: int) -> list:
+        """Views of samples [start, stop), in chronological order"""
+        return [self._buffer[:, start:stop]]
+
+
+class MemmapStorage:
+    """Disk backed sample storage for long recordings.
+
+    Samples are appended to memory-mapped files of ``segment_samples``
+    samples each, stored sample-major (segment_samples, channels) so that
+    appending writes one contiguous block. A full segment is flushed and
+    remapped read-only: the operating system keeps only the segment being
+    written and recently read pages resident, older data is paged in again
+    when read.
+
+    A JSON sidecar ``<name>.json`` records the channels, dtype, sample
+    frequency, segment size and the number of valid samples. It is updated
+    on every segment roll and on flush, so after a crash read_segments
+    recovers everything up to the last flush and ignores the zero padding
+    of the last segment. Existing files are never overwritten.
+    """
+
+    def __init__(
+        self,
+        n_channels: int,
+        directory: typing.Union[str, pathlib.Path],
+        segment_samples: int = 250 * 60 * 10,
+        dtype=np.float64,
+        name: str = "segment",
+        ch_names: typing.Optional[list] = None,
+        sfreq: typing.Optional[float] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        n_channels: int
+            number of channels
+        directory: str or pathlib.Path
+            directory for the segment files, created if missing
+        segment_samples: int
+            samples per segment file (default 10 minutes at 250 Hz)
+        dtype
+            data type of the stored samples
+        name: str
+            prefix of the segment file names
+        ch_names: list
+            channel name of every row, recorded in the sidecar
+        sfreq: float
+            sample frequency, recorded in the sidecar
+
+        Raises
+        ------
+        FileExistsError
+            if the directory already holds a storage with this name
+        """
+        if segment_samples <= 0:
+            raise ValueError("segment_samples must be positive")
+        self.n_channels: int = n_channels
+        self.directory: pathlib.Path = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_samples: int = segment_samples
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.name: str = name
+        self.ch_names: typing.Optional[list] = ch_names
+        self.sfreq: typing.Optional[float] = sfreq
+        self.n_samples: int = 0
+        self._segments: list = []
+        self._sidecar_mtx = threading.Lock()
+        self._recorded: int = 0
+        if self._sidecar_path().exists() or self._segment_path(0).exists():
+            raise FileExistsError(
+                f"{self.directory} already holds a {name} storage, not overwriting it"
+            )
+        self._write_sidecar(0)
+
+    def _segment_path(self, index: int) -> pathlib.Path:
+        return self.directory / f"{self.name}_{index:05d}.dat"
+
+    def _sidecar_path(self) -> pathlib.Path:
+        return self.directory / f"{self.name}.json"
+
+    def _write_sidecar(self, n_samples: int) -> None:
+        with self._sidecar_mtx:
+            # flush and segment roll run in different threads
+            self._recorded = max(self._recorded, n_samples)
+            self._replace_sidecar(self._recorded)
+
+    def _replace_sidecar(self, n_samples: int) -> None:
+        sidecar = {
+            "n_channels": self.n_channels,
+            "dtype": self.dtype.str,
+            "segment_samples": self.segment_samples,
+            "ch_names": self.ch_names,
+            "sfreq": self.sfreq,
+            "n_samples": n_samples,
+        }
+        # replaced atomically, a crash leaves the previous version
+        tmp = self._sidecar_path().with_name(self._sidecar_path().name + ".tmp")
+        tmp.write_text(json.dumps(sidecar))
+        os.replace(tmp, self._sidecar_path())
+
+    def _add_segment(self) -> None:
+        if self._segments:
+            # the last segment is full, keep it mapped read-only
+            last = len(self._segments) - 1
+            self._segments[last].flush()
+            self._segments[last] = np.memmap(
+                self._segment_path(last),
+                dtype=self.dtype,
+                mode="r",
+                shape=(self.segment_samples, self.n_channels),
+            )
+            self._write_sidecar(self.n_samples)
+        path = self._segment_path(len(self._segments))
+        if path.exists():
+            raise FileExistsError(f"{path} exists, not overwriting it")
+        self._segments.append(
+            np.memmap(
+                path,
+                dtype=self.dtype,
+                mode="w+",
+                shape=(self.segment_samples, self.n_channels),
+            )
+        )
+
+    def append(self, chunk: np.ndarray) -> None:
+        """Copies chunk of shape (channels, samples) after the stored samples"""
+        size = chunk.shape[1]
+        written = 0
+        while written < size:
+            pos = self.n_samples % self.segment_samples
+            if pos == 0 and self.n_samples // self.segment_samples == len(
+                self._segments
+            ):
+                self._add_segment()
+            n = min(size - written, self.segment_samples - pos)
+            self._segments[-1][pos : pos + n] = chunk[:, written : written + n].T
+            written += n
+            self.n_samples += n
+
+    def views(self, start: int, stop: int) -> list:
+        """Views of samples [start, stop), one per segment, in chronological order"""
+        pieces = []
+        while start < stop:
+            index, pos = divmod(start, self.segment_samples)
+            n = min(stop - start, self.segment_samples - pos)
+            pieces.append(self._segments[index][pos : pos + n].T)
+            start += n
+        return pieces
+
+    def flush(self) -> None:
+        """Writes the segment being filled to disk and records the number of
+        samples written in the sidecar. Can be called from another thread
+        than append."""
+        n_samples = self.n_samples
+        segments = self._segments
+        if segments:
+            segments[-1].flush()
+        self._write_sidecar(n_samples)
+
+
+def read_segments(
+    directory: typing.Union[str, pathlib.Path], name: str = "segment"
+) -> tuple:
+    """Reads a MemmapStorage back, e.g. after a crash
+
+    Parameters
+    ----------
+    directory: str or pathlib.Path
+        directory of the storage
+    name: str
+        name of the storage
+
+    Returns
+    -------
+    tuple
+        (array of shape (channels, n_samples), sidecar dict with ch_names,
+        sfreq, dtype and n_samples)
+    """
+    directory = pathlib.Path(directory)
+    sidecar = json.loads((directory / f"{name}.json").read_text())
+    n_channels = sidecar["n_channels"]
+    segment_samples = sidecar["segment_samples"]
+    n_samples = sidecar["n_samples"]
+    data = np.empty((n_channels, n_samples), dtype=np.dtype(sidecar["dtype"]))
+    start = 0
+    index = 0
+    while start < n_samples:
+        n = min(n_samples - start, segment_samples)
+        segment = np.memmap(
+            directory / f"{name}_{index:05d}.dat",
+            dtype=data.dtype,
+            mode="r",
+            shape=(segment_samples, n_channels),
+        )
+        data[:, start : start + n] = segment[:n].T
+        del segment
+        start += n
+        index += 1
+    return data, sidecar
@@ -0,0 +1,201 @@
+import threading
+import time
+import typing
+
+import numpy as np
+
+from brainaccess.utils.ring_buffer import BufferOverrun, ChunkRingBuffer
+
+
+class Subscription:
+    """Independent reader of a ChunkFanout with its own cursor and lag metrics.
+
+    A subscriber that falls more than the buffer capacity behind either skips
+    to the oldest available sample (``on_overrun="skip"``, the skipped samples
+    are counted) or is dropped (``on_overrun="drop"``). The producer never
+    waits for subscribers.
+
+    Attributes
+    ----------
+    cursor
+        Stream position of the next sample to read
+    read_samples
+        Number of samples read
+    skipped_samples
+        Number of samples overwritten before they were read
+    overruns
+        Number of reads that found samples overwritten
+    dropped
+        True once the subscription was dropped for falling behind
+    """
+
+    def __init__(self, fanout, name: str, on_overrun: str = "skip") -> None:
+        """
+        Parameters
+        ----------
+        fanout: ChunkFanout
+            stream to read
+        name: str
+            name of the subscriber, used in metrics
+        on_overrun: str
+            skip or drop, see class description
+        """
+        if on_overrun not in ("skip", "drop"):
+            raise ValueError("on_overrun must be skip or drop")
+        self.name: str = name
+        self.on_overrun: str = on_overrun
+        self.cursor: int = fanout.ring.cursor
+        self.read_samples: int = 0
+        self.skipped_samples: int = 0
+        self.overruns: int = 0
+        self.max_lag: int = 0
+        self.dropped: bool = False
+        self.last_read_time: typing.Optional[float] = None
+        self._fanout = fanout
+
+    @property
+    def lag(self) -> int:
+        """Number of published samples not read yet"""
+        return self._fanout.ring.cursor - self.cursor
+
+    def read_new(self, max_samples: typing.Optional[int] = None) -> tuple:
+        """Reads the samples published since the last read
+
+        Parameters
+        ----------
+        max_samples: int
+            read at most this many samples, the rest stays for the next read
+
+        Returns
+        -------
+        tuple
+            (copy of shape (channels, n), stream position of the first sample)
+
+        Raises
+        ------
+        BufferOverrun
+            if the subscription is dropped
+        """
+        if self.dropped:
+            raise BufferOverrun(f"Subscription {self.name} was dropped")
+        ring = self._fanout.ring
+        while True:
+            stop = ring.cursor
+            self.max_lag = max(self.max_lag, stop - self.cursor)
+            if max_samples is not None:
+                stop = min(stop, self.cursor + max_samples)
+            try:
+                data = ring.read(self.cursor, stop)
+                break
+            except BufferOverrun:
+                self.overruns += 1
+                if self.on_overrun == "drop":
+                    self.dropped = True
+                    self._fanout.unsubscribe(self)
+                    raise BufferOverrun(f"Subscription {self.name} fell behind")
+                # skip to the oldest sample, leaving room for the chunk being written
+                oldest = ring.oldest + min(ring.capacity // 4, ring.capacity - 1)
+                self.skipped_samples += oldest - self.cursor
+                self.cursor = oldest
+        start = self.cursor
+        self.cursor = stop
+        self.read_samples += stop - start
+        self.last_read_time = time.perf_counter()
+        return data, start
+
+    def close(self) -> None:
+        """Stops the subscription, the fanout no longer reports it"""
+        self._fanout.unsubscribe(self)
+
+    def metrics(self) -> dict:
+        """Lag and loss counters of the subscription
+
+        Returns
+        -------
+        dict
+            lag and max_lag (samples), read_samples, skipped_samples, overruns,
+            dropped and seconds since the last read
+        """
+        idle = None
+        if self.last_read_time is not None:
+            idle = time.perf_counter() - self.last_read_time
+        return {
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "read_samples": self.read_samples,
+            "skipped_samples": self.skipped_samples,
+            "overruns": self.overruns,
+            "dropped": self.dropped,
+            "idle": idle,
+        }
+
+
+class ChunkFanout:
+    """Publishes one stream of chunks to any number of subscribers.
+
+    Chunks are written once into a ChunkRingBuffer, every subscriber reads
+    it through its own cursor, so adding subscribers adds no work for the
+    producer and a slow subscriber never stalls it.
+
+    Examples
+    --------
+    >>> fanout = ChunkFanout(n_channels=13, capacity=250 * 10)
+    >>> viewer = fanout.subscribe("viewer")
+    >>> fanout.publish(chunk)  # in the chunk callback
+    >>> data, start = viewer.read_new()
+    """
+
+    def __init__(self, n_channels: int, capacity: int) -> None:
+        """
+        Parameters
+        ----------
+        n_channels: int
+            number of channels (rows) in a chunk
+        capacity: int
+            number of samples kept for subscribers
+        """
+        self.ring: ChunkRingBuffer = ChunkRingBuffer(n_channels, capacity)
+        self.subscriptions: list = []
+        self._mtx = threading.Lock()
+
+    def publish(self, chunk: np.ndarray) -> None:
+        """Writes chunk for all subscribers, never blocks on them
+
+        Parameters
+        ----------
+        chunk: np.ndarray
+            data of shape (channels, samples)
+        """
+        self.ring.write(chunk)
+
+    def subscribe(
+        self, name: typing.Optional[str] = None, on_overrun: str = "skip"
+    ) -> Subscription:
+        """Adds a subscriber reading from the current position
+
+        Parameters
+        ----------
+        name: str
+            name of the subscriber, numbered if None
+        on_overrun: str
+            skip or drop, see Subscription
+
+        Returns
+        -------
+        Subscription
+        """
+        with self._mtx:
+            if name is None:
+                name = f"subscriber-{len(self.subscriptions)}"
+            subscription = Subscription(self, name, on_overrun)
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes a subscriber"""
+        with self._mtx:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def metrics(self) -> dict:
+        """Metrics of every subscriber by name, see Subscription.metrics"""
+        return {s.name: s.metrics() for s in self.subscriptions}
@@ -202,7 +202,7 @@ class UserInterface:
                     if self.event in (sg.WINDOW_CLOSED, "Quit", "q"):
                         break
 
-                    imp = eeg.calc_impedances()
+                    imp = eeg.get_impedances()
                     ax.clear()
                     ax.imshow(bg_img, extent=[0, 1, 0, 1])
                     ax.axis("off")
@@ -318,6 +318,7 @@ class UserInterface:
 
         from brainaccess.utils import acquisition
         from brainaccess.core.eeg_manager import EEGManager
+        from brainaccess.utils.processing import BandPass
 
         if self.save_stream:
             eeg = acquisition.EEG()
@@ -333,6 +334,16 @@ class UserInterface:
                     bias=[self.bias],
                     gain = self.gain,
                 )
+                if self.filter:
+                    # EEG channels are filtered once per chunk while acquiring
+                    eeg.set_processing(
+                        [
+                            BandPass(
+                                self.filter_low, self.filter_high, eeg.info["sfreq"]
+                            )
+                        ],
+                        tim=20,
+                    )
                 eeg.start_acquisition()
             except Exception as e:
                 print(e)
@@ -354,8 +365,11 @@ class UserInterface:
                             action = self.event_dict_stream.get(self.event)
                             action()
 
-                    data = eeg.get_mne(tim=20).copy().pick(self.ch_type)
-                    if self.filter:
+                    if self.filter and self.ch_type == "eeg":
+                        data = eeg.get_mne(tim=20, filtered=True)
+                    else:
+                        data = eeg.get_mne(tim=20).copy().pick(self.ch_type)
+                    if self.filter and self.ch_type != "eeg":
                         data = data.filter(
                             self.filter_low,
                             self.filter_high,
@@ -363,7 +377,10 @@ class UserInterface:
                             verbose=False,
                             picks="all",
                         )
-                    data.crop(tmin=data.times[-1] - self.duration)
+                    if data.n_times < 2:
+                        # the filtered buffer starts empty
+                        continue
+                    data.crop(tmin=max(0, data.times[-1] - self.duration))
                     data.apply_function(
                         lambda x: x - np.nanmean(x, axis=0) + 1e-9, picks="all"
                     )
@@ -0,0 +1,46 @@
+""" Async chunk streaming example
+
+Chunks are consumed as numpy arrays on the asyncio event loop,
+no callbacks or locks needed
+
+Change Bluetooth port according to your device
+"""
+
+import asyncio
+from sys import platform
+
+import brainaccess.core as bacore
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.core.eeg_manager import EEGManager
+
+bacore.init(bacore.Version(2, 0, 0))
+
+# Set correct port value
+if platform == "linux" or platform == "linux2":
+    port = "/dev/rfcomm0"
+else:
+    port = "COM4"
+
+with EEGManager() as mgr:
+
+    async def main():
+        if await mgr.connect(port):
+            mgr.set_channel_enabled(eeg_channel.ELECTRODE_MEASUREMENT + 0, True)
+            mgr.set_channel_enabled(eeg_channel.SAMPLE_NUMBER, True)
+
+            # drop the oldest chunks if processing falls behind
+            async with mgr.stream(maxsize=32, overflow="drop_oldest") as chunks:
+                await mgr.start_stream()
+                sample_row = mgr.stream_layout.index(eeg_channel.SAMPLE_NUMBER)
+                received = 0
+                async for chunk in chunks:
+                    print(f"samples {chunk[sample_row, 0]:.0f}-{chunk[sample_row, -1]:.0f}")
+                    received += 1
+                    if received == 100:
+                        break
+                await mgr.stop_stream()
+        mgr.disconnect()
+
+    asyncio.run(main())
+
+bacore.close()
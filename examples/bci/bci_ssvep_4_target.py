@@ -22,6 +22,7 @@ import time
 from copy import copy
 import click
 import logging
+import mne
 
 from brainaccess.connect import SSVEP
 from brainaccess.core.eeg_manager import EEGManager
@@ -51,11 +52,12 @@ class Predict:
         self.frequencies = [10, 11, 12, 13]
 
     def prep_data(self, annot: bool = True):
-        data = self.eeg.get_mne(
-            tim=self.prediction_time, annotations=annot
-        ).pick_channels(["O1", "O2"], ordered=True)
-        data = data.filter(1, 90, method="fir", verbose=False)
-        return data.get_data()
+        data, _, _ = self.eeg.get_window(
+            tim=self.prediction_time, channels=["O1", "O2"], events=annot
+        )
+        return mne.filter.filter_data(
+            data, self.sample_rate, 1, 90, method="fir", verbose=False
+        )
 
     def get_guess(self):
         guess = None
@@ -4,7 +4,7 @@
 
 from setuptools import setup, find_packages
 
-requirements = ['mne', 'pandas', 'matplotlib', 'numpy', 'pysimplegui', 'Pillow', 'pyyaml', 'multimethod']
+requirements = ['mne', 'scipy', 'pandas', 'matplotlib', 'numpy', 'pysimplegui', 'Pillow', 'pyyaml', 'multimethod']
 
 setup(
     author="neurotechnology",
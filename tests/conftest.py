@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+
+import brainaccess.core as bacore
+from brainaccess import libload
+
+
+def _ramp(start, n, n_channels=2):
+    return np.tile(np.arange(start, start + n, dtype=float), (n_channels, 1))
+
+
+@pytest.fixture
+def chunk():
+    """Chunk factory: chunk(start, n, n_channels=2) returns n_channels rows of
+    the sample positions start to start + n, so every value tells where it
+    was taken from"""
+    return _ramp
+
+
+def _wait(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def wait():
+    """wait(condition, timeout=10.0) polls condition until it is true, raises
+    TimeoutError after timeout seconds"""
+    return _wait
+
+
+@pytest.fixture
+def no_native_library(monkeypatch):
+    """Makes loading the native library fail, as on a machine without it"""
+    if bacore._dll.loaded:
+        pytest.skip("native library already loaded")
+
+    def load_library(name):
+        raise RuntimeError("Could not find " + libload.get_lib_name(name))
+
+    monkeypatch.setattr(libload, "load_library", load_library)
+    assert not bacore.available()
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from brainaccess.utils.acquisition import EEG
+from brainaccess.utils.network import StreamClient
+from brainaccess.utils.shared_stream import SharedRingBuffer
+from brainaccess.utils.simulation import SimulatedEEGManager
+
+
+def test_close_releases_everything_after_recording_error(tmp_path, wait):
+    eeg = EEG()
+    mgr = SimulatedEEGManager(speed=20, seed=0)
+    eeg.setup(mgr, port="sim")
+    eeg.start_recording(str(tmp_path / "session"))
+    name = eeg.start_sharing()
+    eeg.start_server()
+    recorder = eeg.recorder
+    close = recorder.close
+
+    def failing_close():
+        close()
+        raise RuntimeError("Recording failed: disk full")
+
+    recorder.close = failing_close
+    eeg.start_acquisition()
+    wait(lambda: eeg.get_buffer_stats()["writes"] >= 5)
+    eeg.stop_acquisition()
+    with pytest.raises(RuntimeError, match="disk full"):
+        eeg.close()
+    mgr.destroy()
+    assert eeg.shared is None and eeg.server is None
+    assert eeg._loop is None
+    with pytest.raises(FileNotFoundError):
+        SharedRingBuffer.attach(name)
+
+
+def _stepped_eeg(wait, mode="accumulate", **kwargs):
+    """EEG acquiring from a simulator whose stream thread delivers one chunk
+    and then waits, the test delivers the next chunks with mgr.step()"""
+    eeg = EEG(mode=mode)
+    mgr = SimulatedEEGManager(speed=1e-6, seed=0)
+    eeg.setup(mgr, port="sim", **kwargs)
+    eeg.start_acquisition()
+    wait(lambda: mgr.sample_number == 25)
+    return eeg, mgr
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("mode, zeros_at_start", [("accumulate", 0), ("roll", 500)])
+def test_ingest_stores_device_rows_in_info_order(mode, zeros_at_start, compact, wait):
+    eeg, mgr = _stepped_eeg(
+        wait, mode, zeros_at_start=zeros_at_start, compact=compact
+    )
+    for _ in range(3):
+        mgr.step()
+    data, times, _ = eeg.get_window(samples=100, events=False)
+    eeg.stop_acquisition()
+    eeg.close()
+    mgr.destroy()
+    # the device streams channels by id: sample number first, electrodes,
+    # digital input, accelerometer; info ends with accelerometer, digital input
+    # and sample number
+    assert eeg._ingest_rows is not None
+    assert data.shape == (eeg.chans, 100) and data.dtype == np.float64
+    np.testing.assert_array_equal(times, np.arange(100) / 250)
+    rows = eeg._name_rows
+    np.testing.assert_array_equal(data[rows["Sample"]], np.arange(100))
+    np.testing.assert_array_equal(data[rows["Digital"]], 1)
+    np.testing.assert_allclose(data[rows["Accel_z"]], 1, atol=0.1)
+    np.testing.assert_allclose(data[rows["Accel_x"]], 0, atol=0.1)
+    electrodes = data[: eeg._n_eeg]
+    assert np.all(np.abs(electrodes) < 100) and np.all(electrodes.std(axis=1) > 1)
+    # compact storage keeps electrodes as float32
+    as_float32 = electrodes.astype(np.float32)
+    assert np.array_equal(electrodes, as_float32) == compact
+
+
+@pytest.mark.parametrize("mode, zeros_at_start", [("accumulate", 0), ("roll", 500)])
+def test_get_window_selects_channels_and_events(mode, zeros_at_start, wait):
+    eeg, mgr = _stepped_eeg(wait, mode, zeros_at_start=zeros_at_start)
+    mgr.step()
+    eeg.annotate("stim")
+    mgr.step()
+    mgr.step()
+    data, times, events = eeg.get_window(samples=60, channels=["Sample", "C3"])
+    np.testing.assert_array_equal(data[0], np.arange(40, 100))
+    np.testing.assert_array_equal(data[1], eeg.get_window(samples=60)[0][2])
+    np.testing.assert_array_equal(times, np.arange(40, 100) / 250)
+    assert events == [(50 / 250, "stim")]
+    _, _, events = eeg.get_window(tim=0.1)
+    assert events == []
+    # same values as get_mne
+    raw = eeg.get_mne(samples=60)
+    np.testing.assert_array_equal(raw.get_data(picks=["Sample", "C3"]), data)
+    assert list(raw.annotations.description) == ["stim"]
+    eeg.stop_acquisition()
+    eeg.close()
+    mgr.destroy()
+
+
+def test_buffer_stats_count_writes_and_reads(wait):
+    eeg, mgr = _stepped_eeg(wait)
+    before = eeg.get_buffer_stats()
+    for _ in range(4):
+        mgr.step()
+    eeg.get_window(samples=10, events=False)
+    eeg.get_window(samples=10, events=False)
+    stats = eeg.get_buffer_stats()
+    eeg.stop_acquisition()
+    eeg.close()
+    mgr.destroy()
+    assert stats["writes"] - before["writes"] == 4
+    assert stats["reads"] - before["reads"] == 2
+    assert stats["retries"] == 0 and stats["waits"] == 0
+
+
+def test_server_streams_sample_numbers_and_device_annotations(wait):
+    eeg, mgr = _stepped_eeg(wait)
+    client = StreamClient(*eeg.start_server())
+    wait(lambda: len(eeg.fanout.subscriptions) == 1)
+    mgr.step()
+    eeg.annotate("stim")
+    mgr.step()
+    mgr.step()
+    wait(lambda: client.ring.cursor == 75 and len(client.annotations) == 1)
+    data = client.ring.read(0, 75)
+    first = client.position(0)
+    timestamps, codes = client.annotations.window(0, 100)
+    labels = [client.annotations.labels[code] for code in codes]
+    client.close()
+    eeg.stop_acquisition()
+    eeg.close()
+    mgr.destroy()
+    # the first chunk was published before the client subscribed
+    assert first == 25
+    np.testing.assert_array_equal(data[eeg._name_rows["Sample"]], np.arange(25, 100))
+    assert timestamps.tolist() == [50] and labels == ["stim"]
@@ -0,0 +1,75 @@
+import numpy as np
+
+from brainaccess.core.annotation import Annotation
+from brainaccess.utils.annotations import AnnotationStore
+
+
+class _Manager:
+    """Stands in for EEGManager's annotation list"""
+
+    def __init__(self):
+        self.annotations = []
+        self.calls = []
+
+    def annotate(self, timestamp, label):
+        self.annotations.append(Annotation(timestamp, label.encode("ascii")))
+
+    def get_annotations(self, start=0):
+        self.calls.append(start)
+        return self.annotations[start:]
+
+
+def test_add_keeps_timestamps_sorted():
+    store = AnnotationStore(capacity=2)
+    for timestamp, label in [(10, "a"), (30, "b"), (20, "a"), (5, "c")]:
+        store.add(timestamp, label)
+    np.testing.assert_array_equal(store.timestamps, [5, 10, 20, 30])
+    assert store.descriptions == ["c", "a", "a", "b"]
+    assert store.labels == ["a", "b", "c"]
+
+
+def test_window_selects_half_open_range():
+    store = AnnotationStore()
+    for timestamp in [0, 10, 20, 30]:
+        store.add(timestamp, f"t{timestamp}")
+    timestamps, codes = store.window(10, 30)
+    np.testing.assert_array_equal(timestamps, [10, 20])
+    assert [store.labels[code] for code in codes] == ["t10", "t20"]
+
+
+def test_sync_only_fetches_new_annotations():
+    mgr = _Manager()
+    store = AnnotationStore()
+    mgr.annotate(1, "a")
+    mgr.annotate(2, "b")
+    assert store.sync(mgr) == 2
+    mgr.annotate(3, "c")
+    assert store.sync(mgr) == 1
+    assert store.sync(mgr) == 0
+    assert mgr.calls == [0, 1, 2]
+    assert store.descriptions == ["a", "b", "c"]
+
+
+def test_sync_starts_over_after_manager_clear():
+    mgr = _Manager()
+    store = AnnotationStore()
+    mgr.annotate(1, "a")
+    mgr.annotate(2, "b")
+    store.sync(mgr)
+    mgr.annotations.clear()
+    mgr.annotate(7, "x")
+    mgr.annotate(8, "y")
+    mgr.annotate(9, "z")
+    assert store.sync(mgr) == 3
+    np.testing.assert_array_equal(store.timestamps, [7, 8, 9])
+    assert store.descriptions == ["x", "y", "z"]
+
+
+def test_reset_removes_annotations():
+    mgr = _Manager()
+    store = AnnotationStore()
+    mgr.annotate(1, "a")
+    store.sync(mgr)
+    store.reset()
+    assert len(store) == 0
+    assert store.sync(mgr) == 1
@@ -0,0 +1,45 @@
+import json
+import sys
+
+from brainaccess.bench import __main__ as bench
+from brainaccess.bench import acquisition, chunk_callback, multi_manager
+
+
+def test_acquisition_benchmarks_run_without_native_library(no_native_library):
+    results = acquisition.run(buffer_seconds=(1,), latency_duration=0.5)
+    for mode in ("accumulate", "roll"):
+        assert results["callback"][mode]["1"]["n"] > 0
+        assert results["get_mne"][mode]["1"]["n"] == 50
+        assert "n" in results["consumer_latency"][mode]
+
+
+def test_chunk_conversion_benchmark():
+    results = chunk_callback.run(25, repeats=10)
+    assert results["chunk_size"] == 25
+    assert results["list"] > 0 and results["numpy"] > 0
+
+
+def test_multi_manager_benchmark_runs_simulated_without_native_library(
+    no_native_library,
+):
+    results = multi_manager.run_all(max_devices=2, duration=0.1)
+    assert results["backend"] == "simulated"
+    assert set(results["devices"]) == {"1", "2"}
+    for stats in results["devices"].values():
+        assert stats["per_manager"] > 0 and stats["global_lock"] > 0
+
+
+def test_report_is_written(no_native_library, monkeypatch, tmp_path):
+    report = tmp_path / "report.json"
+    monkeypatch.setattr(
+        acquisition, "run", lambda *args: {"callback": {}, "args": list(args)}
+    )
+    monkeypatch.setattr(
+        multi_manager, "run_all", lambda **kwargs: {"backend": "simulated", **kwargs}
+    )
+    monkeypatch.setattr(sys, "argv", ["bench", "--quick", "-o", str(report)])
+    bench.main()
+    written = json.loads(report.read_text())
+    assert written["acquisition"]["args"] == [[10, 60], 2.0]
+    assert len(written["chunk_conversion"]) == 2
+    assert written["multi_manager"] == {"backend": "simulated", "duration": 0.25}
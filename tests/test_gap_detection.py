@@ -0,0 +1,58 @@
+import numpy as np
+
+from brainaccess.utils.gap_detection import SampleGapDetector, pad_gaps
+
+
+def test_contiguous_chunks_have_no_gaps():
+    detector = SampleGapDetector()
+    assert detector.check(np.arange(0, 10.0)) == []
+    assert detector.check(np.arange(10, 20.0)) == []
+    assert detector.dropped_samples == 0
+    assert detector.gap_events == 0
+
+
+def test_gaps_within_and_between_chunks():
+    reported = []
+    detector = SampleGapDetector(lambda first, n: reported.append((first, n)))
+    detector.check(np.arange(0, 5.0))
+    gaps = detector.check(np.array([8, 9, 10, 12, 13.0]))
+    assert gaps == [(0, 3), (3, 1)]
+    assert reported == [(5, 3), (11, 1)]
+    assert detector.dropped_samples == 4
+    assert detector.gap_events == 2
+
+
+def test_restart_is_a_discontinuity():
+    detector = SampleGapDetector()
+    detector.check(np.arange(100, 110.0))
+    assert detector.check(np.arange(0, 10.0)) == []
+    assert detector.discontinuities == 1
+    assert detector.dropped_samples == 0
+
+
+def test_jump_above_max_gap_is_not_padded():
+    detector = SampleGapDetector(max_gap=10)
+    detector.check(np.arange(0, 5.0))
+    assert detector.check(np.array([5, 6, 16, 17.0])) == [(2, 9)]
+    assert detector.check(np.array([1000, 1001.0])) == []
+    assert detector.dropped_samples == 9
+    assert detector.gap_events == 1
+    assert detector.discontinuities == 1
+
+
+def test_reset_forgets_last_sample():
+    detector = SampleGapDetector()
+    detector.check(np.arange(0, 5.0))
+    detector.reset()
+    assert detector.check(np.arange(50, 55.0)) == []
+    assert detector.discontinuities == 0
+
+
+def test_pad_gaps_inserts_nan_and_sample_numbers():
+    chunk = np.array([[8, 9, 10, 12, 13.0], [1, 1, 1, 1, 1.0]])
+    padded = pad_gaps(chunk, [(0, 3), (3, 1)], sample_row=0)
+    np.testing.assert_array_equal(padded[0], np.arange(5, 14.0))
+    np.testing.assert_array_equal(
+        np.isnan(padded[1]), [1, 1, 1, 0, 0, 0, 1, 0, 0]
+    )
+    np.testing.assert_array_equal(chunk[0], [8, 9, 10, 12, 13])
@@ -0,0 +1,167 @@
+import json
+import socket
+
+import numpy as np
+import pytest
+
+from brainaccess.core.annotation import Annotation
+from brainaccess.utils import network
+from brainaccess.utils.network import StreamClient, StreamServer
+from brainaccess.utils.subscription import ChunkFanout
+
+CH_NAMES = ["Sample", "F3", "F4"]
+CH_TYPES = ["misc", "eeg", "eeg"]
+
+
+def _chunk(start, n):
+    samples = np.arange(start, start + n, dtype=float)
+    return np.vstack([samples, np.sin(samples / 10), np.cos(samples / 10)])
+
+
+@pytest.fixture
+def server():
+    fanout = ChunkFanout(len(CH_NAMES), 1000)
+    server = StreamServer(fanout, CH_NAMES, 250.0, CH_TYPES, interval=0.005)
+    server.start()
+    yield server
+    server.close()
+
+
+def _connect(server, wait, n_clients=1, **kwargs):
+    client = StreamClient(*server.address, **kwargs)
+    # the server subscribes in its client thread
+    wait(lambda: len(server.fanout.subscriptions) == n_clients)
+    return client
+
+
+def test_loopback_streams_all_channels(server, wait):
+    client = _connect(server, wait)
+    assert client.ch_names == CH_NAMES
+    assert client.ch_types == CH_TYPES
+    for start in range(0, 100, 10):
+        server.fanout.publish(_chunk(start, 10))
+    wait(lambda: client.ring.cursor == 100)
+    data, position = client.read_latest(100)
+    assert position == 0
+    np.testing.assert_array_equal(data, _chunk(0, 100).astype(np.float32))
+    server.annotate("stim", position=42)
+    wait(lambda: len(client.annotations) == 1)
+    assert client.annotations.descriptions == ["stim"]
+    np.testing.assert_array_equal(client.annotations.timestamps, [42])
+    client.close()
+    assert client.error is None
+
+
+def test_channel_subset_and_decimation(server, wait):
+    server.fanout.publish(_chunk(0, 3))
+    client = _connect(server, wait, channels=["Sample", "F4"], decimation=4)
+    assert client.ch_names == ["Sample", "F4"]
+    assert client.sfreq == 62.5
+    for start in range(3, 203, 7):
+        server.fanout.publish(_chunk(start, 7))
+    wait(lambda: client.ring.cursor == 51)
+    data, position = client.read_latest(100)
+    # positions stay divisible by the decimation across frames
+    assert position == 4
+    np.testing.assert_array_equal(data[0], np.arange(4, 206, 4))
+    assert client.skipped_samples == 0
+    client.close()
+
+
+def test_decimation_filters_eeg_channels_against_aliasing(server, wait):
+    client = _connect(server, wait, channels=["Sample", "F3"], decimation=4)
+    samples = np.arange(1000, dtype=float)
+    # 100 Hz would alias to 25 Hz at the decimated 62.5 Hz
+    tone = np.vstack([samples, np.sin(2 * np.pi * 100 * samples / 250), samples])
+    for start in range(0, 1000, 50):
+        server.fanout.publish(tone[:, start : start + 50])
+    wait(lambda: client.ring.cursor == 250)
+    data, _ = client.read_latest(250)
+    np.testing.assert_array_equal(data[0], np.arange(0, 1000, 4))
+    assert np.abs(data[1, 50:]).max() < 0.01
+    client.close()
+
+
+class _Manager:
+    """Stands in for EEGManager's annotation list"""
+
+    def __init__(self):
+        self.annotations = []
+
+    def get_annotations(self, start=0):
+        return self.annotations[start:]
+
+
+def test_positions_are_device_sample_numbers(wait):
+    mgr = _Manager()
+    fanout = ChunkFanout(len(CH_NAMES), 1000)
+    server = StreamServer(
+        fanout,
+        CH_NAMES,
+        250.0,
+        CH_TYPES,
+        interval=0.005,
+        sample_row=0,
+        annotation_source=mgr,
+    )
+    server.start()
+    try:
+        client = _connect(server, wait, decimation=2)
+        # the device dropped samples 1040 to 1049
+        fanout.publish(_chunk(1001, 39))
+        fanout.publish(_chunk(1050, 20))
+        mgr.annotations.append(Annotation(1060, b"stim"))
+        wait(lambda: client.ring.cursor == 34 and len(client.annotations) == 1)
+        data, position = client.read_latest(100)
+        assert position == 1002
+        assert client.position(client.ring.cursor - 1) == 1068
+        expected = np.r_[
+            np.arange(1002, 1040, 2), np.full(5, np.nan), np.arange(1050, 1070, 2)
+        ]
+        np.testing.assert_array_equal(data[0], expected)
+        assert client.skipped_samples == 5
+        np.testing.assert_array_equal(client.annotations.timestamps, [1060])
+        # stream restart, sample numbers start over
+        fanout.publish(_chunk(0, 10))
+        wait(lambda: client.ring.cursor == 39)
+        assert client.position(client.ring.cursor - 1) == 8
+        client.close()
+    finally:
+        server.close()
+
+
+def test_unknown_channel_is_rejected(server):
+    with pytest.raises(ValueError):
+        StreamClient(*server.address, channels=["Cz"])
+
+
+def test_oversized_subscribe_frame_closes_connection(server):
+    sock = socket.create_connection(server.address)
+    sock.settimeout(5.0)
+    sock.sendall(
+        network._FRAME.pack(network.SUBSCRIBE, 0, 0, network.MAX_MESSAGE_BYTES + 1, 0)
+    )
+    assert sock.recv(1) == b""
+    sock.close()
+
+
+def test_oversized_data_frame_is_rejected_before_reading():
+    a, b = socket.socketpair()
+    a.sendall(network._FRAME.pack(network.DATA, 0, 1024, 1 << 20, 0))
+    with pytest.raises(ValueError):
+        network._recv_frame(b)
+    # the server accepts no data frames at all
+    a.sendall(network._FRAME.pack(network.DATA, 0, 1, 1, 0) + bytes(4))
+    with pytest.raises(ValueError):
+        network._recv_frame(b, data=False)
+    a.close()
+    b.close()
+
+
+def test_subscribe_frame_round_trip():
+    a, b = socket.socketpair()
+    payload = json.dumps({"channels": None}).encode()
+    network._send_frame(a, network.SUBSCRIBE, payload)
+    assert network._recv_frame(b, data=False) == (network.SUBSCRIBE, 0, payload)
+    a.close()
+    b.close()
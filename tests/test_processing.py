@@ -0,0 +1,51 @@
+import numpy as np
+import scipy.signal
+
+from brainaccess.utils.processing import BandPass, HighPass, LowPass, Notch
+
+
+def _signal(n=1000, sfreq=250.0):
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / sfreq
+    return 5 + np.sin(2 * np.pi * 10 * t) + rng.normal(0, 0.5, (3, n))
+
+
+def _offline(stage, data):
+    zi = scipy.signal.sosfilt_zi(stage.sos)
+    zi = zi[:, np.newaxis, :] * data[np.newaxis, :, 0, np.newaxis]
+    return scipy.signal.sosfilt(stage.sos, data, axis=1, zi=zi)[0]
+
+
+def test_chunked_filtering_equals_offline():
+    data = _signal()
+    for stage in [
+        BandPass(1.0, 40.0, 250.0),
+        HighPass(1.0, 250.0),
+        LowPass(30.0, 250.0),
+        Notch(50.0, 250.0),
+    ]:
+        expected = _offline(stage, data)
+        chunks = [stage.process(data[:, i : i + 7]) for i in range(0, 1000, 7)]
+        np.testing.assert_allclose(np.concatenate(chunks, axis=1), expected)
+
+
+def test_nan_samples_pass_through_without_touching_state():
+    data = _signal()
+    stage = BandPass(1.0, 40.0, 250.0)
+    expected = _offline(stage, data)
+    padded = np.insert(data, [500] * 3, np.nan, axis=1)
+    out = np.concatenate(
+        [stage.process(padded[:, i : i + 10]) for i in range(0, padded.shape[1], 10)],
+        axis=1,
+    )
+    assert np.isnan(out[:, 500:503]).all()
+    np.testing.assert_allclose(np.delete(out, [500, 501, 502], axis=1), expected)
+
+
+def test_reset_restarts_the_filter():
+    data = _signal()
+    stage = HighPass(1.0, 250.0)
+    first = stage.process(data[:, :100])
+    stage.process(data[:, 100:200])
+    stage.reset()
+    np.testing.assert_allclose(stage.process(data[:, :100]), first)
@@ -0,0 +1,67 @@
+import errno
+
+import numpy as np
+import pytest
+
+from brainaccess.utils.recorder import StreamRecorder, read_recording
+
+
+class _FullDisk:
+    """Data file whose writes fail as on a full disk"""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, data):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+def test_round_trip(tmp_path, chunk):
+    fname = tmp_path / "sub-01.run1"
+    recorder = StreamRecorder(fname, ["a", "b"], 250.0, flush_interval=0.01)
+    recorder.write(chunk(0, 5))
+    recorder.annotate("start")
+    recorder.write(chunk(5, 5))
+    recorder.annotate("mark", sample=7)
+    recorder.close()
+    # dots in the base name are kept
+    assert (tmp_path / "sub-01.run1.dat").exists()
+    raw = read_recording(fname)
+    np.testing.assert_array_equal(raw.get_data(), chunk(0, 10))
+    assert raw.ch_names == ["a", "b"]
+    assert list(raw.annotations.description) == ["start", "mark"]
+    np.testing.assert_allclose(raw.annotations.onset, [5 / 250, 7 / 250])
+
+
+def test_partial_trailing_sample_is_ignored(tmp_path, chunk):
+    fname = tmp_path / "session"
+    recorder = StreamRecorder(fname, ["a", "b"], 250.0)
+    recorder.write(chunk(0, 4))
+    recorder.close()
+    with open(tmp_path / "session.dat", "ab") as f:
+        f.write(b"\0" * 8)
+    with open(tmp_path / "session.events", "a") as f:
+        f.write('{"sample": 1, "desc')
+    raw = read_recording(fname)
+    np.testing.assert_array_equal(raw.get_data(), chunk(0, 4))
+    assert len(raw.annotations) == 0
+
+
+def test_write_error_stops_queueing(tmp_path, chunk):
+    recorder = StreamRecorder(
+        tmp_path / "session", ["a", "b"], 250.0, flush_interval=0.01
+    )
+    recorder._data_file = _FullDisk(recorder._data_file)
+    recorder.write(chunk(0, 5))
+    recorder._thread.join(timeout=5)
+    assert isinstance(recorder.error, OSError)
+    recorder.write(chunk(5, 5))
+    recorder.annotate("lost")
+    assert recorder._chunks == []
+    assert recorder._events == []
+    assert recorder.dropped_samples == 10
+    with pytest.raises(RuntimeError):
+        recorder.close()
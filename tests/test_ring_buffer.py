@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pytest
+
+from brainaccess.utils.ring_buffer import BufferOverrun, ChunkRingBuffer, SeqLock
+
+
+def test_read_across_wraparound(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    for start in range(0, 16, 4):
+        ring.write(chunk(start, 4))
+    assert ring.cursor == 16
+    assert ring.oldest == 6
+    np.testing.assert_array_equal(ring.read(6, 16), chunk(6, 10))
+    np.testing.assert_array_equal(ring.read(8, 12), chunk(8, 4))
+
+
+def test_read_into_out(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    ring.write(chunk(0, 8))
+    ring.write(chunk(8, 4))
+    out = np.empty((2, 5))
+    assert ring.read(7, 12, out=out) is out
+    np.testing.assert_array_equal(out, chunk(7, 5))
+
+
+def test_overwritten_samples_raise_overrun(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    ring.write(chunk(0, 8))
+    ring.write(chunk(8, 8))
+    with pytest.raises(BufferOverrun):
+        ring.read(5, 10)
+
+
+def test_unwritten_samples_raise_value_error(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    ring.write(chunk(0, 4))
+    with pytest.raises(ValueError):
+        ring.read(2, 6)
+
+
+def test_chunk_larger_than_capacity_keeps_tail(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    ring.write(chunk(0, 25))
+    assert ring.cursor == 25
+    assert ring.oldest == 15
+    np.testing.assert_array_equal(ring.read(15), chunk(15, 10))
+
+
+def test_read_latest_is_limited_to_available(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    ring.write(chunk(0, 4))
+    data, start = ring.read_latest(6)
+    assert start == 0
+    np.testing.assert_array_equal(data, chunk(0, 4))
+    ring.write(chunk(4, 12))
+    data, start = ring.read_latest(100)
+    assert start == 6
+    np.testing.assert_array_equal(data, chunk(6, 10))
+
+
+def test_callback_histogram_counts_writes(chunk):
+    ring = ChunkRingBuffer(2, 10)
+    for start in range(0, 12, 4):
+        ring.write(chunk(start, 4))
+    edges, counts = ring.callback_histogram()
+    assert len(counts) == len(edges) + 1
+    assert counts.sum() == 3
+
+
+def test_seqlock_read_overlapping_a_write_is_retried():
+    seqlock = SeqLock()
+    seq = seqlock.read_begin()
+    seqlock.write_begin()
+    seqlock.write_end()
+    assert not seqlock.read_validate(seq)
+    assert seqlock.read_validate(seqlock.read_begin())
+    assert seqlock.stats() == {"writes": 1, "reads": 1, "retries": 1, "waits": 0}
+
+
+def test_seqlock_reader_waits_for_write_in_progress():
+    seqlock = SeqLock()
+    seqlock.write_begin()
+    timer = threading.Timer(0.05, seqlock.write_end)
+    timer.start()
+    seq = seqlock.read_begin()
+    timer.join()
+    assert seq == 2
+    assert seqlock.stats()["waits"] > 0
+
+
+def test_seqlock_readers_see_consistent_state():
+    seqlock = SeqLock()
+    state = [0, 0]
+    done = threading.Event()
+
+    def writer():
+        for i in range(1, 20000):
+            seqlock.write_begin()
+            state[0] = i
+            state[1] = -i
+            seqlock.write_end()
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        while True:
+            seq = seqlock.read_begin()
+            first, second = state
+            if seqlock.read_validate(seq):
+                break
+        assert first == -second
+    thread.join()
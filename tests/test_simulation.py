@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from brainaccess.utils.acquisition import EEG
+from brainaccess.utils.simulation import SimulatedEEGManager
+
+
+@pytest.mark.parametrize("mode, zeros_at_start", [("accumulate", 0), ("roll", 500)])
+def test_eeg_runs_on_simulator_without_native_library(
+    no_native_library, mode, zeros_at_start, wait
+):
+    eeg = EEG(mode=mode)
+    with SimulatedEEGManager(speed=20, seed=0) as mgr:
+        eeg.setup(mgr, port="sim", zeros_at_start=zeros_at_start, gain=4)
+        eeg.start_acquisition()
+        wait(lambda: eeg.get_buffer_stats()["writes"] >= 30)
+        eeg.stop_acquisition()
+        raw = eeg.get_mne(tim=2)
+    eeg.close()
+    assert raw.n_times == 500
+    samples = raw.get_data(picks=["Sample"])[0]
+    np.testing.assert_array_equal(np.diff(samples), 1)
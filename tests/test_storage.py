@@ -0,0 +1,178 @@
+import threading
+
+import mne
+import numpy as np
+import pytest
+
+from brainaccess.utils.acquisition import EEGData, EEGData_roll
+from brainaccess.utils.storage import (
+    ArrayStorage,
+    MemmapStorage,
+    read_segments,
+    run_directory,
+)
+
+
+def test_array_storage_grows_and_keeps_old_views(chunk):
+    storage = ArrayStorage(2, 4)
+    storage.append(chunk(0, 3))
+    (view,) = storage.views(0, 3)
+    storage.append(chunk(3, 10))
+    assert storage.n_samples == 13
+    np.testing.assert_array_equal(view, chunk(0, 3))
+    (everything,) = storage.views(0, 13)
+    np.testing.assert_array_equal(everything, chunk(0, 13))
+
+
+def test_eeg_data_window_reads_last_samples(chunk):
+    info = mne.create_info(["a", "b"], 250.0)
+    data = EEGData(info, threading.Lock(), zeros_at_start=2, capacity=4)
+    for start in range(0, 20, 5):
+        data.append(chunk(start, 5))
+    assert data.n_samples == 22
+    window, start = data.window(6)
+    assert start == 16
+    np.testing.assert_array_equal(window, chunk(14, 6))
+    window, _ = data.window(3, rows=[1])
+    np.testing.assert_array_equal(window, chunk(17, 3, n_channels=1))
+    np.testing.assert_array_equal(data.data[:, :2], np.zeros((2, 2)))
+
+
+def test_eeg_data_copy_never_shares_storage(chunk):
+    info = mne.create_info(["a", "b", "c"], 10.0)
+    data = EEGData(info, threading.Lock(), zeros_at_start=0)
+    data.append(chunk(0, 30, n_channels=3))
+    for rows in (None, [0, 2], slice(0, 2)):
+        window, _ = data.window(10, rows, copy=True)
+        window[:] = 7
+    np.testing.assert_array_equal(data.data, chunk(0, 30, n_channels=3))
+    data.convert_to_mne(tim=1.0, annotations=False, channels_indexes=slice(0, 3))
+    data.mne_raw._data[:] = 7
+    np.testing.assert_array_equal(data.data, chunk(0, 30, n_channels=3))
+
+
+def test_eeg_data_convert_to_mne_last_seconds(chunk):
+    info = mne.create_info(["a", "b"], 10.0)
+    data = EEGData(info, threading.Lock(), zeros_at_start=0)
+    data.append(chunk(0, 40))
+    data.convert_to_mne(tim=1.0, annotations=False)
+    np.testing.assert_array_equal(data.mne_raw.get_data(), chunk(30, 10))
+
+
+def test_eeg_data_roll_wraps_and_reads_in_order(chunk):
+    info = mne.create_info(["a", "b"], 250.0)
+    data = EEGData_roll(info, threading.Lock(), zeros_at_start=8)
+    np.testing.assert_array_equal(data.data, np.zeros((2, 8)))
+    data.append(chunk(0, 5))
+    np.testing.assert_array_equal(data.data[:, :3], np.zeros((2, 3)))
+    np.testing.assert_array_equal(data.data[:, 3:], chunk(0, 5))
+    # wraps around the end of the ring, twice
+    for start in range(5, 20, 5):
+        data.append(chunk(start, 5))
+    assert data.n_samples == 8
+    np.testing.assert_array_equal(data.data, chunk(12, 8))
+    window, start = data.window(6)
+    assert start == 22
+    np.testing.assert_array_equal(window, chunk(14, 6))
+    window, _ = data.window(3, rows=[1])
+    np.testing.assert_array_equal(window, chunk(17, 3, n_channels=1))
+    # at most the buffered samples
+    window, start = data.window(100)
+    assert start == 20
+    np.testing.assert_array_equal(window, chunk(12, 8))
+
+
+def test_eeg_data_roll_compact_groups(chunk):
+    info = mne.create_info(["a", "b", "c"], 250.0)
+    data = EEGData_roll(info, threading.Lock(), zeros_at_start=6, compact=True)
+    # no groups until the row dtypes are known
+    np.testing.assert_array_equal(data.data, np.zeros((3, 6)))
+    data.set_row_dtypes([np.float64, np.uint32, np.float64])
+    assert sorted(ring.data.dtype.name for _, ring in data._groups) == [
+        "float32",
+        "int64",
+    ]
+    values = chunk(0, 4, n_channels=3) + 0.25
+    values[1, 2] = np.nan
+    data.append(values)
+    for start in range(4, 12, 4):
+        data.append(chunk(start, 4, n_channels=3) + 0.25)
+    window = data.data
+    assert window.dtype == np.float64
+    np.testing.assert_array_equal(window[[0, 2]], chunk(6, 6) + 0.25)
+    np.testing.assert_array_equal(window[1], np.arange(6, 12))
+    window, start = data.window(2, rows=[2, 1])
+    assert start == 16
+    np.testing.assert_array_equal(window, [[10.25, 11.25], [10, 11]])
+
+
+def test_eeg_data_roll_stores_padding_as_zero_in_integer_rows(chunk):
+    info = mne.create_info(["a", "b"], 250.0)
+    data = EEGData_roll(info, threading.Lock(), zeros_at_start=4, compact=True)
+    data.set_row_dtypes([np.float64, np.int32])
+    values = chunk(1, 4)
+    values[:, 1] = np.nan
+    data.append(values)
+    np.testing.assert_array_equal(data.data[0], [1, np.nan, 3, 4])
+    np.testing.assert_array_equal(data.data[1], [1, 0, 3, 4])
+
+
+def test_memmap_storage_rolls_segments(tmp_path, chunk):
+    storage = MemmapStorage(2, tmp_path, segment_samples=4)
+    storage.append(chunk(0, 3))
+    storage.append(chunk(3, 7))
+    assert storage.n_samples == 10
+    assert sorted(p.name for p in tmp_path.glob("*.dat")) == [
+        "segment_00000.dat",
+        "segment_00001.dat",
+        "segment_00002.dat",
+    ]
+    views = storage.views(2, 9)
+    assert [view.shape[1] for view in views] == [2, 4, 1]
+    np.testing.assert_array_equal(np.concatenate(views, axis=1), chunk(2, 7))
+
+
+def test_read_segments_recovers_up_to_last_flush(tmp_path, chunk):
+    storage = MemmapStorage(
+        2, tmp_path, segment_samples=4, ch_names=["a", "b"], sfreq=250.0
+    )
+    storage.append(chunk(0, 6))
+    # rolled once, the first segment is recorded
+    data, sidecar = read_segments(tmp_path)
+    np.testing.assert_array_equal(data, chunk(0, 4))
+    storage.flush()
+    storage.append(chunk(6, 1))
+    # not flushed: the recording ends at the last flush, not at the padding
+    data, sidecar = read_segments(tmp_path)
+    np.testing.assert_array_equal(data, chunk(0, 6))
+    assert sidecar["ch_names"] == ["a", "b"]
+    assert sidecar["sfreq"] == 250.0
+    assert sidecar["n_samples"] == 6
+
+
+def test_memmap_storage_never_overwrites(tmp_path, chunk):
+    storage = MemmapStorage(2, tmp_path, segment_samples=4)
+    storage.append(chunk(0, 2))
+    storage.flush()
+    with pytest.raises(FileExistsError):
+        MemmapStorage(2, tmp_path, segment_samples=4)
+    data, _ = read_segments(tmp_path)
+    np.testing.assert_array_equal(data, chunk(0, 2))
+
+
+def test_run_directory_numbers_runs(tmp_path):
+    first = run_directory(tmp_path)
+    second = run_directory(tmp_path)
+    assert first != second
+    assert first.is_dir() and second.is_dir()
+
+
+def test_eeg_data_in_storage_dir_is_recoverable(tmp_path, chunk):
+    info = mne.create_info(["a", "b"], 250.0)
+    data = EEGData(info, threading.Lock(), zeros_at_start=0, storage_dir=tmp_path)
+    data.append(chunk(0, 30))
+    data.flush()
+    (run,) = tmp_path.iterdir()
+    recovered, sidecar = read_segments(run)
+    np.testing.assert_array_equal(recovered, chunk(0, 30))
+    assert sidecar["ch_names"] == ["a", "b"]
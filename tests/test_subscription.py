@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from brainaccess.utils.ring_buffer import BufferOverrun
+from brainaccess.utils.subscription import ChunkFanout
+
+
+def test_subscribers_read_independently(chunk):
+    fanout = ChunkFanout(2, 20)
+    fast = fanout.subscribe("fast")
+    fanout.publish(chunk(0, 5))
+    slow = fanout.subscribe("slow")
+    data, start = fast.read_new()
+    assert start == 0
+    np.testing.assert_array_equal(data, chunk(0, 5))
+    fanout.publish(chunk(5, 5))
+    data, start = slow.read_new()
+    assert start == 5
+    np.testing.assert_array_equal(data, chunk(5, 5))
+    assert fast.lag == 5
+    data, start = fast.read_new(max_samples=2)
+    assert start == 5
+    np.testing.assert_array_equal(data, chunk(5, 2))
+    assert fast.lag == 3
+
+
+def test_skip_jumps_past_overwritten_samples(chunk):
+    fanout = ChunkFanout(2, 20)
+    subscription = fanout.subscribe("viewer")
+    for start in range(0, 30, 10):
+        fanout.publish(chunk(start, 10))
+    data, start = subscription.read_new()
+    # oldest sample plus a quarter of the capacity of headroom
+    assert start == 15
+    np.testing.assert_array_equal(data, chunk(15, 15))
+    metrics = subscription.metrics()
+    assert metrics["overruns"] == 1
+    assert metrics["skipped_samples"] == 15
+    assert metrics["read_samples"] == 15
+    assert metrics["max_lag"] == 30
+    assert metrics["lag"] == 0
+
+
+def test_drop_unsubscribes_on_overrun(chunk):
+    fanout = ChunkFanout(2, 20)
+    subscription = fanout.subscribe("recorder", on_overrun="drop")
+    for start in range(0, 30, 10):
+        fanout.publish(chunk(start, 10))
+    with pytest.raises(BufferOverrun):
+        subscription.read_new()
+    assert subscription.dropped
+    assert "recorder" not in fanout.metrics()
+    with pytest.raises(BufferOverrun):
+        subscription.read_new()
+
+
+def test_close_removes_subscription():
+    fanout = ChunkFanout(2, 20)
+    subscription = fanout.subscribe()
+    other = fanout.subscribe()
+    assert list(fanout.metrics()) == ["subscriber-0", "subscriber-1"]
+    subscription.close()
+    assert list(fanout.metrics()) == [other.name]